@@ -6,23 +6,99 @@ date: 11 June 2024
 import wrappers.triq_wrapper as triq_wrapper
 import wrappers.qiskit_wrapper as qiskit_wrapper
 import wrappers.database_wrapper as database_wrapper
+import wrappers.runtime_wrapper as runtime_wrapper
+from wrappers.cache_wrapper import CompileCache, get_compile_key
 import glob, os
-from commons import Config
+from commons import conf
 from wrappers.qiskit_wrapper import QiskitCircuit
-from qiskit_ibm_runtime import QiskitRuntimeService, Session
-from qiskit_ibm_runtime import SamplerV2 as Sampler
-from qiskit_ibm_runtime.options import SamplerOptions
 
 from datetime import datetime
-import mysql.connector
 import time
+from concurrent.futures import ProcessPoolExecutor
 
 
-from scheduler import check_result_availability, get_result, process_simulator, get_metrics
+from scheduler import get_result, set_job_error, process_simulator, get_metrics
+from wrappers.runtime_wrapper import JobPoller, retry_with_backoff
 
-conf = Config()
 debug = conf.activate_debugging_time
 
+#region Compilation
+
+# compiled circuits of the previous runs, on disk ([CompilerConfig] cache = 0 to bypass it)
+compile_cache = CompileCache(cache_dir=conf.compiler_cache_dir, max_size_mb=conf.compiler_cache_size_mb, 
+                             enabled=conf.compiler_cache)
+
+def get_compile_cache_key(qasm, compilation_name, hardware_name, measurement_type, calibration_id = None):
+    # only TriQ depends on the measurement type
+    if "triq" not in compilation_name:
+        measurement_type = None
+
+    return get_compile_key(qasm, compilation_name, hardware_name, calibration_id, measurement_type)
+
+def get_detail_compilation_name(compilation_name):
+    # name stored in result_detail: triq_<x>_<layout> is stored as <layout>_triq_<x>
+    if "triq" in compilation_name:
+        tmp = compilation_name.split("_")
+        return tmp[2] + "_" + tmp[0] + "_" + tmp[1]
+
+    return compilation_name
+
+def compile_qiskit(qasm, backend):
+    qiskit_optimization_level = 3
+    
+    updated_qasm, compilation_time, initial_mapping = qiskit_wrapper.optimize_qasm(
+        qasm, backend, qiskit_optimization_level)
+
+    return updated_qasm, compilation_time, initial_mapping, ""
+
+def compile_triq(qasm, backend, hardware_name, measurement_type, calibration_id = None):
+    tmp_start_time  = time.perf_counter()
+
+    initial_mapping = qiskit_wrapper.get_initial_mapping_sabre(
+            qasm, backend, calibration_id=calibration_id)
+
+    updated_qasm, final_mapping = triq_wrapper.run(qasm, hardware_name, measurement_type=measurement_type, 
+                                                   initial_mapping=initial_mapping)
+    tmp_end_time = time.perf_counter()
+
+    compilation_time = tmp_end_time - tmp_start_time
+
+    return updated_qasm, compilation_time, initial_mapping, final_mapping
+
+# state of a worker process of the compilation pool, set once by init_compile_worker
+_worker_backend = None
+_worker_hardware_name = None
+_worker_measurement_type = None
+_worker_calibration_id = None
+
+def init_compile_worker(backend, hardware_name, measurement_type, calibration_id):
+    global _worker_backend, _worker_hardware_name, _worker_measurement_type, _worker_calibration_id
+
+    _worker_backend = backend
+    _worker_hardware_name = hardware_name
+    _worker_measurement_type = measurement_type
+    _worker_calibration_id = calibration_id
+
+def compile_task(task):
+    """
+    Compiles one (circuit, compilation) of the grid in a worker process. Returns
+    (circuit_name, compilation_name, updated_qasm, compilation_time, initial_mapping, 
+    final_mapping), or None for an unknown compilation
+    """
+    circuit_name, qasm, compilation_name = task
+
+    if "qiskit" in compilation_name:
+        compiled = compile_qiskit(qasm, _worker_backend)
+    elif "triq" in compilation_name:
+        compiled = compile_triq(qasm, _worker_backend, _worker_hardware_name + "_" + "real", 
+                                _worker_measurement_type, _worker_calibration_id)
+    else:
+        return None
+
+    return (circuit_name, get_detail_compilation_name(compilation_name)) + compiled
+
+#endregion
+
 class NAPC:
     def __init__(self, runs=1, 
                  user_id = 1,
@@ -31,14 +107,16 @@ class NAPC:
                  hw_name = conf.hardware_name
                  ):
 
-        self.session: Session = None
-        self.service: QiskitRuntimeService = None
-        self.real_backend = None
+        # the database connection, the service, the backend and the calibration data 
+        # are only set up on their first use (see the properties below)
+        self.session = None
+        self._service = None
+        self._real_backend = None
         self.backend = None
-        self.program: (Sampler) = None
+        self.program = None
 
-        self.conn = None
-        self.cursor = None    
+        self._conn = None
+        self._cursor = None    
 
         self.circuit_name = None
         self.qasm = None 
@@ -46,29 +124,91 @@ class NAPC:
         self.runs = runs
         
         self.header_id = None
+        self._calibration_id = None
+        self._hardware_configs_updated = False
         self.user_id = user_id
         self.token = token
-
-        self.open_database_connection()
-
-
-        self.set_service(hardware_name=hw_name, token=token)
-        
-        self.update_hardware_configs(hw_name)
-
+        self.hw_name = hw_name
+
+    #region Lazy initialization
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self.open_database_connection()
+        return self._conn
+
+    @conn.setter
+    def conn(self, conn):
+        self._conn = conn
+
+    @property
+    def cursor(self):
+        if self._cursor is None:
+            self.open_database_connection()
+        return self._cursor
+
+    @cursor.setter
+    def cursor(self, cursor):
+        self._cursor = cursor
+
+    @property
+    def service(self):
+        if self._service is None:
+            self.set_service(hardware_name=self.hw_name, token=self.token)
+        return self._service
+
+    @service.setter
+    def service(self, service):
+        self._service = service
+
+    @property
+    def real_backend(self):
+        if self._real_backend is None:
+            self.set_service(hardware_name=self.hw_name, token=self.token)
+        return self._real_backend
+
+    @real_backend.setter
+    def real_backend(self, real_backend):
+        self._real_backend = real_backend
+
+    @property
+    def calibration_id(self):
+        # the calibration files of TriQ are exported on the first compilation
+        if not self._hardware_configs_updated:
+            self.update_hardware_configs(self.hw_name)
+        return self._calibration_id
+
+    @calibration_id.setter
+    def calibration_id(self, calibration_id):
+        self._calibration_id = calibration_id
+        self._hardware_configs_updated = True
+
+    #endregion
 
     def open_database_connection(self):
-        self.conn = mysql.connector.connect(**conf.mysql_config)
-        self.cursor = self.conn.cursor()
+        self._conn = database_wrapper.get_connection()
+        self._cursor = self._conn.cursor()
 
     def close_database_connection(self):
-        self.conn.commit()
-        self.cursor.close()
-        self.conn.close()
+        if self._conn is None:
+            return
+
+        self._conn.commit()
+        self._cursor.close()
+        self._conn.close()
+        self._conn = None
+        self._cursor = None
 
     def update_hardware_configs(self, hw_name = conf.hardware_name): 
         if debug: tmp_start_time  = time.perf_counter()
-        triq_wrapper.generate_realtime_calibration_data(hw_name=hw_name)
+        self.calibration_id = triq_wrapper.generate_realtime_calibration_data(hw_name=hw_name)
+        qiskit_wrapper.invalidate_noisy_simulator_cache(hw_name)
+
+        # new calibration: the backend of the registry is retrieved again, with its new properties
+        if runtime_wrapper.update_backend_calibration(hw_name, self.calibration_id) and \
+            self._real_backend is not None and hw_name == self.hw_name:
+            self.real_backend = runtime_wrapper.get_backend(self.token, hw_name)
         if debug: tmp_end_time = time.perf_counter()
         if debug: print("Time for update hardware configs: {} seconds".format(tmp_end_time - tmp_start_time))
 
@@ -77,12 +217,10 @@ class NAPC:
         if debug: tmp_start_time  = time.perf_counter()
 
         if token == None: token = self.token
-        print("Saving IBM Account...")
-        QiskitRuntimeService.save_account(channel="ibm_quantum", token=token, overwrite=True)
-        self.service = QiskitRuntimeService(channel="ibm_quantum", token=token)
-        
-        print(f"Retrieving the real backend information of {hardware_name}...")
-        self.real_backend = self.service.get_backend(hardware_name)
+
+        # created, saved and retrieved once per process
+        self.service = runtime_wrapper.get_service(token)
+        self.real_backend = runtime_wrapper.get_backend(token, hardware_name)
         
         if debug: tmp_end_time = time.perf_counter()
         if debug: print("Time for setup the services: {} seconds".format(tmp_end_time - tmp_start_time))
@@ -97,6 +235,9 @@ class NAPC:
             self.backend = backend
         
         if program_type == "sampler":
+            from qiskit_ibm_runtime import SamplerV2 as Sampler
+            from qiskit_ibm_runtime.options import SamplerOptions
+
             options = SamplerOptions(
                 default_shots=shots
             )
@@ -121,55 +262,69 @@ class NAPC:
         return qc
 
 
+    def insert_compiled_circuit(self, noise_levels, compilation_name, updated_qasm, compilation_time, 
+                                initial_mapping, final_mapping = "", compilation_cached = False):
+        # one result_detail per noise level, all of them with the same compiled circuit
+        compiled_circuits = [(self.circuit_name, noise_level, compilation_name, updated_qasm, 
+                              compilation_time, initial_mapping, final_mapping, compilation_cached) 
+                             for noise_level in noise_levels]
+
+        database_wrapper.insert_to_result_detail_batch(self.conn, self.cursor, self.header_id, conf.noisy_simulator, 
+                                                       compiled_circuits)
+
     def apply_qiskit(self, 
                      qasm = None,
                      compilation_name = "qiskit_3",
-                     noise_level=None
+                     noise_level=None,
+                     noise_levels=None
                      ):
 
         if qasm is None:
             qasm = self.qasm
 
-        qiskit_optimization_level = 3
-        
-        
-        updated_qasm, compilation_time, initial_mapping = qiskit_wrapper.optimize_qasm(
-            qasm, self.real_backend, qiskit_optimization_level)
+        if noise_levels is None:
+            noise_levels = [noise_level]
 
+        key = get_compile_cache_key(qasm, compilation_name, self.hw_name, conf.triq_measurement_type, self.calibration_id)
+        (updated_qasm, compilation_time, initial_mapping, final_mapping), compilation_cached = compile_cache.get_or_compile(
+            key, compile_qiskit, qasm, self.real_backend)
 
-        database_wrapper.insert_to_result_detail(self.conn, self.cursor, self.header_id, self.circuit_name, conf.noisy_simulator, noise_level, 
-                                                    compilation_name, compilation_time, updated_qasm, initial_mapping)
+        self.insert_compiled_circuit(noise_levels, compilation_name, updated_qasm, compilation_time, initial_mapping, 
+                                     compilation_cached=compilation_cached)
             
         return updated_qasm, initial_mapping
 
-    def apply_triq(self, compilation_name, qasm=None, layout="mapo", noise_level=None):   
+    def apply_triq(self, compilation_name, qasm=None, layout="mapo", noise_level=None, noise_levels=None):   
         if qasm is None:
             qasm = self.qasm
 
-        hardware_name = conf.hardware_name + "_" + "real"
+        if noise_levels is None:
+            noise_levels = [noise_level]
 
-        tmp_start_time  = time.perf_counter()
+        hardware_name = self.hw_name + "_" + "real"
 
-        initial_mapping = qiskit_wrapper.get_initial_mapping_sabre(
-                qasm, self.real_backend)
-        
-        triq_wrapper.generate_initial_mapping_file(initial_mapping)
-
-        updated_qasm = triq_wrapper.run(qasm, hardware_name, measurement_type=conf.triq_measurement_type)
-        tmp_end_time = time.perf_counter()
-
-        final_mapping = triq_wrapper.get_mapping()
-
-        compilation_time = tmp_end_time - tmp_start_time
+        key = get_compile_cache_key(qasm, compilation_name + "_" + layout, self.hw_name, conf.triq_measurement_type, 
+                                    self.calibration_id)
+        (updated_qasm, compilation_time, initial_mapping, final_mapping), compilation_cached = compile_cache.get_or_compile(
+            key, compile_triq, qasm, self.real_backend, hardware_name, conf.triq_measurement_type, self.calibration_id)
         
         compilation_name = layout + "_" + compilation_name
         
-        database_wrapper.insert_to_result_detail(self.conn, self.cursor, self.header_id, self.circuit_name, conf.noisy_simulator, noise_level, 
-                                                    compilation_name, compilation_time, updated_qasm, initial_mapping, final_mapping)
+        self.insert_compiled_circuit(noise_levels, compilation_name, updated_qasm, compilation_time, 
+                                     initial_mapping, final_mapping, compilation_cached)
 
         return updated_qasm, initial_mapping
 
         
+    def run_program(self, circuits):
+        # job id of the circuits sent to the backend
+        job_id = None
+        if self.program is not None:
+            job = self.program.run(circuits)
+            job_id = job.job_id()
+
+        return job_id
+
     def send_qasm_to_real_backend(self, program_type):
         if debug: tmp_start_time  = time.perf_counter()
 
@@ -183,7 +338,6 @@ class NAPC:
 
             results = database_wrapper.get_detail_with_header_id(self.cursor, header_id)
             
-            success = False
             list_circuits = []
 
             for res in results:
@@ -200,32 +354,17 @@ class NAPC:
                     list_circuits.append(circuit)
                 
             print("Total no of circuits :",len(list_circuits))
-            while not success:
-                try:
-
-                    print("Sending to {} with batch id: {} ... ".format(conf.hardware_name, header_id))
-                    job_id = None
-
-                    if isinstance(self.program, Sampler):
-
-                        job = self.program.run(list_circuits)
-                        job_id = job.job_id()
-
+            print("Sending to {} with batch id: {} ... ".format(conf.hardware_name, header_id))
 
-                    success = True
+            # until it is accepted, with an exponential backoff between the attempts
+            job_id = retry_with_backoff(self.run_program, list_circuits, initial_delay=conf.poller_initial_delay, 
+                                        backoff_factor=conf.poller_backoff_factor, max_delay=conf.poller_max_delay)
 
-                    # update to result detail
-                    print("Sent!")
-                    self.cursor.execute('UPDATE result_header SET job_id = %s, status = "pending", updated_datetime = NOW() WHERE id = %s', (job_id, header_id))
+            # update to result detail
+            print("Sent!")
+            self.cursor.execute("UPDATE result_header SET job_id = %s, status = 'pending', updated_datetime = NOW() WHERE id = %s", (job_id, header_id))
 
-                    self.conn.commit()
-
-                except Exception as e:
-                    print(f"An error occurred: {str(e)}. Will try again in 30 seconds...")
-
-                    for i in range(30, 0, -1):
-                        time.sleep(1)
-                        print(i)
+            self.conn.commit()
 
         if debug: tmp_end_time = time.perf_counter()
         if debug: print("Time for sending to real backend: {} seconds".format(tmp_end_time - tmp_start_time))
@@ -249,7 +388,7 @@ class NAPC:
 
                     # update to result detail
                     print("Sent!")
-                    self.cursor.execute('UPDATE result_header SET job_id = %s, status = "pending", updated_datetime = NOW() WHERE id = %s', ("simulator", header_id))
+                    self.cursor.execute("UPDATE result_header SET job_id = %s, status = 'pending', updated_datetime = NOW() WHERE id = %s", ("simulator", header_id))
 
                     self.conn.commit()
 
@@ -267,19 +406,86 @@ class NAPC:
         print(file_path)
         return glob.glob(os.path.expanduser(os.path.join(file_path, "*.qasm")))
 
-    def compile(self, qasm, compilation_name, noise_level=None):
-
+    def compile(self, qasm, compilation_name, noise_level=None, noise_levels=None):
+        """
+        Compiles the circuit once, and inserts a result_detail for each of the noise_levels 
+        (or only for noise_level)
+        """
         updated_qasm = ""
         initial_mapping = ""
         if "qiskit" in compilation_name:
-            updated_qasm, initial_mapping = self.apply_qiskit(qasm=qasm,  compilation_name=compilation_name, noise_level=noise_level)
+            updated_qasm, initial_mapping = self.apply_qiskit(qasm=qasm,  compilation_name=compilation_name, noise_level=noise_level, 
+                                                              noise_levels=noise_levels)
         elif "triq" in compilation_name:
             tmp = compilation_name.split("_")
             layout = tmp[2]
             compilation = tmp[0] + "_" + tmp[1]
-            updated_qasm, initial_mapping = self.apply_triq(qasm=qasm, compilation_name=compilation, layout=layout, noise_level=noise_level)
+            updated_qasm, initial_mapping = self.apply_triq(qasm=qasm, compilation_name=compilation, layout=layout, noise_level=noise_level, 
+                                                            noise_levels=noise_levels)
 
         return updated_qasm, initial_mapping
+
+    def compile_parallel(self, circuits, compilations, noise_levels = [None], workers = None):
+        """
+        Compiles the grid circuits x compilations in a pool of processes, and inserts all the 
+        compiled circuits into result_detail in one batch, one row per noise level. The 
+        circuits already in the compile cache are not sent to the pool.
+
+        circuits: list of (circuit_name, qasm)
+        """
+        if workers is None:
+            workers = conf.compiler_workers
+
+        # the noise level only matters for the simulation, each circuit is compiled once
+        # the circuits found in the cache keep their place in the grid (with the lookup time 
+        # as compilation time, and flagged as cached), the others are compiled
+        compiled_tasks = []
+        tasks = []
+        missing = []
+        for circuit_name, qasm in circuits:
+            for comp in compilations:
+                key = get_compile_cache_key(qasm, comp, self.hw_name, conf.triq_measurement_type, self.calibration_id)
+                tmp_start_time  = time.perf_counter()
+                compiled = compile_cache.get(key)
+                if compiled is not None:
+                    tmp_end_time = time.perf_counter()
+                    compiled = (circuit_name, get_detail_compilation_name(comp), compiled[0], tmp_end_time - tmp_start_time) + \
+                        tuple(compiled[2:]) + (True, )
+                else:
+                    tasks.append((circuit_name, qasm, comp))
+                    missing.append((len(compiled_tasks), key))
+                compiled_tasks.append(compiled)
+
+        tmp_start_time  = time.perf_counter()
+        if len(tasks) > 0:
+            # the runtime backend cannot be sent to the workers, they get a snapshot of it 
+            # (configuration, properties and target) instead
+            backend = runtime_wrapper.get_backend_snapshot(self.real_backend)
+
+            with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_compile_worker, 
+                                     initargs=(backend, self.hw_name, conf.triq_measurement_type, self.calibration_id)) as executor:
+                for (idx, key), compiled in zip(missing, executor.map(compile_task, tasks)):
+                    if compiled is not None:
+                        compile_cache.put(key, compiled[2:])
+                        compiled = compiled + (False, )
+                    compiled_tasks[idx] = compiled
+        tmp_end_time = time.perf_counter()
+
+        wall_time = tmp_end_time - tmp_start_time
+        total_compilation_time = sum(compiled_tasks[idx][3] for idx, _ in missing if compiled_tasks[idx] is not None)
+        print("Compiled {} circuits in {:.2f} seconds (sum of the compilation times: {:.2f} seconds), {} from the cache".format(
+            len(tasks), wall_time, total_compilation_time, len(compiled_tasks) - len(tasks)))
+
+        compiled_tasks = [compiled for compiled in compiled_tasks if compiled is not None]
+
+        compiled_circuits = [(circuit_name, noise_level, compilation_name) + tuple(compiled) 
+                             for circuit_name, compilation_name, *compiled in compiled_tasks
+                             for noise_level in noise_levels]
+
+        database_wrapper.insert_to_result_detail_batch(self.conn, self.cursor, self.header_id, conf.noisy_simulator, 
+                                                       compiled_circuits)
+
+        return compiled_circuits
     
 
 #region Run
@@ -297,19 +503,28 @@ class NAPC:
         self.header_id = database_wrapper.init_result_header(self.cursor, self.user_id, hardware_name = hardware_name,
                                                                  token=self.token, shots=shots, program_type=program_type)
 
-        for idx, qasm in enumerate(qasm_files):
-            qc = self.get_circuit_properties(qasm_source=qasm)
+        if conf.compiler_execution_mode == "process":
+            circuits = []
+            for qasm in qasm_files:
+                qc = self.get_circuit_properties(qasm_source=qasm)
+                circuits.append((self.circuit_name, qc.qasm_original))
 
-            for comp in compilations:
+            self.compile_parallel(circuits, compilations, noise_levels)
+
+            # Send to local simulator
+            self.run_on_noisy_simulator_local()
 
-                for noise_level in noise_levels:
-                    print(comp, noise_level)
-                    noise_model, noisy_simulator, coupling_map = qiskit_wrapper.get_noisy_simulator(self.real_backend, noise_level)
+            return
 
-                    # set the backend and the program
-                    self.set_backend(program_type=program_type, backend=noisy_simulator, shots=shots)
+        # the header and all its details are committed once
+        with database_wrapper.transaction(self.conn):
+            for idx, qasm in enumerate(qasm_files):
+                qc = self.get_circuit_properties(qasm_source=qasm)
 
-                    updated_qasm, initial_mapping = self.compile(qasm=qc.qasm_original, compilation_name=comp, noise_level=noise_level)
+                for comp in compilations:
+                    # the noise level only matters for the simulation: compile once for all of them
+                    print(comp, noise_levels)
+                    updated_qasm, initial_mapping = self.compile(qasm=qc.qasm_original, compilation_name=comp, noise_levels=noise_levels)
 
         # Send to local simulator
         self.run_on_noisy_simulator_local()
@@ -324,16 +539,26 @@ class NAPC:
         # init header
         self.header_id = database_wrapper.init_result_header(self.cursor, self.user_id, hardware_name=hardware_name, token=self.token, shots=shots)
 
-        for qasm in qasm_files:
-            skip = False
-            if "polar" in qasm:
-                skip = True
+        circuits = []
+        # the header and all its details are committed once
+        with database_wrapper.transaction(self.conn):
+            for qasm in qasm_files:
+                skip = False
+                if "polar" in qasm:
+                    skip = True
 
-            qc = self.get_circuit_properties(qasm_source=qasm)
-            
-            for comp in compilations:
-                print("Compiling circuit: {} for compilation: {}".format(self.circuit_name, comp))
-                self.compile(qasm=qc.qasm_original, compilation_name=comp)
+                qc = self.get_circuit_properties(qasm_source=qasm)
+
+                if conf.compiler_execution_mode == "process":
+                    circuits.append((self.circuit_name, qc.qasm_original))
+                    continue
+                
+                for comp in compilations:
+                    print("Compiling circuit: {} for compilation: {}".format(self.circuit_name, comp))
+                    self.compile(qasm=qc.qasm_original, compilation_name=comp)
+
+        if conf.compiler_execution_mode == "process":
+            self.compile_parallel(circuits, compilations)
 
 
         # Send to backend
@@ -342,39 +567,48 @@ class NAPC:
                 
 #endregion
 
-    def get_qiskit_result(self, type=None, noisy_simulator=None):
+    def get_qiskit_result(self, type=None, noisy_simulator=None, get_service=None):
+        '''
+        Stores the results of the pending jobs: the simulator jobs are run one after the 
+        other, the jobs of the real backends are checked concurrently by a JobPoller.
+        get_service(qiskit_token) returns the runtime service of a token (default: the
+        service registry of the process, e.g. a FakeRuntimeService to try it locally)
+        '''
         pending_jobs = database_wrapper.get_pending_jobs()
-            
-        tmp_qiskit_token = ""
-        header_id, job_id, qiskit_token = None, None, None
-        service = None
+
+        if get_service is None:
+            get_service = runtime_wrapper.get_service
+
+        services = {}
+        real_jobs = []
         
         print('Pending jobs: ', len(pending_jobs))
         for result in pending_jobs:
             header_id, job_id, qiskit_token, hw_name = result
 
-            # print("processing...", header_id, job_id, qiskit_token)
-
             if type == "simulator" and job_id != "simulator":
                 continue
 
             if type == "real" and job_id == "simulator":
                 continue
 
-            if tmp_qiskit_token == "" or tmp_qiskit_token != qiskit_token:
-                QiskitRuntimeService.save_account(channel="ibm_quantum", token=qiskit_token, overwrite=True)
-                service = QiskitRuntimeService(channel="ibm_quantum", token=qiskit_token)
+            if qiskit_token not in services:
+                services[qiskit_token] = get_service(qiskit_token)
+            service = services[qiskit_token]
 
             if job_id == "simulator":
                 process_simulator(service, header_id, job_id, hw_name, noisy_simulator=noisy_simulator)
             else:
-                job = service.job(job_id)
-                print("Checking results for: ", job_id, "with header id :", header_id, qiskit_token)
+                print("Checking results for: ", job_id, "with header id :", header_id)
+                real_jobs.append((header_id, job_id, service))
 
-                if check_result_availability(job, header_id):
-                    get_result(job)
+        if len(real_jobs) > 0:
+            poller = JobPoller(max_concurrency=conf.poller_concurrency, initial_delay=conf.poller_initial_delay, 
+                               backoff_factor=conf.poller_backoff_factor, max_delay=conf.poller_max_delay, 
+                               timeout=conf.poller_timeout)
+            job_states = poller.poll(real_jobs, on_result=get_result, on_error=set_job_error)
 
-            tmp_qiskit_token = qiskit_token
+            print('Jobs still pending :', sum(1 for state in job_states.values() if state is None))
 
         executed_jobs = database_wrapper.get_executed_jobs()
         print('Executed jobs :', len(executed_jobs))
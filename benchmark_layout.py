@@ -0,0 +1,72 @@
+"""
+file name: benchmark_layout.py
+author: Handy
+date: 18 October 2026
+
+Times the initial layout given to TriQ (get_initial_mapping_sabre): the full level 3
+pass manager it used to run, the init and layout stages only, and a hit of the layout
+cache. By default the backend is Fake127QPulseV1 (properties of a real 127-qubit IBM
+device), --hw-name uses a backend of the IBM service with the token of config.ini:
+
+    python benchmark_layout.py
+    python benchmark_layout.py --hw-name ibm_sherbrooke QEC/polar_code/n4/x/polar_all_meas_n4_x.qasm
+"""
+import time
+import argparse
+import statistics
+
+from qiskit import QuantumCircuit
+from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
+
+from commons import conf
+import wrappers.qiskit_wrapper.qiskit_wrapper as qiskit_wrapper
+
+default_qasm_files = ["QEC/polar_code/n3/x/polar_all_meas_n3_x.qasm", "QEC/polar_code/n3/z/polar_all_meas_n3.qasm",
+                      "QEC/polar_code/n4/x/polar_all_meas_n4_x.qasm", "QEC/polar_code/n4/z/polar_all_meas_n4.qasm"]
+
+def get_median_time(function, repeat):
+    times = []
+    for _ in range(repeat):
+        tmp_start_time = time.perf_counter()
+        function()
+        tmp_end_time = time.perf_counter()
+        times.append(tmp_end_time - tmp_start_time)
+
+    return statistics.median(times)
+
+def benchmark_layout(backend, qasm_files, repeat = 3):
+    '''
+    Returns {qasm file: (full pass manager, layout stages, cache hit)}, median seconds
+    '''
+    timings = {}
+    for qasm_file in qasm_files:
+        with open(qasm_file, "r") as file:
+            qasm = file.read()
+        circuit = QuantumCircuit.from_qasm_str(qasm)
+
+        full_time = get_median_time(lambda: generate_preset_pass_manager(optimization_level=3, backend=backend).run(circuit), repeat)
+        layout_time = get_median_time(lambda: qiskit_wrapper.get_layout_pass_manager(backend).run(circuit), repeat)
+
+        qiskit_wrapper.get_initial_mapping_sabre(qasm, backend)
+        cache_time = get_median_time(lambda: qiskit_wrapper.get_initial_mapping_sabre(qasm, backend), repeat)
+
+        timings[qasm_file] = (full_time, layout_time, cache_time)
+        print("{}: full {:.3f}s, layout {:.3f}s, cache hit {:.6f}s".format(qasm_file, full_time, layout_time, cache_time))
+
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the initial layout of the circuits for TriQ")
+    parser.add_argument("--hw-name", default=None, help="backend of the IBM service (default: Fake127QPulseV1)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each measurement, the median is printed")
+    parser.add_argument("qasm_files", nargs="*", help="circuits (default: the polar codes n = 3 and 4)")
+    args = parser.parse_args()
+
+    if args.hw_name is None:
+        from qiskit.providers.fake_provider import Fake127QPulseV1
+        backend = Fake127QPulseV1()
+    else:
+        import wrappers.runtime_wrapper as runtime_wrapper
+        backend = runtime_wrapper.get_backend(conf.qiskit_token, args.hw_name)
+
+    benchmark_layout(backend, args.qasm_files or default_qasm_files, args.repeat)
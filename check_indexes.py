@@ -0,0 +1,72 @@
+"""
+file name: check_indexes.py
+author: Handy
+date: 18 October 2026
+
+Runs EXPLAIN on the queries of the scheduler and lists the tables they read with a
+full scan, e.g. when the indexes of mariadb/migrations/003_scheduler_indexes.sql are
+missing. Works with both backends of [StorageConfig] (MySQL/MariaDB and SQLite).
+"""
+import sys
+import wrappers.database_wrapper as database_wrapper
+from commons import conf
+
+# query, sample parameters (the plan does not depend on the values)
+scheduler_queries = {
+    "header_with_null_job": (database_wrapper.sql_header_with_null_job, ()),
+    "compiled_details": (database_wrapper.sql_compiled_details, (1, )),
+    "pending_jobs": (database_wrapper.sql_pending_jobs, ("pending", )),
+    "executed_jobs": (database_wrapper.sql_executed_jobs, ("executed", )),
+    "job_details": (database_wrapper.sql_job_details, ("pending", "job_id")),
+    "simulator_details": (database_wrapper.sql_simulator_details, ("pending", "simulator", 1)),
+    "metric_details": (database_wrapper.sql_metric_details, ("executed", "job_id", 1)),
+}
+
+def explain_mysql(cursor, sql, params):
+    # EXPLAIN rows: id, select_type, table, type, possible_keys, key, key_len, ref, rows, Extra
+    cursor.execute("EXPLAIN " + sql, params)
+    plan = []
+    for row in cursor.fetchall():
+        table, access_type, key = row[2], row[3], row[5]
+        plan.append((table, "{} (key: {})".format(access_type, key), access_type == "ALL"))
+
+    return plan
+
+def explain_sqlite(cursor, sql, params):
+    # EXPLAIN QUERY PLAN rows: id, parent, notused, detail ("SCAN x" or "SEARCH x USING INDEX ...")
+    cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+    plan = []
+    for row in cursor.fetchall():
+        detail = row[3]
+        words = detail.split()
+        table = words[1] if len(words) > 1 else ""
+        plan.append((table, detail, words[0] == "SCAN"))
+
+    return plan
+
+def check_indexes(verbose=True):
+    '''
+    Returns the names of the queries with a full table scan
+    '''
+    explain = explain_sqlite if conf.database_backend == "sqlite" else explain_mysql
+
+    full_scans = []
+    with database_wrapper.transaction() as (conn, cursor):
+        for name, (sql, params) in scheduler_queries.items():
+            plan = explain(cursor, sql, params)
+            is_full_scan = any(full_scan for _, _, full_scan in plan)
+            if is_full_scan:
+                full_scans.append(name)
+
+            if verbose:
+                print("{}: {}".format(name, "FULL SCAN" if is_full_scan else "ok"))
+                for table, detail, full_scan in plan:
+                    print("    {} {}{}".format(table, detail, " <-" if full_scan else ""))
+
+    return full_scans
+
+if __name__ == "__main__":
+    full_scans = check_indexes()
+    if len(full_scans) > 0:
+        print("Queries with a full table scan:", ", ".join(full_scans))
+        sys.exit(1)
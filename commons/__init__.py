@@ -1,12 +1,14 @@
-from .commons import read_file, convert_to_json, normalize_counts, Config, \
+from .commons import read_file, convert_to_json, normalize_counts, Config, conf, \
     convert_utc_to_local, calculate_time_diff, get_count_1q, get_count_2q, \
     get_initial_mapping_json, convert_dict_int_to_binary, convert_dict_binary_to_int, reverse_string_keys
+from .counts import Counts, average_counts
 
 __all__ = [
     "read_file",
     "convert_to_json",
     "normalize_counts",
     "Config",
+    "conf",
     "convert_utc_to_local",
     "calculate_time_diff",
     "get_count_1q",
@@ -15,4 +17,6 @@ __all__ = [
     "convert_dict_int_to_binary",
     "convert_dict_binary_to_int",
     "reverse_string_keys",
+    "Counts",
+    "average_counts",
 ]
\ No newline at end of file
@@ -23,6 +23,7 @@ class Config:
             'host': self.config_parser['MySQLConfig']['host'],
             'database': self.config_parser['MySQLConfig']['database']
         }
+        self.mysql_pool_size = int(self.config_parser.get('MySQLConfig', 'pool_size', fallback="5"))
 
         self.bit_format = self.config_parser['MathConfig']['bit_format']
 
@@ -38,7 +39,43 @@ class Config:
         self.user_id = int(self.config_parser[quantum_config_name]['user_id'])
         self.triq_measurement_type = self.config_parser[quantum_config_name]['triq_measurement_type']
         self.noisy_simulator = True if self.config_parser[quantum_config_name]['noisy_simulator'] == "1" else False
+
+        polar_config_name = "PolarConfig"
+
+        self.polar_lookup_table = True if self.config_parser.get(polar_config_name, 'lookup_table', fallback="0") == "1" else False
+        self.polar_lookup_table_dir = self.config_parser.get(polar_config_name, 'lookup_table_dir', fallback="") or None
+
+        simulator_config_name = "SimulatorConfig"
+
+        self.simulator_method = self.config_parser.get(simulator_config_name, 'method', fallback="aer")
+        self.noisy_simulator_cache_size = int(self.config_parser.get(simulator_config_name, 'noisy_simulator_cache_size', fallback="8"))
+        self.simulator_execution_mode = self.config_parser.get(simulator_config_name, 'execution_mode', fallback="serial")
+        self.simulator_workers = int(self.config_parser.get(simulator_config_name, 'workers', fallback="0"))
+
+        storage_config_name = "StorageConfig"
+
+        self.storage_compact = True if self.config_parser.get(storage_config_name, 'compact', fallback="0") == "1" else False
+        self.database_backend = self.config_parser.get(storage_config_name, 'backend', fallback="mysql")
+        self.sqlite_path = self.config_parser.get(storage_config_name, 'sqlite_path', fallback="") or None
+
+        compiler_config_name = "CompilerConfig"
+
+        self.compiler_execution_mode = self.config_parser.get(compiler_config_name, 'execution_mode', fallback="serial")
+        self.compiler_workers = int(self.config_parser.get(compiler_config_name, 'workers', fallback="0"))
+        self.compiler_cache = True if self.config_parser.get(compiler_config_name, 'cache', fallback="0") == "1" else False
+        self.compiler_cache_dir = self.config_parser.get(compiler_config_name, 'cache_dir', fallback="") or None
+        self.compiler_cache_size_mb = float(self.config_parser.get(compiler_config_name, 'cache_size_mb', fallback="256"))
+        self.calibration_history_size = int(self.config_parser.get(compiler_config_name, 'calibration_history', fallback="10"))
+
+        poller_config_name = "PollerConfig"
+
+        self.poller_concurrency = int(self.config_parser.get(poller_config_name, 'concurrency', fallback="8"))
+        self.poller_initial_delay = float(self.config_parser.get(poller_config_name, 'initial_delay', fallback="5"))
+        self.poller_backoff_factor = float(self.config_parser.get(poller_config_name, 'backoff_factor', fallback="2"))
+        self.poller_max_delay = float(self.config_parser.get(poller_config_name, 'max_delay', fallback="60"))
+        self.poller_timeout = float(self.config_parser.get(poller_config_name, 'timeout', fallback="300"))
         
+# configuration of the process, config.ini is parsed once and shared by all the modules
 conf = Config()
 
 
@@ -0,0 +1,229 @@
+"""
+file name: counts.py
+author: Handy
+date: 18 October 2026
+
+Compact histogram of measurement outcomes: the distinct outcomes are stored as rows
+of packed bits (big-endian, the same layout as the qiskit BitArray) next to a vector
+of counts. Bit reversal and width changes are done on the whole array at once, so
+the histograms do not go through strings between the backend, the database and the
+decoders.
+"""
+import json
+import numpy as np
+
+def _num_bytes(width):
+    return (width + 7) // 8
+
+class Counts:
+    def __init__(self, data, counts, width):
+        """
+        data: np array of uint8 of shape (number of outcomes, ceil(width / 8)), each row
+        is an outcome as a big-endian integer. counts: count (or probability) of each row
+        """
+        self.counts = np.asarray(counts)
+        self.width = width
+
+        data = np.asarray(data, dtype=np.uint8)
+        if data.size != len(self.counts) * _num_bytes(width):
+            raise ValueError("The number of outcomes and counts must be the same")
+        self.data = data.reshape(len(self.counts), _num_bytes(width))
+
+    # ##################################################################
+    # constructors
+    # ##################################################################
+    @classmethod
+    def from_bit_matrix(cls, bits, counts):
+        """
+        One row per outcome, one column per bit, most significant bit first (the same
+        order as the bitstring)
+        """
+        bits = np.asarray(bits, dtype=np.uint8)
+        width = bits.shape[1]
+        pad = _num_bytes(width) * 8 - width
+        if pad > 0:
+            bits = np.concatenate((np.zeros((len(bits), pad), dtype=np.uint8), bits), axis=1)
+
+        return cls(np.packbits(bits, axis=1), counts, width)
+
+    @classmethod
+    def from_int_keys(cls, keys, counts, width):
+        """
+        Outcomes given as integers (python int, or decimal strings as stored in the
+        database). The keys must fit in width bits.
+        """
+        keys = list(keys)
+        nbytes = _num_bytes(width)
+
+        if width <= 64:
+            int_keys = np.array([int(key) for key in keys], dtype=np.uint64)
+            if width < 64 and (int_keys >> np.uint64(width)).any():
+                raise ValueError("Outcome does not fit in {} bits".format(width))
+            data = int_keys.astype(">u8").view(np.uint8).reshape(-1, 8)[:, 8 - nbytes:]
+        else:
+            try:
+                data = b"".join(int(key).to_bytes(nbytes, "big") for key in keys)
+            except OverflowError:
+                raise ValueError("Outcome does not fit in {} bits".format(width))
+            data = np.frombuffer(data, dtype=np.uint8)
+
+        return cls(data, counts, width)
+
+    @classmethod
+    def from_dict(cls, results, width=None):
+        """
+        Converts a histogram {bitstring: count}, as returned by get_counts(), or an
+        integer-keyed histogram {int: count} (then the width must be given)
+        """
+        if isinstance(results, Counts):
+            return results if width is None or width == results.width else results.resized(width)
+
+        keys = list(results.keys())
+        counts = np.array(list(results.values()))
+
+        if len(keys) > 0 and isinstance(keys[0], str) and width is None:
+            keys = [key.replace(" ", "") for key in keys]
+            width = len(keys[0])
+            if any(len(key) != width for key in keys):
+                raise TypeError("Illegal measurement result: all results must have the same length")
+
+            # convert all the strings at once, from ascii codes to np array
+            bits = np.frombuffer("".join(keys).encode("ascii"), dtype=np.uint8) - ord('0')
+            if (bits > 1).any():
+                raise TypeError("Illegal measurement result: must be 0 or 1")
+
+            return cls.from_bit_matrix(bits.reshape(len(keys), width), counts)
+
+        if len(keys) == 0 and width is None:
+            width = 0
+        elif width is None:
+            raise ValueError("The width is needed for integer outcomes")
+
+        return cls.from_int_keys(keys, counts, width)
+
+    @classmethod
+    def from_json(cls, counts_json, width):
+        # histogram stored in the database, {decimal string: count or probability}
+        return cls.from_dict(json.loads(counts_json), width)
+
+    @classmethod
+    def from_bit_array(cls, bit_array):
+        """
+        Histogram of the shots of a qiskit BitArray (result of the SamplerV2)
+        """
+        data = bit_array.array.reshape(-1, bit_array.array.shape[-1])
+        data, counts = np.unique(data, axis=0, return_counts=True)
+        return cls(data, counts, bit_array.num_bits)
+
+    @classmethod
+    def from_result(cls, result, width, experiment=0):
+        """
+        Histogram of an experiment of a qiskit Result (AerSimulator), read from the
+        hexadecimal counts instead of the formatted bitstrings
+        """
+        hex_counts = result.data(experiment)["counts"]
+        keys = [int(key, 16) for key in hex_counts.keys()]
+        return cls.from_int_keys(keys, list(hex_counts.values()), width)
+
+    # ##################################################################
+    # conversions
+    # ##################################################################
+    def __len__(self):
+        return len(self.counts)
+
+    @property
+    def total(self):
+        return self.counts.sum().item() if len(self.counts) > 0 else 0
+
+    @property
+    def keys(self):
+        """
+        Outcomes as packed integers (np array of uint64), only for width <= 64
+        """
+        if self.width > 64:
+            raise ValueError("Outcomes of {} bits do not fit in 64 bits".format(self.width))
+
+        nbytes = self.data.shape[1]
+        data = np.zeros((len(self.data), 8), dtype=np.uint8)
+        data[:, 8 - nbytes:] = self.data
+        return data.view(">u8").ravel().astype(np.uint64)
+
+    def bit_matrix(self):
+        """
+        One row per outcome, one column per bit, most significant bit first
+        """
+        bits = np.unpackbits(self.data, axis=1)
+        return bits[:, bits.shape[1] - self.width:]
+
+    def reversed(self):
+        # reverses the bit order of every outcome
+        return Counts.from_bit_matrix(self.bit_matrix()[:, ::-1], self.counts)
+
+    def resized(self, width):
+        """
+        Changes the width of the outcomes: drops the most significant bits, or pads with
+        zeros. Outcomes that become equal are merged.
+        """
+        bits = self.bit_matrix()
+        if width <= self.width:
+            bits = bits[:, self.width - width:]
+        else:
+            bits = np.concatenate((np.zeros((len(bits), width - self.width), dtype=np.uint8), bits), axis=1)
+
+        return Counts.from_bit_matrix(bits, self.counts).merged()
+
+    def merged(self):
+        # sums the counts of equal outcomes
+        data, inverse = np.unique(self.data, axis=0, return_inverse=True)
+        counts = np.zeros(len(data), dtype=self.counts.dtype)
+        np.add.at(counts, inverse.ravel(), self.counts)
+        return Counts(data, counts, self.width)
+
+    def normalized(self, shots=None):
+        shots = self.total if shots is None else shots
+        return Counts(self.data, self.counts / shots, self.width)
+
+    def scaled(self, factor):
+        return Counts(self.data, self.counts * factor, self.width)
+
+    def int_keys(self):
+        if self.width <= 64:
+            return self.keys.tolist()
+
+        return [int.from_bytes(row.tobytes(), "big") for row in self.data]
+
+    def to_int_dict(self):
+        # {int: count}, keys as strings, the format stored in the database
+        return {str(key): value for key, value in zip(self.int_keys(), self.counts.tolist())}
+
+    def to_dict(self):
+        # {bitstring: count}, most significant bit first
+        bits = self.bit_matrix() + ord('0')
+        keys = bits.astype(np.uint8).tobytes().decode("ascii")
+        keys = [keys[i*self.width:(i+1)*self.width] for i in range(len(self))]
+        return dict(zip(keys, self.counts.tolist()))
+
+    def __repr__(self):
+        return "Counts(outcomes={}, width={}, total={})".format(len(self), self.width, self.total)
+
+def average_counts(counts_list, shots):
+    """
+    Average probability of each outcome over several runs of the same circuit, and its
+    standard deviation over the runs in which the outcome appears
+    """
+    width = counts_list[0].width
+    data = np.concatenate([counts.data for counts in counts_list])
+    runs = np.concatenate([np.full(len(counts), i) for i, counts in enumerate(counts_list)])
+    probs = np.concatenate([counts.counts / shots for counts in counts_list])
+
+    data, inverse = np.unique(data, axis=0, return_inverse=True)
+    matrix = np.zeros((len(data), len(counts_list)))
+    present = np.zeros((len(data), len(counts_list)), dtype=bool)
+    matrix[inverse.ravel(), runs] = probs
+    present[inverse.ravel(), runs] = True
+
+    mean = matrix.sum(axis=1) / len(counts_list)
+    present_mean = matrix.sum(axis=1) / present.sum(axis=1)
+    std = np.sqrt(((matrix - present_mean[:, None])**2 * present).sum(axis=1) / present.sum(axis=1))
+
+    return Counts(data, mean, width), Counts(data, std, width)
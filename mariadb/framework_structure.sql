@@ -110,6 +110,7 @@ CREATE TABLE `ibm` (
   KEY `idx_hw_name` (`hw_name`),
   KEY `idx_ibm_hw_calibration` (`calibration_id`,`hw_name`),
   KEY `idx_ibm_calibration_hw` (`calibration_id`,`hw_name`,`calibration_datetime`),
+  KEY `idx_ibm_hw_datetime` (`hw_name`,`calibration_datetime`),
   CONSTRAINT `fk_ibm_1` FOREIGN KEY (`hw_name`) REFERENCES `hardware` (`hw_name`)
 ) ENGINE=InnoDB AUTO_INCREMENT=36540 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -242,7 +243,7 @@ CREATE TABLE `metric` (
   `detection_time` int(11) DEFAULT NULL,
   `decoding_time` int(11) DEFAULT NULL,
   PRIMARY KEY (`id`),
-  KEY `fk_metric_1_idx` (`detail_id`),
+  UNIQUE KEY `uk_metric_detail_id` (`detail_id`),
   CONSTRAINT `fk_metric_1` FOREIGN KEY (`detail_id`) REFERENCES `result_detail` (`id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=7 DEFAULT CHARSET=latin1 COLLATE=latin1_swedish_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -281,7 +282,9 @@ SET character_set_client = utf8;
   1 AS `shots`,
   1 AS `mapping_json`,
   1 AS `initial_mapping`,
-  1 AS `final_mapping` */;
+  1 AS `final_mapping`,
+  1 AS `updated_qasm_bin`,
+  1 AS `quasi_dists_bin` */;
 SET character_set_client = @saved_cs_client;
 
 --
@@ -299,8 +302,11 @@ CREATE TABLE `result_backend_json` (
   `qasm` longtext DEFAULT NULL,
   `shots` int(11) DEFAULT NULL,
   `mapping_json` longtext DEFAULT NULL,
+  `quasi_dists_bin` longblob DEFAULT NULL,
+  `quasi_dists_std_bin` longblob DEFAULT NULL,
+  `qasm_bin` longblob DEFAULT NULL,
   PRIMARY KEY (`id`),
-  KEY `fk_result_backend_json_1_idx` (`detail_id`),
+  UNIQUE KEY `uk_result_backend_json_detail_id` (`detail_id`),
   CONSTRAINT `fk_result_backend_json_1` FOREIGN KEY (`detail_id`) REFERENCES `result_detail` (`id`)
 ) ENGINE=InnoDB AUTO_INCREMENT=7 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
@@ -324,6 +330,7 @@ CREATE TABLE `result_detail` (
   `noise_level` float DEFAULT NULL,
   `created_datetime` datetime DEFAULT NULL,
   `updated_datetime` float DEFAULT NULL,
+  `compilation_cached` tinyint(1) unsigned DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `fk_result_detail_1_idx` (`header_id`),
   KEY `fk_result_detail_2_idx` (`circuit_name`),
@@ -363,6 +370,8 @@ CREATE TABLE `result_header` (
   PRIMARY KEY (`id`),
   KEY `fk_result_header_1_idx` (`user_id`),
   KEY `fk_result_header_2_idx` (`hw_name`),
+  KEY `idx_result_header_status_job` (`status`,`job_id`),
+  KEY `idx_result_header_job_id` (`job_id`),
   CONSTRAINT `fk_result_header_1` FOREIGN KEY (`user_id`) REFERENCES `user` (`user_id`) ON DELETE NO ACTION ON UPDATE NO ACTION,
   CONSTRAINT `fk_result_header_2` FOREIGN KEY (`hw_name`) REFERENCES `hardware` (`hw_name`)
 ) ENGINE=InnoDB AUTO_INCREMENT=4 DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
@@ -379,6 +388,7 @@ CREATE TABLE `result_updated_qasm` (
   `id` int(11) NOT NULL AUTO_INCREMENT,
   `detail_id` int(11) DEFAULT NULL,
   `updated_qasm` longtext DEFAULT NULL,
+  `updated_qasm_bin` longblob DEFAULT NULL,
   PRIMARY KEY (`id`),
   KEY `fk_result_updated_qasm_1_idx` (`detail_id`),
   CONSTRAINT `fk_result_updated_qasm_1` FOREIGN KEY (`detail_id`) REFERENCES `result_detail` (`id`)
@@ -458,7 +468,7 @@ CREATE TABLE `user` (
 /*!50001 SET collation_connection      = utf8mb4_general_ci */;
 /*!50001 CREATE ALGORITHM=UNDEFINED */
 /*!50013 DEFINER=`handy`@`%` SQL SECURITY DEFINER */
-/*!50001 VIEW `result` AS select `h`.`id` AS `header_id`,`h`.`user_id` AS `user_id`,`h`.`hw_name` AS `hw_name`,`h`.`qiskit_token` AS `qiskit_token`,`h`.`job_id` AS `job_id`,`h`.`status` AS `status`,`d`.`circuit_name` AS `circuit_name`,`d`.`id` AS `detail_id`,`d`.`compilation_name` AS `compilation_name`,`d`.`noisy_simulator` AS `noisy_simulator`,`d`.`noise_level` AS `noise_level`,`q`.`updated_qasm` AS `updated_qasm`,`c`.`qasm` AS `original_qasm`,`c`.`qubit` AS `qubit`,`m`.`circuit_depth` AS `circuit_depth`,`m`.`total_two_qubit_gate` AS `total_two_qubit_gate`,`m`.`polar_count_accept` AS `polar_count_accept`,`m`.`polar_count_logerror` AS `polar_count_logerror`,`m`.`polar_count_undecided` AS `polar_count_undecided`,`m`.`success_rate_polar` AS `success_rate_polar`,`c`.`correct_output` AS `correct_output`,`j`.`quasi_dists` AS `quasi_dists`,`j`.`shots` AS `shots`,`j`.`mapping_json` AS `mapping_json`,`d`.`initial_mapping` AS `initial_mapping`,`d`.`final_mapping` AS `final_mapping` from (((((`result_header` `h` join `result_detail` `d` on(`h`.`id` = `d`.`header_id`)) left join `result_backend_json` `j` on(`j`.`detail_id` = `d`.`id`)) left join `result_updated_qasm` `q` on(`q`.`detail_id` = `d`.`id`)) join `circuit` `c` on(`d`.`circuit_name` = `c`.`name`)) left join `metric` `m` on(`d`.`id` = `m`.`detail_id`)) */;
+/*!50001 VIEW `result` AS select `h`.`id` AS `header_id`,`h`.`user_id` AS `user_id`,`h`.`hw_name` AS `hw_name`,`h`.`qiskit_token` AS `qiskit_token`,`h`.`job_id` AS `job_id`,`h`.`status` AS `status`,`d`.`circuit_name` AS `circuit_name`,`d`.`id` AS `detail_id`,`d`.`compilation_name` AS `compilation_name`,`d`.`noisy_simulator` AS `noisy_simulator`,`d`.`noise_level` AS `noise_level`,`q`.`updated_qasm` AS `updated_qasm`,`c`.`qasm` AS `original_qasm`,`c`.`qubit` AS `qubit`,`m`.`circuit_depth` AS `circuit_depth`,`m`.`total_two_qubit_gate` AS `total_two_qubit_gate`,`m`.`polar_count_accept` AS `polar_count_accept`,`m`.`polar_count_logerror` AS `polar_count_logerror`,`m`.`polar_count_undecided` AS `polar_count_undecided`,`m`.`success_rate_polar` AS `success_rate_polar`,`c`.`correct_output` AS `correct_output`,`j`.`quasi_dists` AS `quasi_dists`,`j`.`shots` AS `shots`,`j`.`mapping_json` AS `mapping_json`,`d`.`initial_mapping` AS `initial_mapping`,`d`.`final_mapping` AS `final_mapping`,`q`.`updated_qasm_bin` AS `updated_qasm_bin`,`j`.`quasi_dists_bin` AS `quasi_dists_bin` from (((((`result_header` `h` join `result_detail` `d` on(`h`.`id` = `d`.`header_id`)) left join `result_backend_json` `j` on(`j`.`detail_id` = `d`.`id`)) left join `result_updated_qasm` `q` on(`q`.`detail_id` = `d`.`id`)) join `circuit` `c` on(`d`.`circuit_name` = `c`.`name`)) left join `metric` `m` on(`d`.`id` = `m`.`detail_id`)) */;
 /*!50001 SET character_set_client      = @saved_cs_client */;
 /*!50001 SET character_set_results     = @saved_cs_results */;
 /*!50001 SET collation_connection      = @saved_col_connection */;
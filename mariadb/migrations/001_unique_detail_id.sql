@@ -0,0 +1,19 @@
+-- Unique detail_id on result_backend_json and metric, needed by the bulk upserts
+-- (INSERT ... ON DUPLICATE KEY UPDATE) of the scheduler.
+-- Duplicated rows of the same detail are removed first, the last one is kept.
+
+USE `framework`;
+
+DELETE j1 FROM `result_backend_json` j1
+INNER JOIN `result_backend_json` j2 ON j1.`detail_id` = j2.`detail_id` AND j1.`id` < j2.`id`;
+
+DELETE m1 FROM `metric` m1
+INNER JOIN `metric` m2 ON m1.`detail_id` = m2.`detail_id` AND m1.`id` < m2.`id`;
+
+ALTER TABLE `result_backend_json`
+  ADD UNIQUE KEY `uk_result_backend_json_detail_id` (`detail_id`),
+  DROP KEY `fk_result_backend_json_1_idx`;
+
+ALTER TABLE `metric`
+  ADD UNIQUE KEY `uk_metric_detail_id` (`detail_id`),
+  DROP KEY `fk_metric_1_idx`;
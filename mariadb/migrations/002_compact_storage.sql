@@ -0,0 +1,19 @@
+-- Blob columns of the compact storage ([StorageConfig] compact = 1): the histograms as
+-- packed outcomes and values, and the qasm, compressed with zlib.
+-- The existing json/text rows stay readable, migrate_storage.py converts them.
+-- The `result` view shows both: a row of the compact storage has NULL updated_qasm and
+-- quasi_dists, and its updated_qasm_bin and quasi_dists_bin are decoded by read_text
+-- and read_counts of the database_wrapper. It can be run again on a database that
+-- already has the blob columns, to update the view.
+
+USE `framework`;
+
+ALTER TABLE `result_backend_json`
+  ADD COLUMN IF NOT EXISTS `quasi_dists_bin` longblob DEFAULT NULL,
+  ADD COLUMN IF NOT EXISTS `quasi_dists_std_bin` longblob DEFAULT NULL,
+  ADD COLUMN IF NOT EXISTS `qasm_bin` longblob DEFAULT NULL;
+
+ALTER TABLE `result_updated_qasm`
+  ADD COLUMN IF NOT EXISTS `updated_qasm_bin` longblob DEFAULT NULL;
+
+CREATE OR REPLACE VIEW `result` AS select `h`.`id` AS `header_id`,`h`.`user_id` AS `user_id`,`h`.`hw_name` AS `hw_name`,`h`.`qiskit_token` AS `qiskit_token`,`h`.`job_id` AS `job_id`,`h`.`status` AS `status`,`d`.`circuit_name` AS `circuit_name`,`d`.`id` AS `detail_id`,`d`.`compilation_name` AS `compilation_name`,`d`.`noisy_simulator` AS `noisy_simulator`,`d`.`noise_level` AS `noise_level`,`q`.`updated_qasm` AS `updated_qasm`,`c`.`qasm` AS `original_qasm`,`c`.`qubit` AS `qubit`,`m`.`circuit_depth` AS `circuit_depth`,`m`.`total_two_qubit_gate` AS `total_two_qubit_gate`,`m`.`polar_count_accept` AS `polar_count_accept`,`m`.`polar_count_logerror` AS `polar_count_logerror`,`m`.`polar_count_undecided` AS `polar_count_undecided`,`m`.`success_rate_polar` AS `success_rate_polar`,`c`.`correct_output` AS `correct_output`,`j`.`quasi_dists` AS `quasi_dists`,`j`.`shots` AS `shots`,`j`.`mapping_json` AS `mapping_json`,`d`.`initial_mapping` AS `initial_mapping`,`d`.`final_mapping` AS `final_mapping`,`q`.`updated_qasm_bin` AS `updated_qasm_bin`,`j`.`quasi_dists_bin` AS `quasi_dists_bin` from (((((`result_header` `h` join `result_detail` `d` on(`h`.`id` = `d`.`header_id`)) left join `result_backend_json` `j` on(`j`.`detail_id` = `d`.`id`)) left join `result_updated_qasm` `q` on(`q`.`detail_id` = `d`.`id`)) join `circuit` `c` on(`d`.`circuit_name` = `c`.`name`)) left join `metric` `m` on(`d`.`id` = `m`.`detail_id`));
@@ -0,0 +1,13 @@
+-- Indexes of the queries the scheduler runs on every poll: the headers by status
+-- and job (pending/executed jobs and their details), the headers without a job,
+-- and the latest calibration of a hardware.
+-- result_backend_json(detail_id) and metric(detail_id) are indexed by 001.
+
+USE `framework`;
+
+ALTER TABLE `result_header`
+  ADD KEY `idx_result_header_status_job` (`status`,`job_id`),
+  ADD KEY `idx_result_header_job_id` (`job_id`);
+
+ALTER TABLE `ibm`
+  ADD KEY `idx_ibm_hw_datetime` (`hw_name`,`calibration_datetime`);
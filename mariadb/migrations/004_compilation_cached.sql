@@ -0,0 +1,8 @@
+-- Flag of the result details whose circuit comes from the compile cache ([CompilerConfig]
+-- cache = 1): their compilation_time is the time of the lookup, not of a compilation.
+-- NULL for the details inserted before this migration.
+
+USE `framework`;
+
+ALTER TABLE `result_detail`
+  ADD COLUMN `compilation_cached` tinyint(1) unsigned DEFAULT NULL;
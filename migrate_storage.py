@@ -0,0 +1,96 @@
+"""
+file name: migrate_storage.py
+author: Handy
+date: 18 October 2026
+
+Converts the legacy rows of result_backend_json (json quasi-distributions, text qasm)
+and result_updated_qasm (text qasm) into the compact blob columns. Run it once after
+mariadb/migrations/002_compact_storage.sql, and set [StorageConfig] compact = 1.
+
+The json/text columns are kept by default, the `result` view shows them next to the
+blob columns. With --clear-legacy they are set to NULL once converted, to free the
+space: the rows are then only readable through the blob columns.
+"""
+import re
+import json
+import argparse
+import wrappers.database_wrapper as database_wrapper
+from commons import Counts
+
+# rows converted and committed at a time
+batch_size = 500
+
+def get_width(qasm, counts_dict):
+    # number of classical bits of the circuit, or the largest outcome if there is no creg
+    width = sum(int(size) for size in re.findall(r'creg\s+\w+\[(\d+)\]', qasm or ""))
+    if width == 0:
+        width = max([int(key).bit_length() for key in counts_dict.keys()] + [1])
+
+    return width
+
+def encode_json_counts(counts_json, width):
+    if counts_json is None or counts_json == "":
+        return None
+
+    return database_wrapper.encode_counts(Counts.from_dict(json.loads(counts_json), width))
+
+def migrate_result_backend_json(conn, cursor, clear_legacy=False):
+    total = 0
+    last_id = 0
+    while True:
+        cursor.execute('''SELECT id, quasi_dists, quasi_dists_std, qasm FROM result_backend_json
+                       WHERE id > %s AND quasi_dists IS NOT NULL AND quasi_dists_bin IS NULL
+                       ORDER BY id LIMIT %s''', (last_id, batch_size))
+        rows = cursor.fetchall()
+        if len(rows) == 0:
+            break
+
+        params = []
+        for row_id, quasi_dists, quasi_dists_std, qasm in rows:
+            width = get_width(qasm, json.loads(quasi_dists))
+            params.append((encode_json_counts(quasi_dists, width), encode_json_counts(quasi_dists_std, width),
+                           None if qasm is None else database_wrapper.encode_text(qasm), row_id))
+
+        clear_columns = ", quasi_dists = NULL, quasi_dists_std = NULL, qasm = NULL" if clear_legacy else ""
+        cursor.executemany('''UPDATE result_backend_json SET quasi_dists_bin = %s, quasi_dists_std_bin = %s, qasm_bin = %s''' +
+                           clear_columns + " WHERE id = %s", params)
+        conn.commit()
+
+        total += len(rows)
+        last_id = rows[-1][0]
+        print("result_backend_json: {} rows converted".format(total))
+
+def migrate_result_updated_qasm(conn, cursor, clear_legacy=False):
+    total = 0
+    last_id = 0
+    while True:
+        cursor.execute('''SELECT id, updated_qasm FROM result_updated_qasm
+                       WHERE id > %s AND updated_qasm IS NOT NULL AND updated_qasm_bin IS NULL
+                       ORDER BY id LIMIT %s''', (last_id, batch_size))
+        rows = cursor.fetchall()
+        if len(rows) == 0:
+            break
+
+        params = [(database_wrapper.encode_text(updated_qasm), row_id) for row_id, updated_qasm in rows]
+        clear_columns = ", updated_qasm = NULL" if clear_legacy else ""
+        cursor.executemany("UPDATE result_updated_qasm SET updated_qasm_bin = %s" + clear_columns + " WHERE id = %s", params)
+        conn.commit()
+
+        total += len(rows)
+        last_id = rows[-1][0]
+        print("result_updated_qasm: {} rows converted".format(total))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Converts the json/text rows into the compact blob columns")
+    parser.add_argument("--clear-legacy", action="store_true",
+                        help="set the json/text columns to NULL once converted (only the blob columns are left)")
+    args = parser.parse_args()
+
+    conn = database_wrapper.get_connection()
+    cursor = conn.cursor()
+
+    migrate_result_backend_json(conn, cursor, args.clear_legacy)
+    migrate_result_updated_qasm(conn, cursor, args.clear_legacy)
+
+    cursor.close()
+    conn.close()
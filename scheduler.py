@@ -1,28 +1,27 @@
-import mysql.connector
 import numpy as np
 import json
+import os
+import atexit
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import util as multiprocessing_util
 
 from qiskit import *
 from qiskit.result import *
-from qiskit_ibm_runtime import QiskitRuntimeService, RuntimeJob, RuntimeJobV2
 from qiskit.primitives import PrimitiveResult
-from commons import (Config, get_count_1q, get_count_2q, convert_to_json, 
-    get_initial_mapping_json, normalize_counts, convert_dict_int_to_binary, reverse_string_keys, 
-    convert_dict_binary_to_int
+from commons import (conf, get_count_1q, get_count_2q, convert_to_json, 
+    get_initial_mapping_json, Counts, average_counts
 )
 
 import wrappers.qiskit_wrapper as qiskit_wrapper
 import wrappers.polar_wrapper as polar_wrapper
 import wrappers.database_wrapper as database_wrapper
+import wrappers.runtime_wrapper as runtime_wrapper
 
 from wrappers.qiskit_wrapper import QiskitCircuit
 
 from qiskit.qasm2 import dumps
-from qiskit_aer import AerSimulator
 
-conf = Config()
-
-def check_result_availability(job: (RuntimeJob | RuntimeJobV2), header_id):
+def check_result_availability(job: "RuntimeJob | RuntimeJobV2", header_id):
     
     print("Job status :", job.status())
 
@@ -36,71 +35,48 @@ def check_result_availability(job: (RuntimeJob | RuntimeJobV2), header_id):
     if(job.done()):
         return True
 
-def get_result(job: (RuntimeJob | RuntimeJobV2)):        
+def set_job_error(header_id, job: "RuntimeJob | RuntimeJobV2"):
+    # failed or cancelled job
+    database_wrapper.update_result_header_status_by_header_id(header_id, "error")
+
+def get_result(job: "RuntimeJob | RuntimeJobV2", job_results = None):        
+    '''
+    Stores the results of a finished job, job_results: job.result() if it was already fetched
+    '''
     try:
-        conn = mysql.connector.connect(**conf.mysql_config)
+        conn = database_wrapper.get_connection()
         cursor = conn.cursor()
 
         job_id = job.job_id()
 
         # get list of detail_id here
-        cursor.execute('''SELECT d.id, h.shots FROM result_header h 
-INNER JOIN result_detail d ON h.id = d.header_id
-WHERE h.status = %s AND h.job_id = %s;''', ('pending', job_id, ))
+        cursor.execute(database_wrapper.sql_job_details, ('pending', job_id, ))
         results_details = cursor.fetchall()
 
-        if (type(job.result()) is PrimitiveResult):
-            # quasi_dists = job.result().quasi_dists
+        if job_results is None:
             job_results = job.result()
 
+        if (type(job_results) is PrimitiveResult):
+
             avg_result = {}
             std_json = {}
             qasm_dict = {}
             no_of_optimization = len(results_details)
             no_of_result = len(job_results)
             runs = int(no_of_result / no_of_optimization)
-            idx_1, idx_2 = 0, 0
 
             for idx, res in enumerate(results_details):
                 detail_id, shots = res
-                avg_result[detail_id] = []
-                std_json[detail_id] = []
-                qasm_dict[detail_id] = []
-                sum_result = {}
-                std_dev = {}
-                std_dict = {}
-
-                # to initialize the dict
-                for j in range(runs):
-                    res_dict = convert_dict_binary_to_int(job_results[idx_1].data.c.get_counts())
-
-                    for key, value in res_dict.items():
-                        key_bin = key
-                        sum_result[key_bin] = 0
-                        std_dict[key_bin] = 0
-                        std_dev[key_bin] = []
-                        
-                    idx_1 += 1
-
-                # to put them together
-                for j in range(runs):
-                    res_dict = convert_dict_binary_to_int(job_results[idx_2].data.c.get_counts())
-                    
-                    for key, value in res_dict.items():
-                        key_bin = key
-                        sum_result[key_bin] += (value / shots)
-                        std_dev[key_bin].append((value / shots))
-                        
-                    idx_2 += 1
-                    
-                for key, value in sum_result.items():
-                    sum_result[key] /= runs
-                    std_dict[key] = np.std(std_dev[key])
 
-                avg_result[detail_id] = convert_to_json(sum_result)
-                std_json[detail_id] = convert_to_json(std_dict)
-                qasm_dict[detail_id] = dumps(job.inputs["pubs"][idx_2-1][0])
+                # histograms of the runs, straight from the packed bits of the sampler
+                run_counts = [Counts.from_bit_array(job_results[idx * runs + j].data.c) for j in range(runs)]
+                avg_counts, std_counts = average_counts(run_counts, shots)
+
+                avg_result[detail_id] = avg_counts
+                std_json[detail_id] = std_counts
+                qasm_dict[detail_id] = dumps(job.inputs["pubs"][idx * runs + runs - 1][0])
 
+            backend_rows = []
             for idx, res in enumerate(results_details):
                 detail_id, shots = res
                 job_results = avg_result[detail_id]
@@ -108,21 +84,12 @@ WHERE h.status = %s AND h.job_id = %s;''', ('pending', job_id, ))
                 qasm = qasm_dict[detail_id]
                 mapping_json = get_initial_mapping_json(qasm)
 
-                # check if the result_backend_json is already there, just update
-                cursor.execute('SELECT detail_id FROM result_backend_json WHERE detail_id = %s', (detail_id,))
-                existing_row = cursor.fetchone()
-
-                if existing_row:
-                    cursor.execute('''UPDATE result_backend_json SET quasi_dists = %s, quasi_dists_std = %s, qasm = %s, 
-                    shots = %s, mapping_json = %s WHERE detail_id = %s;''',
-                    (job_results, job_results_std, qasm, shots, mapping_json, detail_id))
-                else:
-                    cursor.execute('''INSERT INTO result_backend_json 
-                                    (detail_id, quasi_dists, quasi_dists_std, qasm, shots, mapping_json) 
-                                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)''',
-                    (detail_id, job_results, job_results_std, qasm, shots, mapping_json))
-                
+                backend_rows.append((detail_id, job_results, job_results_std, qasm, shots, mapping_json))
 
+            # all the results of the job in one statement
+            database_wrapper.upsert_result_backend_json(cursor, backend_rows)
+
+            if len(backend_rows) > 0:
                 database_wrapper.update_result_header(cursor, job)
 
             conn.commit()
@@ -136,91 +103,236 @@ WHERE h.status = %s AND h.job_id = %s;''', ('pending', job_id, ))
     except Exception as e:
         print("Error for check result availability :", str(e))
 
-def process_simulator(service:QiskitRuntimeService, header_id, job_id, hw_name, noisy_simulator = None):
-    print("Checking results for: ", job_id, "with header id :", header_id)
-    
+def get_simulator(backend, circuit, compilation_name, noise_level, noisy_simulator = None):
+    """
+    Returns the simulator to run a circuit (transpiled to the backend) with
+    """
+    noiseless = False
+    if noisy_simulator == None and conf.simulator_method == "pauli_frame" and qiskit_wrapper.is_clifford_circuit(circuit):
+        print("Preparing the Pauli-frame simulator", backend.name, compilation_name, noise_level)
+        return qiskit_wrapper.PauliFrameSimulator.from_backend(backend, noise_level)
+
+    elif noise_level == 0.0:
+        noiseless = True
+        print("Preparing the noiseless simulator", compilation_name, noise_level, noiseless)
+        from qiskit_aer import AerSimulator
+        return AerSimulator()
+
+    elif noisy_simulator != None:
+        print("Preparing the noisy simulator", backend.backend_name, compilation_name, noise_level, noiseless)
+        return backend
+
+    elif conf.user_id == 8:
+        print("Preparing the noisy CX simulator", backend.name, compilation_name, noise_level, noiseless)
+        return qiskit_wrapper.generate_sim_noise_cx(backend, noise_level)
 
-    conn = mysql.connector.connect(**conf.mysql_config)
-    cursor = conn.cursor()
+    else:
+        print("Preparing the noisy simulator", backend.name, compilation_name, noise_level, noiseless)
+        noise_model, sim_noisy, coupling_map = qiskit_wrapper.get_noisy_simulator(backend, noise_level, noiseless)
+        return sim_noisy
 
-    backend = None
-    
-    if noisy_simulator == None:
-        backend = service.backend(hw_name)
+def get_simulator_row(detail_id, circuit, output: Counts, shots):
+    # row of result_backend_json
+    quasi_dists = output.normalized(shots)
+    quasi_dists_std = ""
+    qasm = dumps(circuit)
+    mapping_json = get_initial_mapping_json(qasm)
+
+    return detail_id, quasi_dists, quasi_dists_std, qasm, shots, mapping_json
+
+def get_simulator_result(backend, detail, noisy_simulator = None):
+    """
+    Runs a pending result detail on the simulator, and returns the row of result_backend_json
+    """
+    detail_id, updated_qasm, compilation_name, noise_level, shots = detail
+
+    qc = QiskitCircuit(updated_qasm)
+
+    circuit = qc.transpile_to_target_backend(backend)
+
+    simulator = get_simulator(backend, circuit, compilation_name, noise_level, noisy_simulator)
+    job = simulator.run(circuit, shots=shots)
+
+    result = job.result()  
+    if isinstance(result, qiskit_wrapper.PauliFrameResult):
+        output = result.counts
     else:
-        backend = noisy_simulator
-        print(backend.backend_name)
+        output = Counts.from_result(result, circuit.num_clbits)
+
+    return get_simulator_row(detail_id, circuit, output, shots)
+
+def get_simulator_results_batch(backend, details, noisy_simulator = None):
+    """
+    Runs the pending result details on the simulator, with one simulator for all the
+    circuits of the same noise level (and shots): one Aer call for all of them, or one
+    Pauli-frame sampler for the Clifford circuits. Returns the rows of result_backend_json
+    """
+    simulator_results = []
+    batches = {}
+    pauli_frame_batches = {}
+    for detail in details:
+        detail_id, updated_qasm, compilation_name, noise_level, shots = detail
+
+        try:
+            qc = QiskitCircuit(updated_qasm)
+            circuit = qc.transpile_to_target_backend(backend)
+        except Exception as e:
+            print("Error happened: ", detail_id, str(e))
+            continue
+
+        if noisy_simulator == None and conf.simulator_method == "pauli_frame" and qiskit_wrapper.is_clifford_circuit(circuit):
+            pauli_frame_batches.setdefault((noise_level, shots), []).append((detail_id, compilation_name, circuit))
+        else:
+            batches.setdefault((noise_level, shots), []).append((detail_id, compilation_name, circuit))
 
-    cursor.execute('''SELECT d.id, q.updated_qasm, d.compilation_name, d.noise_level, h.shots 
-FROM result_detail d
-INNER JOIN result_header h ON d.header_id = h.id
-INNER JOIN result_updated_qasm q ON d.id = q.detail_id 
-LEFT JOIN result_backend_json j ON d.id = j.detail_id
-WHERE h.status = %s AND h.job_id = %s AND d.header_id = %s AND j.quasi_dists IS NULL  ''', ('pending', job_id, header_id,))
-    results_details = cursor.fetchall()
+    for (noise_level, shots), batch in pauli_frame_batches.items():
+        detail_ids, compilation_names, circuits = zip(*batch)
+        simulator = get_simulator(backend, circuits[0], ",".join(sorted(set(compilation_names))), noise_level)
 
-    for idx, res in enumerate(results_details):
+        # the sampler runs one circuit at a time, on the circuits already transpiled above
+        for detail_id, circuit in zip(detail_ids, circuits):
+            try:
+                output = simulator.run(circuit, shots=shots).result().counts
+                simulator_results.append(get_simulator_row(detail_id, circuit, output, shots))
+            except Exception as e:
+                print("Error happened: ", detail_id, str(e))
 
+    for (noise_level, shots), batch in batches.items():
         try:
+            detail_ids, compilation_names, circuits = zip(*batch)
+            simulator = get_simulator(backend, circuits[0], ",".join(sorted(set(compilation_names))), noise_level, noisy_simulator)
 
-            detail_id, updated_qasm, compilation_name, noise_level, shots = res
+            # let Aer run the experiments of the batch in parallel, only on the simulators 
+            # built here: the options of a simulator given by the caller are kept
+            run_options = {}
+            if noisy_simulator == None:
+                run_options["max_parallel_experiments"] = 0
 
-            qc = QiskitCircuit(updated_qasm)
+            job = simulator.run(list(circuits), shots=shots, **run_options)
+            result = job.result()
 
-            circuit = qc.transpile_to_target_backend(backend)
+            for idx, (detail_id, circuit) in enumerate(zip(detail_ids, circuits)):
+                output = Counts.from_result(result, circuit.num_clbits, experiment=idx)
+                simulator_results.append(get_simulator_row(detail_id, circuit, output, shots))
 
-            noiseless = False
-            if noise_level == 0.0:
-                noiseless = True
-                print("Preparing the noiseless simulator", compilation_name, noise_level, noiseless)
-                sim_ideal = AerSimulator()
-                job = sim_ideal.run(circuit, shots=shots)
-            elif noisy_simulator != None:
-                print("Preparing the noisy simulator", backend.backend_name, compilation_name, noise_level, noiseless)
-                job = backend.run(circuit, shots=shots)
+        except Exception as e:
+            print("Error happened: ", noise_level, str(e))
 
-            elif conf.user_id == 8:
-                print("Preparing the noisy CX simulator", backend.name, compilation_name, noise_level, noiseless)
+    return simulator_results
 
-                sim_noisy = qiskit_wrapper.generate_sim_noise_cx(backend, noise_level)
+def save_simulator_result(cursor, simulator_result):
+    database_wrapper.upsert_result_backend_json(cursor, [simulator_result])
 
-                job = sim_noisy.run(circuit, shots=shots)
+#region Simulator workers
 
-            else:
-                print("Preparing the noisy simulator", backend.name, compilation_name, noise_level, noiseless)
-                noise_model, sim_noisy, coupling_map = qiskit_wrapper.get_noisy_simulator(backend, noise_level, noiseless)
-                job = sim_noisy.run(circuit, shots=shots)
+# state of a worker process of the pool, set once by init_simulator_worker
+_worker_backend = None
+_worker_noisy_simulator = None
+_worker_conn = None
 
-            result = job.result()  
-            output = result.get_counts()
-            output_normalize = normalize_counts(output, shots=shots)
+def init_simulator_worker(backend, noisy_simulator):
+    global _worker_backend, _worker_noisy_simulator, _worker_conn
 
-            quasi_dists = convert_to_json(output_normalize)
-            quasi_dists_std = ""
-            qasm = dumps(circuit)
-            mapping_json = get_initial_mapping_json(qasm)
+    _worker_backend = backend
+    _worker_noisy_simulator = noisy_simulator
+    _worker_conn = database_wrapper.get_connection()
 
+    # the connection of the worker is closed when the worker process exits: atexit for
+    # the spawned workers, the forked workers only run the multiprocessing finalizers
+    atexit.register(close_simulator_worker)
+    multiprocessing_util.Finalize(None, close_simulator_worker, exitpriority=10)
 
-            # check if the result_backend_json is already there, just update
-            cursor.execute('SELECT detail_id FROM result_backend_json WHERE detail_id = %s', (detail_id,))
-            existing_row = cursor.fetchone()
+def close_simulator_worker():
+    global _worker_conn
 
-            if existing_row:
-                cursor.execute('''UPDATE result_backend_json SET quasi_dists = %s, quasi_dists_std = %s, qasm = %s, 
-                shots = %s, mapping_json = %s WHERE detail_id = %s;''',
-                (quasi_dists, quasi_dists_std, qasm, shots, mapping_json, detail_id))
-            else:
-                cursor.execute('''INSERT INTO result_backend_json 
-                                (detail_id, quasi_dists, quasi_dists_std, qasm, shots, mapping_json) 
-                                VALUES (%s, %s, %s, %s, %s, %s)''',
-                (detail_id, quasi_dists, quasi_dists_std, qasm, shots, mapping_json))
+    if _worker_conn is not None:
+        _worker_conn.close()
+        _worker_conn = None
 
-            conn.commit()
+def run_simulator_detail(detail):
+    """
+    Runs a result detail in a worker process and writes its result with the connection
+    of the worker. The noisy simulators stay cached in the worker between details.
+    """
+    simulator_result = get_simulator_result(_worker_backend, detail, _worker_noisy_simulator)
 
-        except Exception as e:
-            print("Error happened: ", str(e))
+    # rolled back on error, the cursor is closed in both cases
+    with database_wrapper.transaction(_worker_conn) as (conn, cursor):
+        save_simulator_result(cursor, simulator_result)
+
+    return simulator_result[0]
+
+#endregion
+
+def process_simulator(service: "QiskitRuntimeService", header_id, job_id, hw_name, noisy_simulator = None, 
+                      execution_mode = None, workers = None):
+    """
+    Runs the pending result details of a header on the simulator.
+
+    execution_mode: "serial" - one detail after the other, "process" - details spread 
+    over a pool of worker processes, "batch" - one simulator call per noise level.
+    Default from config.ini, as the number of workers.
+    """
+    print("Checking results for: ", job_id, "with header id :", header_id)
+    
+    if execution_mode is None:
+        execution_mode = conf.simulator_execution_mode
+    if workers is None:
+        workers = conf.simulator_workers
 
-    cursor.execute('UPDATE result_header SET status = "executed", updated_datetime = NOW() WHERE id = %s', (header_id,))
+    conn = database_wrapper.get_connection()
+    cursor = conn.cursor()
+
+    backend = None
+    
+    if noisy_simulator == None:
+        # retrieved once per process for the services of the registry
+        backend = runtime_wrapper.get_service_backend(service, hw_name)
+    else:
+        backend = noisy_simulator
+        print(backend.backend_name)
+
+    cursor.execute(database_wrapper.sql_simulator_details, ('pending', job_id, header_id,))
+    results_details = [(detail_id, database_wrapper.read_text(updated_qasm, updated_qasm_bin), compilation_name, noise_level, shots)
+                       for detail_id, updated_qasm, updated_qasm_bin, compilation_name, noise_level, shots in cursor.fetchall()]
+
+    if execution_mode == "process" and len(results_details) > 1:
+        # the runtime backend cannot be sent to the workers, they get a snapshot of it
+        # (configuration, properties and target) instead, the noise models are built 
+        # by the workers
+        if noisy_simulator == None:
+            backend = runtime_wrapper.get_backend_snapshot(backend)
+
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_simulator_worker, 
+                                 initargs=(backend, noisy_simulator)) as executor:
+            futures = {executor.submit(run_simulator_detail, res): res[0] for res in results_details}
+
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    print("Error happened: ", futures[future], str(e))
+
+    elif execution_mode == "batch":
+        simulator_results = get_simulator_results_batch(backend, results_details, noisy_simulator)
+        database_wrapper.upsert_result_backend_json(cursor, simulator_results)
+        conn.commit()
+
+    else:
+        simulator_results = []
+        for idx, res in enumerate(results_details):
+
+            try:
+                simulator_results.append(get_simulator_result(backend, res, noisy_simulator))
+
+            except Exception as e:
+                print("Error happened: ", str(e))
+
+        # all the results of the header in one statement
+        database_wrapper.upsert_result_backend_json(cursor, simulator_results)
+        conn.commit()
+
+    cursor.execute("UPDATE result_header SET status = 'executed', updated_datetime = NOW() WHERE id = %s", (header_id,))
     conn.commit()
 
     cursor.close()
@@ -230,129 +342,102 @@ WHERE h.status = %s AND h.job_id = %s AND d.header_id = %s AND j.quasi_dists IS
 def get_metrics(header_id, job_id):
     # print("")
     print("Getting qasm for :", header_id, job_id)
-    conn = mysql.connector.connect(**conf.mysql_config)
+    conn = database_wrapper.get_connection()
     cursor = conn.cursor()
 
     try:
-        cursor.execute('''SELECT j.detail_id, j.qasm, j.quasi_dists, j.quasi_dists_std, d.circuit_name, 
-                       d.compilation_name, d.noise_level, j.shots 
-                       FROM result_backend_json j
-        INNER JOIN result_detail d ON j.detail_id = d.id
-        INNER JOIN result_header h ON d.header_id = h.id
-        WHERE h.status = %s AND h.job_id = %s AND h.id = %s AND j.quasi_dists IS NOT NULL;''', ("executed", job_id, header_id))
+        cursor.execute(database_wrapper.sql_metric_details, ("executed", job_id, header_id))
         results_details_json = cursor.fetchall()
 
-        for idx, res in enumerate(results_details_json):
-            detail_id, qasm, quasi_dists, quasi_dists_std, circuit_name, compilation_name, noise_level, shots = res
-
-            n = 2
-            lstate = "Z"
-            if "polar_all_meas" in circuit_name:
-                tmp = circuit_name.split("_")
-                n = int(tmp[3][1])
-                if len(tmp) == 5:
-                    lstate = tmp[4].upper()
-            elif "polar" in circuit_name:
-                tmp = circuit_name.split("_")
-                n = int(tmp[1][1])
-                if len(tmp) == 3:
-                    lstate = tmp[2].upper()
+        # one commit for the metrics of all the details of the header
+        metric_rows = []
+        with database_wrapper.transaction(conn):
+            for idx, res in enumerate(results_details_json):
+                detail_id, qasm, qasm_bin, quasi_dists, quasi_dists_bin, circuit_name, compilation_name, noise_level, shots = res
+                qasm = database_wrapper.read_text(qasm, qasm_bin)
+
+                n = 2
+                lstate = "Z"
+                if "polar_all_meas" in circuit_name:
+                    tmp = circuit_name.split("_")
+                    n = int(tmp[3][1])
+                    if len(tmp) == 5:
+                        lstate = tmp[4].upper()
+                elif "polar" in circuit_name:
+                    tmp = circuit_name.split("_")
+                    n = int(tmp[1][1])
+                    if len(tmp) == 3:
+                        lstate = tmp[2].upper()
             
-            quasi_dists_dict = json.loads(quasi_dists) 
-            count_dict = {}
-            if (round(sum(quasi_dists_dict.values())) <= 1):
-                for key, value in quasi_dists_dict.items():
-                    count_dict[key] = value * shots
-            else:
-                count_dict = quasi_dists_dict
-
-            qc = QuantumCircuit.from_qasm_str(qasm)
-            qc = qiskit_wrapper.transpile_to_basis_gate(qc)
-            total_gate = sum(qc.count_ops().values())
-            total_one_qubit_gate = get_count_1q(qc)
-            total_two_qubit_gate = get_count_2q(qc)
-            circuit_depth = qc.depth()
-
-            count_accept = 0
-            count_logerror = 0
-            count_undecided = None
-            decoding_time = None
-            detection_time = None
-
-            if "polar_all_meas" in circuit_name:
-                print("get metrics: n =", n, ", lstate =", lstate)
-                # total_qubit = (2**n) * (n)
-                if lstate == "X":
-                    if n == 2:
-                        total_qubit = 8
-                    elif n == 3:
-                        total_qubit = 20
-                    elif n == 4:
-                        total_qubit = 40
-                else:
-                    if n == 2:
-                        total_qubit = 6
-                    elif n == 3:
-                        total_qubit = 12
-                    elif n == 4:
-                        total_qubit = 48
+                qc = QiskitCircuit(qasm)
+                total_gate = qc.total_gate
+                total_one_qubit_gate = qc.total_one_qubit_gate
+                total_two_qubit_gate = qc.total_two_qubit_gate
+                circuit_depth = qc.depth
+
+                count_accept = 0
+                count_logerror = 0
+                count_undecided = None
+                decoding_time = None
+                detection_time = None
+
+                if "polar_all_meas" in circuit_name:
+                    print("get metrics: n =", n, ", lstate =", lstate)
+                    # total_qubit = (2**n) * (n)
+                    if lstate == "X":
+                        if n == 2:
+                            total_qubit = 8
+                        elif n == 3:
+                            total_qubit = 20
+                        elif n == 4:
+                            total_qubit = 40
+                    else:
+                        if n == 2:
+                            total_qubit = 6
+                        elif n == 3:
+                            total_qubit = 12
+                        elif n == 4:
+                            total_qubit = 48
                     
-                count_dict_bin = convert_dict_int_to_binary(count_dict, total_qubit)
-                tmp = count_dict_bin
+                    tmp = database_wrapper.read_counts(quasi_dists, quasi_dists_bin, total_qubit)
+                    is_quasi_dists = (round(tmp.total) <= 1)
+                    if is_quasi_dists:
+                        tmp = tmp.scaled(shots)
                           
-                count_accept, count_logerror, count_undecided, success_rate_polar, detection_time, decoding_time = polar_wrapper.get_logical_error_on_accepted_states(n, lstate, tmp)
-                print(circuit_name, noise_level, compilation_name, count_accept, count_logerror, count_undecided, success_rate_polar)
-
-            elif "polar" in circuit_name:
-                print("get metrics: n =", n, ", lstate =", lstate)
-                if lstate == "X":
-                    if n == 2:
-                        total_qubit = 4
-                    elif n == 3:
-                        total_qubit = 12
-                    elif n == 4:
-                        total_qubit = 24
-                else:
-                    if n == 2:
-                        total_qubit = 0
-                    elif n == 3:
-                        total_qubit = 4
-                    elif n == 4:
-                        total_qubit = 32
+                    timing = polar_wrapper.PolarTiming()
+                    count_accept, count_logerror, count_undecided, success_rate_polar, detection_time, decoding_time = polar_wrapper.get_logical_error_on_accepted_states(n, lstate, tmp, timing=timing, 
+                        use_lookup_table=conf.polar_lookup_table, lookup_table_dir=conf.polar_lookup_table_dir)
+                    print(circuit_name, noise_level, compilation_name, count_accept, count_logerror, count_undecided, success_rate_polar, timing)
+
+                elif "polar" in circuit_name:
+                    print("get metrics: n =", n, ", lstate =", lstate)
+                    if lstate == "X":
+                        if n == 2:
+                            total_qubit = 4
+                        elif n == 3:
+                            total_qubit = 12
+                        elif n == 4:
+                            total_qubit = 24
+                    else:
+                        if n == 2:
+                            total_qubit = 0
+                        elif n == 3:
+                            total_qubit = 4
+                        elif n == 4:
+                            total_qubit = 32
                     
-                quasi_dists_dict_bin = convert_dict_int_to_binary(quasi_dists_dict, total_qubit)
-                tmp = reverse_string_keys(quasi_dists_dict_bin)
-
-                success_rate_polar = polar_wrapper.get_q1prep_sr(n, lstate, tmp)
-                print(circuit_name, noise_level, compilation_name, success_rate_polar)
-
-
-            # check if the metric is already there, just update
-            cursor.execute('SELECT detail_id FROM metric WHERE detail_id = %s', (detail_id,))
-            existing_row = cursor.fetchone()
-
-            if existing_row:
-                cursor.execute("""UPDATE metric SET total_gate = %s, total_one_qubit_gate = %s, total_two_qubit_gate = %s, circuit_depth = %s, 
-                success_rate_polar = %s, polar_count_accept = %s, polar_count_logerror = %s,
-                polar_count_undecided = %s, detection_time = %s, decoding_time = %s 
-                WHERE detail_id = %s; """, 
-                (total_gate, total_one_qubit_gate, total_two_qubit_gate, circuit_depth, 
-                success_rate_polar, count_accept, count_logerror, 
-                count_undecided, detection_time, decoding_time, 
-                detail_id))
-                
-            else:
-                cursor.execute("""INSERT INTO metric(detail_id, total_gate, total_one_qubit_gate, total_two_qubit_gate, circuit_depth,  
-                success_rate_polar, polar_count_accept, polar_count_logerror, 
-                polar_count_undecided, detection_time, decoding_time)
-                VALUES (%s, %s, %s, %s, %s,
-                %s, %s, %s, 
-                %s, %s, %s); """, 
-                (detail_id, total_gate, total_one_qubit_gate, total_two_qubit_gate, circuit_depth, 
-                success_rate_polar, count_accept, count_logerror, 
-                count_undecided, detection_time, decoding_time))
+                    tmp = database_wrapper.read_counts(quasi_dists, quasi_dists_bin, total_qubit).reversed()
 
-            conn.commit()
+                    success_rate_polar = polar_wrapper.get_q1prep_sr(n, lstate, tmp)
+                    print(circuit_name, noise_level, compilation_name, success_rate_polar)
+
+
+                metric_rows.append((detail_id, total_gate, total_one_qubit_gate, total_two_qubit_gate, circuit_depth, 
+                                    success_rate_polar, count_accept, count_logerror, 
+                                    count_undecided, detection_time, decoding_time))
+
+            # all the metrics of the header in one statement
+            database_wrapper.upsert_metric(cursor, metric_rows)
 
         database_wrapper.update_result_header_status_by_header_id(header_id, 'done')
 
@@ -0,0 +1,177 @@
+-- SQLite version of mariadb/framework_structure.sql, for [StorageConfig] backend = sqlite.
+-- Created by wrappers/database_wrapper/sqlite_backend.py on the first connection.
+
+CREATE TABLE IF NOT EXISTS `calibration` (
+  `type` varchar(10) NOT NULL PRIMARY KEY,
+  `display_name` varchar(45) DEFAULT NULL,
+  `description` varchar(100) DEFAULT NULL,
+  `days` int DEFAULT NULL,
+  `adjust` tinyint DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS `circuit` (
+  `name` varchar(45) NOT NULL PRIMARY KEY,
+  `qasm` longtext DEFAULT NULL,
+  `depth` int DEFAULT NULL,
+  `total_gates` int DEFAULT NULL,
+  `gates` longtext DEFAULT NULL,
+  `correct_output` longtext DEFAULT NULL,
+  `qubit` int DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS `compilation_technique` (
+  `compilation_name` varchar(45) NOT NULL PRIMARY KEY,
+  `display_name` varchar(70) DEFAULT NULL,
+  `mapping` varchar(45) DEFAULT NULL,
+  `mapping_noise_aware` tinyint DEFAULT NULL,
+  `routing` varchar(45) DEFAULT NULL,
+  `routing_noise_aware` tinyint DEFAULT NULL,
+  `calibration_type` varchar(45) DEFAULT NULL REFERENCES `calibration` (`type`)
+);
+
+CREATE TABLE IF NOT EXISTS `hardware` (
+  `hw_name` varchar(25) NOT NULL PRIMARY KEY,
+  `hw_provider` varchar(45) NOT NULL,
+  `number_of_qubit` int NOT NULL,
+  `hw_description` varchar(100) NOT NULL,
+  `2q_native_gates` varchar(45) DEFAULT NULL,
+  `status` varchar(45) DEFAULT NULL
+);
+
+CREATE TABLE IF NOT EXISTS `ibm` (
+  `calibration_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `calibration_datetime` datetime NOT NULL,
+  `hw_name` varchar(25) NOT NULL REFERENCES `hardware` (`hw_name`),
+  `data_source` varchar(45) DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `idx_hw_name` ON `ibm` (`hw_name`);
+CREATE INDEX IF NOT EXISTS `idx_ibm_calibration_hw` ON `ibm` (`calibration_id`, `hw_name`, `calibration_datetime`);
+CREATE INDEX IF NOT EXISTS `idx_ibm_hw_datetime` ON `ibm` (`hw_name`, `calibration_datetime`);
+
+CREATE TABLE IF NOT EXISTS `ibm_gate_spec` (
+  `calibration_id` int NOT NULL REFERENCES `ibm` (`calibration_id`),
+  `qubit_control` int NOT NULL,
+  `qubit_target` int NOT NULL,
+  `gate_name` varchar(45) NOT NULL,
+  `date` datetime DEFAULT NULL,
+  `gate_error` real DEFAULT NULL,
+  `gate_length` real DEFAULT NULL,
+  PRIMARY KEY (`calibration_id`, `qubit_control`, `qubit_target`, `gate_name`)
+);
+CREATE INDEX IF NOT EXISTS `idx_qubit_control_target` ON `ibm_gate_spec` (`qubit_control`, `qubit_target`);
+
+CREATE TABLE IF NOT EXISTS `ibm_qubit_spec` (
+  `calibration_id` int NOT NULL REFERENCES `ibm` (`calibration_id`),
+  `qubit` int NOT NULL,
+  `T1` real DEFAULT NULL,
+  `T2` real DEFAULT NULL,
+  `frequency` real DEFAULT NULL,
+  `anharmonicity` real DEFAULT NULL,
+  `readout_error` real DEFAULT NULL,
+  `prob_meas0_prep1` real DEFAULT NULL,
+  `prob_meas1_prep0` real DEFAULT NULL,
+  `readout_length` real DEFAULT NULL,
+  `T1_date` datetime DEFAULT NULL,
+  `T2_date` datetime DEFAULT NULL,
+  `frequency_date` datetime DEFAULT NULL,
+  `anharmonicity_date` datetime DEFAULT NULL,
+  `readout_error_date` datetime DEFAULT NULL,
+  `prob_meas0_prep1_date` datetime DEFAULT NULL,
+  `prob_meas1_prep0_date` datetime DEFAULT NULL,
+  `readout_length_date` datetime DEFAULT NULL,
+  PRIMARY KEY (`calibration_id`, `qubit`)
+);
+
+CREATE TABLE IF NOT EXISTS `user` (
+  `user_id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `username` varchar(45) DEFAULT NULL,
+  `active` tinyint DEFAULT 1
+);
+
+CREATE TABLE IF NOT EXISTS `result_header` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `user_id` int DEFAULT NULL REFERENCES `user` (`user_id`),
+  `hw_name` varchar(50) DEFAULT NULL REFERENCES `hardware` (`hw_name`),
+  `qiskit_token` varchar(150) DEFAULT NULL,
+  `program_type` varchar(45) DEFAULT 'sampler',
+  `job_id` varchar(150) DEFAULT NULL,
+  `shots` int DEFAULT NULL,
+  `runs` int DEFAULT NULL,
+  `dd_enable` tinyint DEFAULT NULL,
+  `dd_sequence_type` varchar(10) DEFAULT NULL,
+  `dd_scheduling_method` varchar(10) DEFAULT NULL,
+  `status` varchar(45) DEFAULT NULL,
+  `execution_time` float DEFAULT NULL,
+  `job_created_datetime` datetime DEFAULT NULL,
+  `job_in_queue_second` real DEFAULT NULL,
+  `job_running_datetime` datetime DEFAULT NULL,
+  `job_completed_datetime` datetime DEFAULT NULL,
+  `created_datetime` datetime DEFAULT NULL,
+  `updated_datetime` varchar(45) DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `fk_result_header_1_idx` ON `result_header` (`user_id`);
+CREATE INDEX IF NOT EXISTS `fk_result_header_2_idx` ON `result_header` (`hw_name`);
+CREATE INDEX IF NOT EXISTS `idx_result_header_status_job` ON `result_header` (`status`, `job_id`);
+CREATE INDEX IF NOT EXISTS `idx_result_header_job_id` ON `result_header` (`job_id`);
+
+CREATE TABLE IF NOT EXISTS `result_detail` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `header_id` int DEFAULT NULL REFERENCES `result_header` (`id`),
+  `circuit_name` varchar(45) DEFAULT NULL REFERENCES `circuit` (`name`),
+  `compilation_name` varchar(45) DEFAULT NULL,
+  `compilation_time` float DEFAULT NULL,
+  `initial_mapping` varchar(1500) DEFAULT NULL,
+  `final_mapping` longtext DEFAULT NULL,
+  `noisy_simulator` tinyint DEFAULT NULL,
+  `noise_level` float DEFAULT NULL,
+  `created_datetime` datetime DEFAULT NULL,
+  `updated_datetime` float DEFAULT NULL,
+  `compilation_cached` tinyint DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `fk_result_detail_1_idx` ON `result_detail` (`header_id`);
+CREATE INDEX IF NOT EXISTS `fk_result_detail_2_idx` ON `result_detail` (`circuit_name`);
+CREATE INDEX IF NOT EXISTS `fk_result_detail_3_idx` ON `result_detail` (`compilation_name`);
+
+CREATE TABLE IF NOT EXISTS `result_updated_qasm` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `detail_id` int DEFAULT NULL REFERENCES `result_detail` (`id`),
+  `updated_qasm` longtext DEFAULT NULL,
+  `updated_qasm_bin` blob DEFAULT NULL
+);
+CREATE INDEX IF NOT EXISTS `fk_result_updated_qasm_1_idx` ON `result_updated_qasm` (`detail_id`);
+
+CREATE TABLE IF NOT EXISTS `result_backend_json` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `detail_id` int NOT NULL REFERENCES `result_detail` (`id`),
+  `quasi_dists` longtext DEFAULT NULL,
+  `quasi_dists_std` longtext DEFAULT NULL,
+  `qasm` longtext DEFAULT NULL,
+  `shots` int DEFAULT NULL,
+  `mapping_json` longtext DEFAULT NULL,
+  `quasi_dists_bin` blob DEFAULT NULL,
+  `quasi_dists_std_bin` blob DEFAULT NULL,
+  `qasm_bin` blob DEFAULT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS `uk_result_backend_json_detail_id` ON `result_backend_json` (`detail_id`);
+
+CREATE TABLE IF NOT EXISTS `metric` (
+  `id` INTEGER PRIMARY KEY AUTOINCREMENT,
+  `detail_id` int NOT NULL REFERENCES `result_detail` (`id`),
+  `total_gate` int DEFAULT NULL,
+  `total_one_qubit_gate` int DEFAULT NULL,
+  `total_two_qubit_gate` int DEFAULT NULL,
+  `circuit_depth` int DEFAULT NULL,
+  `success_rate_polar` float DEFAULT NULL,
+  `polar_count_accept` int DEFAULT NULL,
+  `polar_count_logerror` int DEFAULT NULL,
+  `polar_count_undecided` int DEFAULT NULL,
+  `detection_time` int DEFAULT NULL,
+  `decoding_time` int DEFAULT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS `uk_metric_detail_id` ON `metric` (`detail_id`);
+
+CREATE VIEW IF NOT EXISTS `ibm_one_qubit_gate_spec` AS select `i`.`hw_name` AS `hw_name`,`g`.`calibration_id` AS `calibration_id`,`g`.`qubit_control` AS `qubit`,max(case when `g`.`gate_name` = 'id' then `g`.`date` else 0 end) AS `id_date`,max(case when `g`.`gate_name` = 'reset' then `g`.`date` else 0 end) AS `reset_date`,max(case when `g`.`gate_name` = 'sx' then `g`.`date` else 0 end) AS `sx_date`,max(case when `g`.`gate_name` = 'x' then `g`.`date` else 0 end) AS `x_date`,sum(case when `g`.`gate_name` = 'id' then `g`.`gate_error` else 0 end) AS `id_error`,sum(case when `g`.`gate_name` = 'reset' then `g`.`gate_error` else 0 end) AS `reset_error`,sum(case when `g`.`gate_name` = 'sx' then `g`.`gate_error` else 0 end) AS `sx_error`,sum(case when `g`.`gate_name` = 'x' then `g`.`gate_error` else 0 end) AS `x_error`,sum(case when `g`.`gate_name` = 'id' then `g`.`gate_length` else 0 end) AS `id_length`,sum(case when `g`.`gate_name` = 'reset' then `g`.`gate_length` else 0 end) AS `reset_length`,sum(case when `g`.`gate_name` = 'sx' then `g`.`gate_length` else 0 end) AS `sx_length`,sum(case when `g`.`gate_name` = 'x' then `g`.`gate_length` else 0 end) AS `x_length` from (`ibm_gate_spec` `g` join `ibm` `i` ON (`g`.`calibration_id` = `i`.`calibration_id`)) group by `i`.`hw_name`,`g`.`calibration_id`,`g`.`qubit_control`;
+
+CREATE VIEW IF NOT EXISTS `ibm_two_qubit_gate_spec` AS select `i`.`hw_name` AS `hw_name`,`i`.`calibration_datetime` AS `calibration_datetime`,`g`.`calibration_id` AS `calibration_id`,`g`.`qubit_control` AS `qubit_control`,`g`.`qubit_target` AS `qubit_target`,max(case when `g`.`gate_name` = 'cx' then `g`.`date` else 0 end) AS `cx_date`,max(case when `g`.`gate_name` = 'cz' then `g`.`date` else 0 end) AS `cz_date`,max(case when `g`.`gate_name` = 'ecr' then `g`.`date` else 0 end) AS `ecr_date`,sum(case when `g`.`gate_name` = 'cx' then `g`.`gate_error` else 0 end) AS `cx_error`,sum(case when `g`.`gate_name` = 'cz' then `g`.`gate_error` else 0 end) AS `cz_error`,sum(case when `g`.`gate_name` = 'ecr' then `g`.`gate_error` else 0 end) AS `ecr_error`,sum(case when `g`.`gate_name` = 'cx' then `g`.`gate_length` else 0 end) AS `cx_length`,sum(case when `g`.`gate_name` = 'cz' then `g`.`gate_length` else 0 end) AS `cz_length`,sum(case when `g`.`gate_name` = 'ecr' then `g`.`gate_length` else 0 end) AS `ecr_length` from (`ibm_gate_spec` `g` join `ibm` `i` ON (`g`.`calibration_id` = `i`.`calibration_id`)) where `g`.`qubit_control` <> `g`.`qubit_target` group by `i`.`hw_name`,`g`.`calibration_id`,`g`.`qubit_control`,`g`.`qubit_target`;
+
+CREATE VIEW IF NOT EXISTS `result` AS select `h`.`id` AS `header_id`,`h`.`user_id` AS `user_id`,`h`.`hw_name` AS `hw_name`,`h`.`qiskit_token` AS `qiskit_token`,`h`.`job_id` AS `job_id`,`h`.`status` AS `status`,`d`.`circuit_name` AS `circuit_name`,`d`.`id` AS `detail_id`,`d`.`compilation_name` AS `compilation_name`,`d`.`noisy_simulator` AS `noisy_simulator`,`d`.`noise_level` AS `noise_level`,`q`.`updated_qasm` AS `updated_qasm`,`c`.`qasm` AS `original_qasm`,`c`.`qubit` AS `qubit`,`m`.`circuit_depth` AS `circuit_depth`,`m`.`total_two_qubit_gate` AS `total_two_qubit_gate`,`m`.`polar_count_accept` AS `polar_count_accept`,`m`.`polar_count_logerror` AS `polar_count_logerror`,`m`.`polar_count_undecided` AS `polar_count_undecided`,`m`.`success_rate_polar` AS `success_rate_polar`,`c`.`correct_output` AS `correct_output`,`j`.`quasi_dists` AS `quasi_dists`,`j`.`shots` AS `shots`,`j`.`mapping_json` AS `mapping_json`,`d`.`initial_mapping` AS `initial_mapping`,`d`.`final_mapping` AS `final_mapping`,`q`.`updated_qasm_bin` AS `updated_qasm_bin`,`j`.`quasi_dists_bin` AS `quasi_dists_bin` from (((((`result_header` `h` join `result_detail` `d` ON (`h`.`id` = `d`.`header_id`)) left join `result_backend_json` `j` ON (`j`.`detail_id` = `d`.`id`)) left join `result_updated_qasm` `q` ON (`q`.`detail_id` = `d`.`id`)) join `circuit` `c` ON (`d`.`circuit_name` = `c`.`name`)) left join `metric` `m` ON (`d`.`id` = `m`.`detail_id`));
@@ -0,0 +1,7 @@
+from .compile_cache import CompileCache, get_compile_key, get_library_versions
+
+__all__ = [
+    "CompileCache",
+    "get_compile_key",
+    "get_library_versions",
+]
@@ -0,0 +1,184 @@
+"""
+file name: compile_cache.py
+author: Handy
+date: 18 October 2026
+
+Persistent cache of the compiled circuits. An entry is keyed by a hash of everything
+the compilation depends on: the original qasm, the compilation name, the hardware,
+the calibration id, the TriQ measurement type and the versions of qiskit and of the
+TriQ binary. Each entry is one json file (updated qasm, compilation time, initial and
+final mapping), the least recently used entries are removed once the cache is larger
+than its maximum size.
+"""
+import os
+import json
+import hashlib
+import tempfile
+import time
+import qiskit
+
+cache_path = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(cache_path)
+grandparent_dir = os.path.dirname(parent_dir)
+
+default_cache_dir = os.path.join(grandparent_dir, "cache", "compiled")
+triq_binary_path = os.path.join(parent_dir, "triq_wrapper", "triq")
+
+_library_versions = None
+
+def get_library_versions():
+    """
+    Versions of the compilers: the qiskit version and a hash of the TriQ binary
+    """
+    global _library_versions
+
+    if _library_versions is None:
+        triq_version = None
+        if os.path.isfile(triq_binary_path):
+            with open(triq_binary_path, "rb") as file:
+                triq_version = hashlib.sha256(file.read()).hexdigest()
+
+        _library_versions = {"qiskit": qiskit.__version__, "triq": triq_version}
+
+    return _library_versions
+
+def get_compile_key(qasm, compilation_name, hardware_name, calibration_id=None, measurement_type=None):
+    key = {
+        "qasm": hashlib.sha256(qasm.encode()).hexdigest(),
+        "compilation_name": compilation_name,
+        "hardware_name": hardware_name,
+        "calibration_id": None if calibration_id is None else str(calibration_id),
+        "measurement_type": measurement_type,
+        "versions": get_library_versions(),
+    }
+
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+class CompileCache:
+    def __init__(self, cache_dir=None, max_size_mb=256, enabled=True):
+        self.cache_dir = default_cache_dir if cache_dir is None else cache_dir
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.enabled = enabled
+
+        self.hits = 0
+        self.misses = 0
+
+    def get_file_path(self, key):
+        return os.path.join(self.cache_dir, key + ".json")
+
+    def get(self, key):
+        """
+        Returns (updated_qasm, compilation_time, initial_mapping, final_mapping), or None
+        if the circuit is not in the cache (or the cache is bypassed)
+        """
+        if not self.enabled:
+            return None
+
+        file_path = self.get_file_path(key)
+        try:
+            with open(file_path, "r") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # the modification time is the last use, for the eviction
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        return (entry["updated_qasm"], entry["compilation_time"], entry["initial_mapping"], entry["final_mapping"])
+
+    def put(self, key, compiled):
+        if not self.enabled:
+            return
+
+        updated_qasm, compilation_time, initial_mapping, final_mapping = compiled
+        entry = {
+            "updated_qasm": updated_qasm,
+            "compilation_time": compilation_time,
+            "initial_mapping": initial_mapping,
+            "final_mapping": final_mapping,
+        }
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # write to a temporary file first, so the other processes never read half an entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, self.get_file_path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+    def get_entries(self):
+        # (last use, size, path) of the entries, least recently used first
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+
+        for file_name in os.listdir(self.cache_dir):
+            if not file_name.endswith(".json"):
+                continue
+            file_path = os.path.join(self.cache_dir, file_name)
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file_path))
+
+        return sorted(entries)
+
+    def evict(self):
+        entries = self.get_entries()
+        total_size = sum(size for _, size, _ in entries)
+
+        for _, size, file_path in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        for _, _, file_path in self.get_entries():
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    def get_stats(self):
+        entries = self.get_entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "size": sum(size for _, size, _ in entries),
+        }
+
+    def get_or_compile(self, key, compile_function, *args, **kwargs):
+        """
+        Returns the compiled circuit from the cache, or compiles it with compile_function
+        and stores it, and whether it was found in the cache. On a hit the compilation
+        time is the time of the lookup, the time of the original compilation stays in
+        the entry
+        """
+        tmp_start_time = time.perf_counter()
+        compiled = self.get(key)
+        if compiled is not None:
+            tmp_end_time = time.perf_counter()
+            return (compiled[0], tmp_end_time - tmp_start_time) + tuple(compiled[2:]), True
+
+        compiled = compile_function(*args, **kwargs)
+        self.put(key, compiled)
+
+        return compiled, False
@@ -1,23 +1,56 @@
+from .codec import encode_counts, decode_counts, encode_text, decode_text, read_counts, read_text
 from .database_wrapper import (
+    get_connection,
+    commit,
+    transaction,
     init_result_header,
     insert_to_result_detail,
+    insert_to_result_detail_batch,
+    upsert_result_backend_json,
+    upsert_metric,
     update_circuit_data,
     get_header_with_null_job,
     get_detail_with_header_id,
     get_pending_jobs,
     get_executed_jobs,
     update_result_header_status_by_header_id,
-    update_result_header
+    update_result_header,
+    sql_header_with_null_job,
+    sql_pending_jobs,
+    sql_executed_jobs,
+    sql_compiled_details,
+    sql_job_details,
+    sql_simulator_details,
+    sql_metric_details
 )
 
 __all__ = [
+    "encode_counts",
+    "decode_counts",
+    "encode_text",
+    "decode_text",
+    "read_counts",
+    "read_text",
+    "get_connection",
+    "commit",
+    "transaction",
     "init_result_header",
     "insert_to_result_detail",
+    "insert_to_result_detail_batch",
+    "upsert_result_backend_json",
+    "upsert_metric",
     "update_circuit_data",
     "get_header_with_null_job",
     "get_detail_with_header_id",
     "get_pending_jobs",
     "get_executed_jobs",
     "update_result_header_status_by_header_id",
-    "update_result_header"
+    "update_result_header",
+    "sql_header_with_null_job",
+    "sql_pending_jobs",
+    "sql_executed_jobs",
+    "sql_compiled_details",
+    "sql_job_details",
+    "sql_simulator_details",
+    "sql_metric_details"
 ]
\ No newline at end of file
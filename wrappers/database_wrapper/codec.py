@@ -0,0 +1,90 @@
+"""
+file name: codec.py
+author: Handy
+date: 18 October 2026
+
+Compact storage of the quasi-distributions and the qasm in BLOB columns. A histogram
+is stored as its packed outcomes (the rows of Counts) and its values in one array,
+compressed with zlib; a qasm is stored compressed with zlib. The legacy rows (json
+and text columns) are still read.
+"""
+import struct
+import zlib
+import numpy as np
+
+from commons import Counts, convert_to_json
+
+# format of the compact histograms: magic, version, value type, width, number of outcomes
+COUNTS_MAGIC = b"NQD"
+COUNTS_VERSION = 1
+COUNTS_HEADER = struct.Struct("<3sBcII")
+
+# value types: integer counts or probabilities
+VALUE_TYPES = {b"u": np.dtype("<u4"), b"f": np.dtype("<f8")}
+
+COMPRESSION_LEVEL = 6
+
+def encode_counts(counts: Counts):
+    if np.issubdtype(counts.counts.dtype, np.integer) and (len(counts) == 0 or counts.counts.max() < 2**32):
+        value_type = b"u"
+    else:
+        value_type = b"f"
+
+    values = counts.counts.astype(VALUE_TYPES[value_type])
+    header = COUNTS_HEADER.pack(COUNTS_MAGIC, COUNTS_VERSION, value_type, counts.width, len(counts))
+
+    return zlib.compress(header + counts.data.tobytes() + values.tobytes(), COMPRESSION_LEVEL)
+
+def decode_counts(blob):
+    raw = zlib.decompress(blob)
+    magic, version, value_type, width, size = COUNTS_HEADER.unpack_from(raw)
+    if magic != COUNTS_MAGIC or version != COUNTS_VERSION:
+        raise ValueError("Unknown format of the stored histogram")
+
+    offset = COUNTS_HEADER.size
+    nbytes = size * ((width + 7) // 8)
+    data = np.frombuffer(raw, dtype=np.uint8, count=nbytes, offset=offset)
+    values = np.frombuffer(raw, dtype=VALUE_TYPES[value_type], count=size, offset=offset + nbytes)
+
+    return Counts(data, values, width)
+
+def encode_text(text):
+    return zlib.compress(text.encode(), COMPRESSION_LEVEL)
+
+def decode_text(blob):
+    return zlib.decompress(blob).decode()
+
+def read_counts(counts_json, counts_blob, width):
+    '''
+    Histogram of a row, from the compact column if it is set, else from the legacy json
+    column {decimal string: value}. The outcomes are zero-extended to width bits, a
+    ValueError is raised if they do not fit in width bits (as for the json column).
+    '''
+    if counts_blob is not None:
+        counts = decode_counts(counts_blob)
+        if counts.width > width:
+            raise ValueError("Outcomes of {} bits do not fit in {} bits".format(counts.width, width))
+
+        return counts if counts.width == width else counts.resized(width)
+
+    return Counts.from_json(counts_json, width)
+
+def read_text(text, text_blob):
+    # qasm of a row, from the compact column if it is set, else from the legacy text column
+    if text_blob is not None:
+        return decode_text(text_blob)
+
+    return text
+
+def to_json(counts):
+    # legacy json column, the rows may already hold json strings
+    if isinstance(counts, Counts):
+        return convert_to_json(counts.to_int_dict())
+
+    return counts
+
+def to_blob(counts):
+    if isinstance(counts, Counts):
+        return encode_counts(counts)
+
+    return None
@@ -4,20 +4,103 @@ author: Handy
 date: 13 June 2024
 """
 from datetime import datetime
-import time, json
-import mysql.connector
+import time, json, os
+from contextlib import contextmanager
 
-from commons import (Config, convert_utc_to_local, calculate_time_diff, convert_to_json)
+from commons import (conf, convert_utc_to_local, calculate_time_diff, convert_to_json)
 from ..qiskit_wrapper import QiskitCircuit
+from .codec import encode_text, read_text, to_json, to_blob
+from . import sqlite_backend
 
-conf = Config()
 debug = conf.activate_debugging_time
 
+#region Connections
+
+# one pool per process, the connections cannot be shared with the forked workers
+_pools = {}
+
+# ids of the connections inside a transaction block, their commits are deferred
+_transactions = set()
+
+def get_connection_pool():
+    # imported on the first use, the SQLite backend does not need mysql.connector
+    from mysql.connector import pooling
+
+    pid = os.getpid()
+    if pid not in _pools:
+        _pools[pid] = pooling.MySQLConnectionPool(pool_name="napc_{}".format(pid), pool_size=conf.mysql_pool_size, 
+                                                  **conf.mysql_config)
+
+    return _pools[pid]
+
+def get_connection():
+    '''
+    Returns a connection of the pool of the process, close() gives it back to the pool. 
+    When all the connections of the pool are in use, a new connection is opened.
+    With [StorageConfig] backend = sqlite, returns a connection to the SQLite database.
+    '''
+    if conf.database_backend == "sqlite":
+        return sqlite_backend.connect(conf.sqlite_path)
+
+    import mysql.connector
+    from mysql.connector import pooling
+
+    try:
+        return get_connection_pool().get_connection()
+    except pooling.PoolError:
+        return mysql.connector.connect(**conf.mysql_config)
+
+def commit(conn):
+    # commits, unless conn is inside a transaction block (then it is committed at the end of the block)
+    if id(conn) not in _transactions:
+        conn.commit()
+
+@contextmanager
+def transaction(conn = None):
+    '''
+    Unit of work: the commits on conn inside the block are deferred, everything is 
+    committed once at the end of the block, or rolled back on error. Without conn, a 
+    connection of the pool is used and given back at the end. Yields (conn, cursor).
+    '''
+    own_connection = conn is None
+    if own_connection:
+        conn = get_connection()
+
+    cursor = conn.cursor()
+
+    # nested block: the outer block commits
+    if id(conn) in _transactions:
+        try:
+            yield conn, cursor
+        finally:
+            cursor.close()
+        return
+
+    _transactions.add(id(conn))
+    try:
+        yield conn, cursor
+        _transactions.discard(id(conn))
+        conn.commit()
+    except Exception:
+        _transactions.discard(id(conn))
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if own_connection:
+            conn.close()
+
+#endregion
+
+def get_now_datetime():
+    # ISO datetime, read the same way by MySQL and SQLite (as datetime('now', 'localtime'))
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
 def init_result_header(cursor, user_id, hardware_name=conf.hardware_name, token=conf.qiskit_token, 
                        program_type = "sampler", shots = conf.shots):
     if debug: tmp_start_time  = time.perf_counter()
 
-    now_time = datetime.now().strftime("%Y%m%d%H%M%S")
+    now_time = get_now_datetime()
     cursor.execute("""INSERT INTO result_header (user_id, hw_name, qiskit_token, program_type,                
                    shots, runs, created_datetime) 
     VALUES (%s, %s, %s, %s, 
@@ -32,9 +115,33 @@ def init_result_header(cursor, user_id, hardware_name=conf.hardware_name, token=
 
     return header_id
     
-def insert_to_result_detail(conn, cursor, header_id, circuit_name, noisy_simulator, noise_level, compilation_name, compilation_time, 
-                            updated_qasm, initial_mapping = "", final_mapping = ""):
-        now_time = datetime.now().strftime("%Y%m%d%H%M%S")
+sql_insert_result_detail = """
+        INSERT INTO result_detail
+        (header_id, circuit_name, compilation_name, compilation_time, 
+        initial_mapping, final_mapping, noisy_simulator, noise_level, 
+        created_datetime, compilation_cached)
+        VALUES (%s, %s, %s, %s, 
+        %s, %s, %s, %s,
+        %s, %s);
+        """
+
+sql_insert_result_updated_qasm = """
+        INSERT INTO result_updated_qasm
+        (detail_id, updated_qasm, updated_qasm_bin)
+        VALUES (%s, %s, %s);
+        """
+
+def get_updated_qasm_params(detail_id, updated_qasm):
+        # compact storage: the qasm is compressed into the blob column
+        if conf.storage_compact:
+            return (detail_id, None, encode_text(updated_qasm))
+
+        return (detail_id, updated_qasm, None)
+
+def get_result_detail_params(header_id, circuit_name, noisy_simulator, noise_level, compilation_name, compilation_time, 
+                             initial_mapping = "", final_mapping = "", compilation_cached = False):
+        # compilation_cached: the circuit comes from the compile cache, compilation_time is the lookup time
+        now_time = get_now_datetime()
         
         noisy_simulator_flag = None
         if noisy_simulator: 
@@ -42,17 +149,6 @@ def insert_to_result_detail(conn, cursor, header_id, circuit_name, noisy_simulat
             # noise_level = 1
         else:
             noise_level = None
-        
-            
-        sql = """
-        INSERT INTO result_detail
-        (header_id, circuit_name, compilation_name, compilation_time, 
-        initial_mapping, final_mapping, noisy_simulator, noise_level, 
-        created_datetime)
-        VALUES (%s, %s, %s, %s, 
-        %s, %s, %s, %s,
-        %s);
-        """
 
         str_initial_mapping = ', '.join(str(x) for x in initial_mapping)
 
@@ -60,23 +156,102 @@ def insert_to_result_detail(conn, cursor, header_id, circuit_name, noisy_simulat
         if final_mapping != "":
             json_final_mapping = json.dumps(final_mapping, default=str)
 
-
         params = (header_id, circuit_name, compilation_name, compilation_time, 
                   str_initial_mapping, json_final_mapping, noisy_simulator_flag, noise_level, 
-                  now_time)
+                  now_time, 1 if compilation_cached else 0)
+        
+        return params
 
-        cursor.execute(sql, params)
+def insert_to_result_detail(conn, cursor, header_id, circuit_name, noisy_simulator, noise_level, compilation_name, compilation_time, 
+                            updated_qasm, initial_mapping = "", final_mapping = "", compilation_cached = False):
+        params = get_result_detail_params(header_id, circuit_name, noisy_simulator, noise_level, compilation_name, 
+                                          compilation_time, initial_mapping, final_mapping, compilation_cached)
+
+        cursor.execute(sql_insert_result_detail, params)
         detail_id = cursor.lastrowid
 
-        sql = """
-        INSERT INTO result_updated_qasm
-        (detail_id, updated_qasm)
-        VALUES (%s, %s);
+        cursor.execute(sql_insert_result_updated_qasm, get_updated_qasm_params(detail_id, updated_qasm))
+
+        commit(conn)
+
+def insert_to_result_detail_batch(conn, cursor, header_id, noisy_simulator, compiled_circuits):
+        """
+        Inserts many compiled circuits at once, in a single transaction. Each compiled circuit is 
+        (circuit_name, noise_level, compilation_name, updated_qasm, compilation_time, initial_mapping, final_mapping),
+        optionally followed by compilation_cached (False by default)
+        """
+        qasm_params = []
+        for compiled_circuit in compiled_circuits:
+            (circuit_name, noise_level, compilation_name, updated_qasm, 
+             compilation_time, initial_mapping, final_mapping) = compiled_circuit[:7]
+            compilation_cached = compiled_circuit[7] if len(compiled_circuit) > 7 else False
+
+            params = get_result_detail_params(header_id, circuit_name, noisy_simulator, noise_level, compilation_name, 
+                                              compilation_time, initial_mapping, final_mapping, compilation_cached)
+
+            # one by one to get the id of each detail
+            cursor.execute(sql_insert_result_detail, params)
+            qasm_params.append(get_updated_qasm_params(cursor.lastrowid, updated_qasm))
+
+        if len(qasm_params) > 0:
+            cursor.executemany(sql_insert_result_updated_qasm, qasm_params)
+
+        commit(conn)
+
+# upserts on the unique detail_id (mariadb/migrations/001_unique_detail_id.sql), a row is
+# stored either in the json/text columns or in the compact blob columns, the other ones are NULL
+sql_upsert_result_backend_json = """
+        INSERT INTO result_backend_json 
+        (detail_id, quasi_dists, quasi_dists_std, qasm, 
+        quasi_dists_bin, quasi_dists_std_bin, qasm_bin, shots, mapping_json) 
+        VALUES (%s, %s, %s, %s, 
+        %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE quasi_dists = VALUES(quasi_dists), quasi_dists_std = VALUES(quasi_dists_std), 
+        qasm = VALUES(qasm), quasi_dists_bin = VALUES(quasi_dists_bin), quasi_dists_std_bin = VALUES(quasi_dists_std_bin), 
+        qasm_bin = VALUES(qasm_bin), shots = VALUES(shots), mapping_json = VALUES(mapping_json);
+        """
+
+sql_upsert_metric = """
+        INSERT INTO metric (detail_id, total_gate, total_one_qubit_gate, total_two_qubit_gate, circuit_depth,  
+        success_rate_polar, polar_count_accept, polar_count_logerror, 
+        polar_count_undecided, detection_time, decoding_time)
+        VALUES (%s, %s, %s, %s, %s,
+        %s, %s, %s, 
+        %s, %s, %s)
+        ON DUPLICATE KEY UPDATE total_gate = VALUES(total_gate), total_one_qubit_gate = VALUES(total_one_qubit_gate), 
+        total_two_qubit_gate = VALUES(total_two_qubit_gate), circuit_depth = VALUES(circuit_depth), 
+        success_rate_polar = VALUES(success_rate_polar), polar_count_accept = VALUES(polar_count_accept), 
+        polar_count_logerror = VALUES(polar_count_logerror), polar_count_undecided = VALUES(polar_count_undecided), 
+        detection_time = VALUES(detection_time), decoding_time = VALUES(decoding_time);
         """
 
-        cursor.execute(sql, (detail_id, updated_qasm))
+def get_result_backend_json_params(row):
+    detail_id, quasi_dists, quasi_dists_std, qasm, shots, mapping_json = row
 
-        conn.commit()
+    if conf.storage_compact:
+        return (detail_id, None, None, None, 
+                to_blob(quasi_dists), to_blob(quasi_dists_std), encode_text(qasm), shots, mapping_json)
+
+    return (detail_id, to_json(quasi_dists), to_json(quasi_dists_std), qasm, 
+            None, None, None, shots, mapping_json)
+
+def upsert_result_backend_json(cursor, rows):
+    '''
+    Inserts or updates the results of many details in one statement. Each row is 
+    (detail_id, quasi_dists, quasi_dists_std, qasm, shots, mapping_json), the histograms
+    as Counts (or json strings)
+    '''
+    if len(rows) > 0:
+        cursor.executemany(sql_upsert_result_backend_json, [get_result_backend_json_params(row) for row in rows])
+
+def upsert_metric(cursor, rows):
+    '''
+    Inserts or updates the metrics of many details in one statement. Each row is 
+    (detail_id, total_gate, total_one_qubit_gate, total_two_qubit_gate, circuit_depth, 
+    success_rate_polar, count_accept, count_logerror, count_undecided, detection_time, decoding_time)
+    '''
+    if len(rows) > 0:
+        cursor.executemany(sql_upsert_metric, rows)
 
 def update_circuit_data(conn, cursor, qc: QiskitCircuit):
     gates_json = convert_to_json(qc.gates)
@@ -96,7 +271,7 @@ def update_circuit_data(conn, cursor, qc: QiskitCircuit):
             VALUES (%s, %s, %s, %s, %s)""",
             (circuit_name, qc.qasm, qc.depth, qc.total_gate, gates_json))
 
-        conn.commit()
+        commit(conn)
 
         # print(circuit_name, "has been registered to the database.")
     else:
@@ -104,43 +279,76 @@ def update_circuit_data(conn, cursor, qc: QiskitCircuit):
                                 WHERE name = %s""",
             (qc.qasm, qc.depth, qc.total_gate, gates_json, circuit_name))
 
-        conn.commit()
+        commit(conn)
         # print(circuit_name, "already exist.")
 
-def get_header_with_null_job(cursor):
+#region Scheduler queries
 
-    cursor.execute('SELECT id, qiskit_token, shots, runs FROM result_header WHERE job_id IS NULL;')
+# queries run by the scheduler on every poll, covered by the indexes of
+# mariadb/migrations/003_scheduler_indexes.sql (checked by check_indexes.py)
 
-    return cursor.fetchall()
+sql_header_with_null_job = 'SELECT id, qiskit_token, shots, runs FROM result_header WHERE job_id IS NULL;'
 
-def get_detail_with_header_id(cursor, header_id):
-    cursor.execute('''SELECT d.id, q.updated_qasm, d.compilation_name 
+sql_pending_jobs = '''SELECT distinct h.id, h.job_id, qiskit_token, hw_name 
+                           FROM result_header h 
+                            INNER JOIN result_detail d ON h.id = d.header_id 
+                            WHERE h.status = %s '''
+
+sql_executed_jobs = '''SELECT id, job_id FROM result_header WHERE status = %s;'''
+
+# compiled circuits of a header not sent yet (send_to_backend)
+sql_compiled_details = '''SELECT d.id, q.updated_qasm, q.updated_qasm_bin, d.compilation_name 
 FROM result_detail d
 INNER JOIN result_header h ON d.header_id = h.id
 INNER JOIN result_updated_qasm q ON d.id = q.detail_id 
-WHERE h.job_id IS NULL AND d.header_id = %s  ''', (header_id,)
-)
-    
+WHERE h.job_id IS NULL AND d.header_id = %s  '''
+
+# details of a job of the real backend (get_result)
+sql_job_details = '''SELECT d.id, h.shots FROM result_header h 
+INNER JOIN result_detail d ON h.id = d.header_id
+WHERE h.status = %s AND h.job_id = %s;'''
+
+# details of a header still to be simulated (process_simulator)
+sql_simulator_details = '''SELECT d.id, q.updated_qasm, q.updated_qasm_bin, d.compilation_name, d.noise_level, h.shots 
+FROM result_detail d
+INNER JOIN result_header h ON d.header_id = h.id
+INNER JOIN result_updated_qasm q ON d.id = q.detail_id 
+LEFT JOIN result_backend_json j ON d.id = j.detail_id
+WHERE h.status = %s AND h.job_id = %s AND d.header_id = %s AND j.quasi_dists IS NULL AND j.quasi_dists_bin IS NULL  '''
+
+# results of a header to compute the metrics (get_metrics)
+sql_metric_details = '''SELECT j.detail_id, j.qasm, j.qasm_bin, j.quasi_dists, j.quasi_dists_bin, d.circuit_name, 
+                       d.compilation_name, d.noise_level, j.shots 
+                       FROM result_backend_json j
+        INNER JOIN result_detail d ON j.detail_id = d.id
+        INNER JOIN result_header h ON d.header_id = h.id
+        WHERE h.status = %s AND h.job_id = %s AND h.id = %s AND (j.quasi_dists IS NOT NULL OR j.quasi_dists_bin IS NOT NULL);'''
+
+#endregion
+
+def get_header_with_null_job(cursor):
+
+    cursor.execute(sql_header_with_null_job)
+
     return cursor.fetchall()
 
+def get_detail_with_header_id(cursor, header_id):
+    cursor.execute(sql_compiled_details, (header_id,))
+    
+    return [(detail_id, read_text(updated_qasm, updated_qasm_bin), compilation_name) 
+            for detail_id, updated_qasm, updated_qasm_bin, compilation_name in cursor.fetchall()]
+
 def get_pending_jobs():
     '''
     Returns job_id if the status in the result_detail table is pending (job has been sent to backend and we are waiting for the result)
     '''
     
+    results = []
     try:
-        conn = mysql.connector.connect(**conf.mysql_config)
-        cursor = conn.cursor()
-        
-        cursor.execute('''SELECT distinct h.id, h.job_id, qiskit_token, hw_name 
-                       FROM result_header h 
-                        INNER JOIN result_detail d ON h.id = d.header_id 
-                        WHERE h.status = %s ''', ("pending",))
-        
-        results = cursor.fetchall()
-        
-        cursor.close()
-        conn.close()
+        with transaction() as (conn, cursor):
+            cursor.execute(sql_pending_jobs, ("pending",))
+            
+            results = cursor.fetchall()
 
     except Exception as e:
         print("An error occurred:", str(e))
@@ -152,15 +360,12 @@ def get_executed_jobs():
     Returns job_id if the status in the result_detail table is executed (job has been executed in the backend and we have to compute metrics)
     '''
     
+    results = []
     try:
-        conn = mysql.connector.connect(**conf.mysql_config)
-        cursor = conn.cursor()
+        with transaction() as (conn, cursor):
+            cursor.execute(sql_executed_jobs, ("executed", ))
 
-        cursor.execute('''SELECT id, job_id FROM result_header WHERE status = %s;''', ("executed", ))
-
-        results = cursor.fetchall()
-        cursor.close()
-        conn.close()
+            results = cursor.fetchall()
 
     except Exception as e:
         print("An error occurred:", str(e))
@@ -171,16 +376,14 @@ def update_result_header_status_by_header_id(header_id, new_status):
     '''
     Updates result_header entries that contained prev_status to new_status by header_id
     '''
-    conn = mysql.connector.connect(**conf.mysql_config)
-    cursor = conn.cursor()
-    cursor.execute('UPDATE result_header SET status = %s, updated_datetime = NOW() WHERE id = %s', (new_status, header_id))
-    conn.commit()
-    cursor.close()
-    conn.close()
+    with transaction() as (conn, cursor):
+        cursor.execute('UPDATE result_header SET status = %s, updated_datetime = NOW() WHERE id = %s', (new_status, header_id))
 
 def update_result_header(cursor, job):
-    execution_time = job.metrics()["usage"]["quantum_seconds"]
-    job_time = job.metrics()["timestamps"]
+    # one request to the runtime service
+    metrics = job.metrics()
+    execution_time = metrics["usage"]["quantum_seconds"]
+    job_time = metrics["timestamps"]
     created_datetime = convert_utc_to_local(job_time["created"])
     running_datetime = convert_utc_to_local(job_time["running"])
     completed_datetime = convert_utc_to_local(job_time["finished"])
@@ -0,0 +1,160 @@
+"""
+file name: sqlite_backend.py
+author: Handy
+date: 18 October 2026
+
+SQLite implementation of the database of the framework, to run the experiments
+in-process without a MariaDB server ([StorageConfig] backend = sqlite). The
+connections and cursors behave like the mysql.connector ones, and the queries of
+the framework (MySQL dialect) are translated on the fly: %s placeholders, NOW() and
+INSERT ... ON DUPLICATE KEY UPDATE.
+"""
+import os
+import re
+import sqlite3
+import threading
+from functools import lru_cache
+
+sqlite_path = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(sqlite_path)
+grandparent_dir = os.path.dirname(parent_dir)
+
+default_database_path = os.path.join(grandparent_dir, "framework.sqlite")
+schema_path = os.path.join(grandparent_dir, "sqlite", "framework_structure.sql")
+data_path = os.path.join(grandparent_dir, "mariadb", "data.sql")
+
+# columns added after the first version of the schema (the mariadb/migrations), added
+# to the databases created before them: table, column, definition
+added_columns = [
+    ("result_detail", "compilation_cached", "tinyint DEFAULT NULL"),
+]
+
+# views changed after the first version of the schema: view, column it must have
+updated_views = [
+    ("result", "quasi_dists_bin"),
+]
+
+# databases already checked for the schema, by this process
+_initialized = set()
+_init_lock = threading.Lock()
+
+_re_placeholder = re.compile(r"%s")
+_re_now = re.compile(r"\bNOW\(\)", re.IGNORECASE)
+_re_duplicate_key = re.compile(r"\bON\s+DUPLICATE\s+KEY\s+UPDATE\b", re.IGNORECASE)
+_re_values_column = re.compile(r"\bVALUES\((\w+)\)", re.IGNORECASE)
+_re_string_literal = re.compile(r"'((?:[^'\\]|\\.)*)'", re.DOTALL)
+_re_backslash_escape = re.compile(r"\\(.)", re.DOTALL)
+
+_mysql_escapes = {"n": "\n", "r": "\r", "t": "\t", "0": "\0", "Z": "\x1a"}
+
+@lru_cache(maxsize=512)
+def translate_sql(sql):
+    '''
+    Translates a query of the framework from the MySQL dialect to SQLite
+    '''
+    sql = _re_placeholder.sub("?", sql)
+    sql = _re_now.sub("datetime('now', 'localtime')", sql)
+
+    match = _re_duplicate_key.search(sql)
+    if match:
+        # the upserts of the framework update the columns with the inserted values
+        update = _re_values_column.sub(r"excluded.\1", sql[match.end():])
+        sql = sql[:match.start()] + "ON CONFLICT DO UPDATE SET" + update
+
+    return sql
+
+def translate_mysql_literals(statement):
+    # string literals of a MySQL dump use backslash escapes, SQLite only doubles the quotes
+    def translate(match):
+        value = _re_backslash_escape.sub(lambda m: _mysql_escapes.get(m.group(1), m.group(1)), match.group(1))
+        return "'" + value.replace("'", "''") + "'"
+
+    return _re_string_literal.sub(translate, statement)
+
+class SQLiteCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, params=()):
+        self.cursor.execute(translate_sql(sql), params)
+
+    def executemany(self, sql, params):
+        self.cursor.executemany(translate_sql(sql), params)
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+class SQLiteConnection:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def cursor(self):
+        return SQLiteCursor(self.connection.cursor())
+
+    def commit(self):
+        self.connection.commit()
+
+    def rollback(self):
+        self.connection.rollback()
+
+    def close(self):
+        self.connection.close()
+
+def init_database(connection, load_data=True):
+    '''
+    Creates the tables and views, and loads the reference data of mariadb/data.sql
+    (hardware, calibration types, compilation techniques, users, calibration data)
+    '''
+    with open(schema_path, "r") as file:
+        schema = file.read()
+
+    # views of an older schema are created again
+    for view, column in updated_views:
+        row = connection.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = ?", (view, )).fetchone()
+        if row is not None and column not in row[0]:
+            connection.execute("DROP VIEW `{}`".format(view))
+
+    connection.executescript(schema)
+
+    for table, column, definition in added_columns:
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(`{}`)".format(table))]
+        if column not in columns:
+            connection.execute("ALTER TABLE `{}` ADD COLUMN `{}` {}".format(table, column, definition))
+
+    cursor = connection.execute("SELECT COUNT(*) FROM hardware")
+    if load_data and cursor.fetchone()[0] == 0 and os.path.isfile(data_path):
+        with open(data_path, "r") as file:
+            for line in file:
+                if line.startswith("INSERT INTO"):
+                    connection.execute(translate_mysql_literals(line.strip().rstrip(";")))
+
+    connection.commit()
+
+def connect(database_path=None):
+    if database_path is None:
+        database_path = default_database_path
+
+    connection = sqlite3.connect(database_path, timeout=60)
+
+    with _init_lock:
+        if database_path not in _initialized:
+            # WAL: the readers do not wait for the writers of the other processes
+            connection.execute("PRAGMA journal_mode=WAL")
+            init_database(connection)
+            _initialized.add(database_path)
+
+    return SQLiteConnection(connection)
@@ -1,6 +1,11 @@
-from .polar_wrapper import get_q1prep_sr, get_logical_error_on_accepted_states
+from .polar_wrapper import get_q1prep_sr, get_logical_error_on_accepted_states, PolarTiming
+from .lookup_table import PolarLookupTable, get_lookup_table, clear_lookup_tables
 
 __all__ = [
     "get_q1prep_sr",
-    "get_logical_error_on_accepted_states"
+    "get_logical_error_on_accepted_states",
+    "PolarTiming",
+    "PolarLookupTable",
+    "get_lookup_table",
+    "clear_lookup_tables"
 ]
\ No newline at end of file
@@ -58,6 +58,51 @@ def revpolarenc(U):
 		return U
 
 
+# ###########################################################################
+# batch polar encoder: encodes all the rows of U at once.  the recursion of
+# polarenc is unrolled into n butterfly stages of length h = 1, 2, ..., N/2,
+# each one being a single xor over the whole array.  the stages act on
+# different levels of the tensor product, so their order does not matter
+# ###########################################################################
+# input argument
+# U: numpy.array of integers, uncoded bits on the last axis (... x N)
+#  : not modified by the function
+# returned value
+# X: numpy.array of the same shape as U, encoded bits on the last axis
+def polarenc_batch(U):
+	X = np.array(U)   # contiguous copy, reshaped below as a view
+	N = np.size(X, -1)
+	h = 1
+	
+	while h < N:
+		# pair the two halves of every block of length 2h
+		X2 = X.reshape(X.shape[:-1] + (N//(2*h), 2, h))
+		
+		# do the BITWISE CNOT gate with the second half as control
+		X2[..., 0, :] ^= X2[..., 1, :]
+		h = 2*h
+	
+	return X
+
+# #################################################################
+# batch reverse polar encoder: revpolarenc applied to all the rows 
+# #################################################################
+def revpolarenc_batch(U):
+	X = np.array(U)   # contiguous copy, reshaped below as a view
+	N = np.size(X, -1)
+	h = 1
+	
+	while h < N:
+		# pair the two halves of every block of length 2h
+		X2 = X.reshape(X.shape[:-1] + (N//(2*h), 2, h))
+		
+		# do the BITWISE CNOT gate with the first half as control
+		X2[..., 1, :] ^= X2[..., 0, :]
+		h = 2*h
+	
+	return X
+
+
 # #####################################################################################
 # polar decoder: this implementation supports only one information bit per coded block
 # as we only decode one decoding tree (correspopnding to the information position ipos),
@@ -155,6 +200,78 @@ def revpolardec(llr_list, ipos):
 	return u_ipos
 
 
+# ###########################################################################
+# batch polar decoder: polardec applied to all the rows of a matrix of llrs
+# at once.  each row is decoded along the same decoding tree (information 
+# position ipos), so that each level of the tree is a single min-sum or sum
+# operation over the whole matrix
+# ###########################################################################
+# input argument
+# llr_list: numpy.array, matrix of llr values (M x N), one llr vector per row
+#         : not modified by the function
+#     ipos: scalar, information position
+# returned value
+#   u_ipos: numpy.array of M guessed values of the uncoded bit at position ipos
+#         : -1 for undecided values (llr = 0)
+def polardec_batch(llr_list, ipos):
+	N  = np.size(llr_list, 1)   # code length
+	ip = ipos  # copy of ipos (information position)
+	
+	while N > 1:
+		h = N//2
+		
+		llr_list1 = llr_list[:, 0:h]
+		llr_list2 = llr_list[:, h:N]
+		
+		if ip < h: # decoding bad channel
+			llr_list = np.sign(llr_list1)*np.sign(llr_list2)*np.minimum(abs(llr_list1), abs(llr_list2)) # min-sum decoding rule
+		
+		else: # ip >= h: decoding good channel
+			llr_list = llr_list1 + llr_list2
+			ip = ip - h
+		
+		# update N
+		N = h
+	
+	return llr_decision(llr_list[:, 0])
+
+# ######################################################################
+# batch reverse polar decoder: revpolardec applied to all the rows 
+# ######################################################################
+def revpolardec_batch(llr_list, ipos):
+	N  = np.size(llr_list, 1)   # code length
+	ip = ipos  # copy of ipos (information position)
+	
+	while N > 1:
+		h = N//2
+		
+		llr_list1 = llr_list[:, 0:h]
+		llr_list2 = llr_list[:, h:N]
+		
+		if ip < h: # decoding good channel
+			llr_list = llr_list1 + llr_list2
+			
+		else: # ip >= h: decoding bad channel
+			llr_list = np.sign(llr_list1)*np.sign(llr_list2)*np.minimum(abs(llr_list1), abs(llr_list2)) # min-sum decoding rule
+			ip = ip - h
+		
+		# update N
+		N = h
+	
+	return llr_decision(llr_list[:, 0])
+
+# ##########################################################################
+# hard decision on a vector of llrs: 0 if llr > 0, 1 if llr < 0, -1 if
+# llr = 0 (undecided value, tracked in the calling function)
+# ##########################################################################
+def llr_decision(llr_ipos):
+	u_ipos = np.full(np.shape(llr_ipos), -1, dtype=int)
+	u_ipos[llr_ipos > 0] = 0
+	u_ipos[llr_ipos < 0] = 1
+	
+	return u_ipos
+
+
 #### ################################################################### ####
 ####              POLAR DECODER DENSITY EVOLUTION                        ####
 #### ################################################################### ####
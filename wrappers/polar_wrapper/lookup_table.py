@@ -0,0 +1,158 @@
+"""
+file name: lookup_table.py
+author: Handy
+date: 18 October 2026
+
+Lookup tables of the outcome status (discarded, accepted, logical error, undecided)
+of the polar state preparation, keyed on the outcome packed into an integer.
+For small codes, the status only depends on the outcome, so each distinct outcome
+only has to be checked and decoded once. The tables are built lazily and cached in
+memory and on disk.
+"""
+import os
+import numpy as np
+
+polar_path = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(polar_path)
+grandparent_dir = os.path.dirname(parent_dir)
+
+default_cache_dir = os.path.join(grandparent_dir, "cache", "polar_lut")
+
+# largest code (n) and outcome width handled by the lookup tables
+MAX_LOOKUP_N = 4
+MAX_LOOKUP_BITS = 64
+
+# outcomes of up to FULL_TABLE_MAX_BITS bits get a full table (2**bits entries),
+# the larger ones a partial table, extended with the outcomes seen so far
+FULL_TABLE_MAX_BITS = 20
+
+# status codes stored in the tables
+STATUS_DISCARDED = 0
+STATUS_ACCEPTED = 1
+STATUS_LOGERROR = 2
+STATUS_UNDECIDED = 3
+
+# in-memory cache of the tables, keyed by (n, lstate, zpos, width)
+_lookup_tables = {}
+
+def is_lookup_supported(n, width):
+    return n <= MAX_LOOKUP_N and 0 < width <= MAX_LOOKUP_BITS
+
+def unpack_keys(keys, width):
+    """
+    Converts packed outcomes into a matrix of bits, one row per outcome, with the most
+    significant bit first (the same order as the bitstring)
+    """
+    shifts = np.arange(width - 1, -1, -1, dtype=np.uint64)
+    return ((keys[:, None] >> shifts[None, :]) & np.uint64(1)).astype(np.uint8)
+
+def get_lookup_table(n, lstate, zpos, width, cache_dir=None):
+    key = (n, lstate, zpos, width)
+    if key not in _lookup_tables:
+        _lookup_tables[key] = PolarLookupTable(n, lstate, zpos, width, cache_dir=cache_dir)
+
+    return _lookup_tables[key]
+
+def clear_lookup_tables():
+    _lookup_tables.clear()
+
+class PolarLookupTable:
+    def __init__(self, n, lstate, zpos, width, cache_dir=None):
+        if not is_lookup_supported(n, width):
+            raise ValueError("No lookup table for n = {} and {} measurement bits".format(n, width))
+
+        self.n = n
+        self.lstate = lstate
+        self.zpos = zpos
+        self.width = width
+        self.full = width <= FULL_TABLE_MAX_BITS
+        self.cache_dir = default_cache_dir if cache_dir is None else cache_dir
+
+        # full table: codes[key] / partial table: codes[i] is the status of keys[i] (sorted)
+        self.keys = None
+        self.codes = None
+        self.loaded = False
+
+    @property
+    def file_path(self):
+        file_name = "polar_lut_n{}_{}_z{}_w{}.npz".format(self.n, self.lstate.lower(), self.zpos, self.width)
+        return os.path.join(self.cache_dir, file_name)
+
+    def load(self):
+        if self.loaded:
+            return
+
+        if os.path.isfile(self.file_path):
+            try:
+                with np.load(self.file_path) as data:
+                    self.keys = data["keys"]
+                    self.codes = data["codes"]
+            except Exception as e:
+                print("Could not read the lookup table {}: {}".format(self.file_path, str(e)))
+                self.keys, self.codes = None, None
+
+        if self.codes is None:
+            if self.full:
+                self.keys = np.zeros((0,), dtype=np.uint64)
+                self.codes = self.compute(np.arange(2**self.width, dtype=np.uint64))
+                self.save()
+            else:
+                self.keys = np.zeros((0,), dtype=np.uint64)
+                self.codes = np.zeros((0,), dtype=np.int8)
+
+        self.loaded = True
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        # write to a temporary file first, so that a concurrent reader never sees half a table
+        tmp_path = "{}.{}.tmp.npz".format(self.file_path[:-4], os.getpid())
+        np.savez(tmp_path, keys=self.keys, codes=self.codes)
+        os.replace(tmp_path, self.file_path)
+
+    def compute(self, keys):
+        # imported here, polar_wrapper imports this module
+        from .polar_wrapper import get_outcome_status
+
+        meas_matrix = unpack_keys(keys, self.width)
+        accepted, logerror, undecided = get_outcome_status(self.n, self.lstate, self.zpos, meas_matrix)
+
+        codes = np.full(keys.shape, STATUS_DISCARDED, dtype=np.int8)
+        codes[accepted] = STATUS_ACCEPTED
+        codes[logerror] = STATUS_LOGERROR
+        codes[undecided] = STATUS_UNDECIDED
+
+        return codes
+
+    def lookup(self, keys):
+        """
+        Returns the status codes of the packed outcomes 'keys' (np array of uint64).
+        Outcomes missing from a partial table are computed and added to the table.
+        """
+        self.load()
+        keys = np.asarray(keys, dtype=np.uint64)
+
+        if self.full:
+            return self.codes[keys]
+
+        if len(self.keys) > 0:
+            idx = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+            found = (self.keys[idx] == keys)
+        else:
+            idx = np.zeros(keys.shape, dtype=np.intp)
+            found = np.zeros(keys.shape, dtype=bool)
+
+        if not found.all():
+            # extend the partial table with the missing outcomes, kept sorted
+            new_keys = np.unique(keys[~found])
+            new_codes = self.compute(new_keys)
+
+            all_keys = np.concatenate((self.keys, new_keys))
+            order = np.argsort(all_keys, kind="stable")
+            self.keys = all_keys[order]
+            self.codes = np.concatenate((self.codes, new_codes))[order]
+            self.save()
+
+            idx = np.searchsorted(self.keys, keys)
+
+        return self.codes[idx]
@@ -7,16 +7,42 @@ import numpy as np
 from . import __tools as tls
 from . import __polarcodec as codec
 from .__qpolarprep import q1prep as q1prep
+from .__qpolarprep import q1prep_batch as q1prep_batch
+from .lookup_table import (get_lookup_table, is_lookup_supported, 
+    STATUS_DISCARDED, STATUS_LOGERROR, STATUS_UNDECIDED)
+from commons import Counts
 import time
-
-def get_q1prep_sr(n, lstate, results):
-    # n = 4       # number of polarization steps (polar code length N = 2^n)
-    # lstate = "X" # prepared logical state: may be "Z" (|0>) or "X" (|+>)
-    
-    # # measurement results file
-    # # each line in the file contains the measurement results for one preparation experiment
-    # mfile = 'polar_code_n{}_{}_simulator.txt'.format(n, lstate.lower())
-    
+from contextlib import contextmanager
+
+class PolarTiming:
+    """
+    Time spent (in seconds) in each phase of the metric computation of a polar circuit
+    """
+    def __init__(self):
+        self.conversion_time = 0.0  # histogram to matrix of measurement results
+        self.detection_time = 0.0   # error detection (q1prep)
+        self.decoding_time = 0.0    # decoding of the accepted states
+        self.lookup_time = 0.0      # lookup table (detection and decoding together)
+
+    @property
+    def total_time(self):
+        return self.conversion_time + self.detection_time + self.decoding_time + self.lookup_time
+
+    @contextmanager
+    def measure(self, phase):
+        tmp_start_time  = time.perf_counter()
+        try:
+            yield self
+        finally:
+            tmp_end_time = time.perf_counter()
+            name = phase + "_time"
+            setattr(self, name, getattr(self, name) + tmp_end_time - tmp_start_time)
+
+    def __repr__(self):
+        return "PolarTiming(conversion={:.6f}s, detection={:.6f}s, decoding={:.6f}s, lookup={:.6f}s)".format(
+            self.conversion_time, self.detection_time, self.decoding_time, self.lookup_time)
+
+def get_zpos(n, lstate):
     # zpos: last position frozen in zero, counting from zero! (0 <= zpos < N-1)
     # list of zpos values, assuming that logical |0> is prepared (lstate = "Z")
     #       n =   0   1   2  3  4  5   6   7   8   9   10 
@@ -31,46 +57,27 @@ def get_q1prep_sr(n, lstate, results):
     else:
         raise TypeError("Illegal 'lstate' value")
 
-    N     = 2**n     # polar code length
-    mnum  = n*(N//2) # number of measurement results for each state preparation
+    return zpos
 
-    count_success = 0    # number of valid measurement results
-    count_failure = 0    # number of invalid measurement results
-    total_shots = sum(results.values())
+def get_meas_matrix(results):
+    """
+    Converts a counts histogram ({bitstring: count} or Counts) into a matrix of 
+    measurement results (one row per outcome, one column per bit) and the vector of counts
+    """
+    counts = Counts.from_dict(results)
 
-    # ##################################################################
-    # read measurement results from file, and check which ones are valid
-    # ##################################################################
-    for line, meas_counts in results.items():
-        # print(line)
-        # remove spaces at beginning and end of line
-        mstr = line.strip()
-
-        # init the measurement results array -- of length len(mstr)
-        meas = np.zeros((len(mstr),), dtype=int) 
-
-        # convert from string to np array
-        for i in range(0, len(mstr)):
-            meas[i] = ord(mstr[i]) - ord('0')	
-            if meas[i] != 0 and meas[i] != 1:
-                raise TypeError("Illegal measurement result: must be 0 or 1")
-
-
-        # check if 'meas' are valid measurement results
-        success, qstate_UV = q1prep(n, zpos, meas)
-        if success == 1:
-            count_success = count_success + meas_counts
-            # print(meas)
-        else:
-            count_failure = count_failure + meas_counts
+    return counts.bit_matrix(), counts.counts
 
-    # print("  number of valid measurement results = ", count_success, count_success / total_shots)
-    # print("number of invalid measurement results = ", count_failure, count_failure / total_shots)
-    # print("")
+def get_packed_outcomes(results):
+    """
+    Converts a counts histogram ({bitstring: count} or Counts) into a vector of outcomes 
+    packed into integers, the vector of counts and the number of bits of the outcomes
+    """
+    counts = Counts.from_dict(results)
 
-    return count_success / total_shots
+    return counts.keys, counts.counts, counts.width
 
-def get_logical_error_on_accepted_states(n, lstate, results):
+def get_q1prep_sr(n, lstate, results):
     # n = 4       # number of polarization steps (polar code length N = 2^n)
     # lstate = "X" # prepared logical state: may be "Z" (|0>) or "X" (|+>)
     
@@ -78,160 +85,155 @@ def get_logical_error_on_accepted_states(n, lstate, results):
     # # each line in the file contains the measurement results for one preparation experiment
     # mfile = 'polar_code_n{}_{}_simulator.txt'.format(n, lstate.lower())
     
-    # zpos: last position frozen in zero, counting from zero! (0 <= zpos < N-1)
-    # list of zpos values, assuming that logical |0> is prepared (lstate = "Z")
-    #       n =   0   1   2  3  4  5   6   7   8   9   10 
-    zpos_list = [-1, -1, 1, 3, 6, 7, 22, 15, 90, 31, 362]
-
-    if lstate == "Z":
-        # |0> is prepared: take zpos value from the list above
-        zpos = zpos_list[n]
-    elif lstate == "X":
-        # |+> is prepared: zpos value from the list above -1
-        zpos = zpos_list[n] -1
-    else:
-        raise TypeError("Illegal 'lstate' value")
+    zpos = get_zpos(n, lstate)
 
     N     = 2**n     # polar code length
     mnum  = n*(N//2) # number of measurement results for each state preparation
 
-    # count_discard/accept: number of states discarded/accepted during the state preparation protocol
-    # in case of errors detected during state preparation, the state is discarded, otherwise it is accepted  
-    count_accept  = 0    # number of accepted states (valid measurement results) -- was count_success in previous version
-    count_discard = 0    # number of discarded states (invalid measurement results) -- was count_failure in previous version
-
-    # count_logerror: number of logical errors on the accepted states
-    # we check whether the undetected errors that may have survived on the accepted (prepared)  
-    # state can be successfully corrected or not. when not, a logical error is counted
-    count_logerror = 0 
-    count_undecided = 0
-
-    # This is repeating just for calculating the detection time
-    tmp_start_time  = time.perf_counter()
-    for line, meas_counts in results.items():
-        # print(line)
-        # remove spaces at beginning and end of line
-        mstr = line.strip()
-
-        # init the measurement results array -- of length len(mstr)
-        meas = np.zeros((len(mstr),), dtype=int) 
-
-        # convert from string to np array
-        for i in range(0, len(mstr)):
-            meas[i] = ord(mstr[i]) - ord('0')	
-            if meas[i] != 0 and meas[i] != 1:
-                raise TypeError("Illegal measurement result: must be 0 or 1")
-
-
-        # check if 'meas' are valid measurement results
-        success, qstate_UV = q1prep(n, zpos, meas[:N-1:-1])
-        if success == 1:
-            pass
-        else:
-            pass
+    count_success = 0    # number of valid measurement results
+    count_failure = 0    # number of invalid measurement results
+
+    # ##################################################################
+    # convert the measurement results, and check which ones are valid
+    # ##################################################################
+    meas, meas_counts = get_meas_matrix(results)
+    total_shots = meas_counts.sum()
+    if total_shots == 0:
+        # empty histogram: no valid measurement results
+        return 0.0
+
+    success, qstate_UV = q1prep_batch(n, zpos, meas)
+    count_success = meas_counts[success].sum()
+    count_failure = meas_counts[~success].sum()
+
+    # print("  number of valid measurement results = ", count_success, count_success / total_shots)
+    # print("number of invalid measurement results = ", count_failure, count_failure / total_shots)
+    # print("")
 
-    tmp_end_time = time.perf_counter()
-    detection_time = tmp_end_time - tmp_start_time
+    return float(count_success / total_shots)
 
-    total_shots = sum(results.values())
+def get_outcome_status(n, lstate, zpos, meas_matrix, timing=None):
+    """
+    Single pass over a matrix of measurement results (one row per outcome): runs
+    the error detection (q1prep) and decodes the accepted states.
 
+    Returns three boolean vectors (one entry per row): accepted, logical error
+    and undecided. The last two are always False for the discarded rows.
+    """
+    if timing is None:
+        timing = PolarTiming()
+
+    N = 2**n  # polar code length
+
+    # ##################################################################
+    # check which measurement results are valid (syndrome bits, reversed)
+    # ##################################################################
+    with timing.measure("detection"):
+        accepted, qstate_UV = q1prep_batch(n, zpos, meas_matrix[:, :N-1:-1])
 
-    tmp_start_time  = time.perf_counter()
-    # print("Total shots :", total_shots)
     # ##################################################################
-    # read measurement results from file, and check which ones are valid
+    # decode the accepted states
     # ##################################################################
-    for line, meas_counts in results.items():
-        # print(line)
-        # remove spaces at beginning and end of line
-        mstr = line.strip()
-
-        # init the measurement results array -- of length len(mstr)
-        meas = np.zeros((len(mstr),), dtype=int) 
-
-        # convert from string to np array
-        for i in range(0, len(mstr)):
-            meas[i] = ord(mstr[i]) - ord('0')	
-            if meas[i] != 0 and meas[i] != 1:
-                raise TypeError("Illegal measurement result: must be 0 or 1")
-
-
-        # check if 'meas' are valid measurement results
-        success, qstate_UV = q1prep(n, zpos, meas[:N-1:-1])
-        if success == 1:
-            count_accept = count_accept + meas_counts
-            # print(meas)
+    # we check whether the  undetected errors  that may have survived on 
+    # the accepted (prepared) states can be successfully corrected or not 
+    with timing.measure("decoding"):
+        qstate_UV = qstate_UV[accepted]
+
+        # measurement resuts of the data qubits, measured after state preparation
+        data_bits = meas_matrix[accepted][:, N-1::-1]
+
+        if lstate.lower() == "z":    
+            # |0> is prepared: logical information encoded at position zpos
+            ipos = zpos
+
+            # qstate_U: the U part of qstate_UV, encoded, plus the measurement results
+            qstate_U = np.zeros(qstate_UV.shape, dtype=np.uint8)
+            qstate_U[:, :zpos] = qstate_UV[:, :zpos]
+            qstate_U = codec.polarenc_batch(qstate_U) ^ data_bits
+
+            # run polar decoder (logical information encoded at position zpos)
+            u_ipos = codec.polardec_batch(1-2*qstate_U.astype(np.int32), ipos)
+
+        elif lstate.lower() == "x":  
+            # |+> is prepared: logical information encoded at position zpos+1
+            ipos = zpos+1
+
+            # qstate_V: the V part of qstate_UV, encoded, plus the measurement results
+            qstate_V = np.zeros(qstate_UV.shape, dtype=np.uint8)
+            qstate_V[:, zpos+2:] = qstate_UV[:, zpos+2:]
+            qstate_V = codec.revpolarenc_batch(qstate_V) ^ data_bits
+
+            # run polar decoder (logical information encoded at position zpos+1)
+            u_ipos = codec.revpolardec_batch(1-2*qstate_V.astype(np.int32), ipos)
+
         else:
-            count_discard = count_discard + meas_counts
-
-        if success == 1:
-            # ###############################################################
-            # this part is new with respect to previous version of the script
-            # ###############################################################
-            # we check whether the  undetected errors  that may have survived on 
-            # the accepted (prepared) state can be successfully corrected or not 
-            
-            if lstate.lower() == "z":    
-                # |0> is prepared: logical information encoded at position zpos
-                
-                # qstate_U: the U part of qstate_UV 
-                qstate_U = np.zeros((N,), dtype=int)
-                qstate_U[:zpos] = qstate_UV[:zpos]
-                
-                # encode qstate_U -- encoding is done in place
-                codec.polarenc(qstate_U)
-                
-                # add measurement resuts (data qubits, measured after state preparation)
-                # print(meas[N-1::-1], meas[N-1:])
-                qstate_U = np.mod(qstate_U + meas[N-1::-1], 2)
-                
-                # run polar decoder (logical information encoded at position zpos)
-                # print(1-2*qstate_U, qstate_U)
-                u_ipos = codec.polardec(1-2*qstate_U, zpos)
-                
-                if u_ipos == -1:
-                    # undecided value (llr = 0): we count half an error, since a 
-                    # random choice would give an error with probability 1/2
-                    count_logerror = count_logerror + (0.5 * meas_counts); # count 1/2 logical error
-                elif u_ipos != qstate_UV[zpos]:
-                    # logical error (the decoded value is not the correct one)
-                    count_logerror = count_logerror + (1 * meas_counts);   # count a logical error
-                
-            elif lstate.lower() == "x":  
-                # |+> is prepared: logical information encoded at position zpos+1
-                
-                # qstate_V: the V part of qstate_UV 
-                qstate_V = np.zeros((N,), dtype=int)
-                qstate_V[zpos+2:] = qstate_UV[zpos+2:]
-                
-                # encode qstate_V -- encoding is done in place
-                codec.revpolarenc(qstate_V)
-                
-                # add measurement resuts (data qubits, measured after state preparation)
-                # print(meas[N-1::-1], (meas[N-1::-1])[::-1])
-                logical_bit = meas[N-1::-1]
-                # logical_bit = (meas[N-1::-1])[::-1]
-                qstate_V = np.mod(qstate_V + logical_bit, 2)
-                
-                # run polar decoder (logical information encoded at position zpos+1)
-                # print(1-2*qstate_V, qstate_V)
-                v_ipos = codec.revpolardec(1-2*qstate_V, zpos+1)
-                
-                if v_ipos == -1:
-                    # undecided value (llr = 0): we count half an error, since a 
-                    # random choice would give an error with probability 1/2
-                    count_logerror = count_logerror+0.5; # count 1/2 logical error
-                    count_undecided = count_undecided + 1; 
-                    # print(" undecided ... ")
-                elif v_ipos != qstate_UV[zpos+1]:
-                    # logical error (the decoded value is not the correct one)
-                    count_logerror = count_logerror+1;   # count a logical error
-            
-            else:
-                raise TypeError("Illegal 'lstate' value")
-            
-    tmp_end_time = time.perf_counter()
-    decoding_time = tmp_end_time - tmp_start_time - detection_time
+            raise TypeError("Illegal 'lstate' value")
+
+        # undecided value (llr = 0) or logical error (the decoded value is not the correct one)
+        undecided = np.zeros(accepted.shape, dtype=bool)
+        logerror = np.zeros(accepted.shape, dtype=bool)
+        undecided[accepted] = (u_ipos == -1)
+        logerror[accepted] = (u_ipos != -1) & (u_ipos != qstate_UV[:, ipos])
+
+    return accepted, logerror, undecided
+
+def get_logical_error_on_accepted_states(n, lstate, results, timing=None, use_lookup_table=False, 
+                                         lookup_table_dir=None):
+    """
+    Counts the accepted states, and the logical errors on the accepted states, of a
+    histogram of measurement results ({bitstring: count} or Counts).
+
+    If a PolarTiming object is given, the time spent in each phase is added to it.
+    With use_lookup_table, small codes (n <= 4) are evaluated with a cached lookup 
+    table of the outcome status, stored in lookup_table_dir. Detection and decoding are
+    then not separated: the lookup time is returned as the detection time, and the
+    decoding time is None.
+    """
+    # n = 4       # number of polarization steps (polar code length N = 2^n)
+    # lstate = "X" # prepared logical state: may be "Z" (|0>) or "X" (|+>)
+    if timing is None:
+        timing = PolarTiming()
+
+    zpos = get_zpos(n, lstate)
+
+    with timing.measure("conversion"):
+        results = Counts.from_dict(results)
+
+    if len(results) == 0:
+        # empty histogram: no accepted states and no logical errors
+        return 0, 0, 0, 0, timing.detection_time, timing.decoding_time
+
+    use_lookup_table = use_lookup_table and is_lookup_supported(n, results.width)
+    if use_lookup_table:
+        # outcomes packed into integers
+        with timing.measure("conversion"):
+            packed, meas_counts, width = get_packed_outcomes(results)
+
+        # status of each outcome, computed once per distinct outcome and cached
+        with timing.measure("lookup"):
+            lookup_table = get_lookup_table(n, lstate, zpos, width, cache_dir=lookup_table_dir)
+            codes = lookup_table.lookup(packed)
+
+        accepted = (codes != STATUS_DISCARDED)
+        logerror = (codes == STATUS_LOGERROR)
+        undecided = (codes == STATUS_UNDECIDED)
+
+    else:
+        # matrix of the outcomes, one row per outcome
+        with timing.measure("conversion"):
+            meas_matrix, meas_counts = get_meas_matrix(results)
+
+        accepted, logerror, undecided = get_outcome_status(n, lstate, zpos, meas_matrix, timing)
+
+    # count_accept: number of states accepted during the state preparation protocol (valid measurement results)
+    # count_discard: number of states discarded during the state preparation protocol (invalid measurement results)
+    count_accept  = meas_counts[accepted].sum().item()
+    count_discard = meas_counts[~accepted].sum().item()
+
+    # count_logerror: number of logical errors on the accepted states. undecided values are
+    # counted as half an error, since a random choice would give an error with probability 1/2
+    count_undecided = meas_counts[undecided].sum().item()
+    count_logerror = meas_counts[logerror].sum().item() + 0.5 * count_undecided
 
     print("number of discarded states (invalid measurement results) = ", count_discard)
     print(" number of accepted states   (valid measurement results) = ", count_accept)
@@ -241,5 +243,7 @@ def get_logical_error_on_accepted_states(n, lstate, results):
     if count_accept > 0:
         fidelity = ((count_accept - round(count_logerror)) / count_accept)
 
-    return count_accept, round(count_logerror), count_undecided, fidelity, detection_time, decoding_time
+    if use_lookup_table:
+        return count_accept, round(count_logerror), count_undecided, fidelity, timing.lookup_time, None
 
+    return count_accept, round(count_logerror), count_undecided, fidelity, timing.detection_time, timing.decoding_time
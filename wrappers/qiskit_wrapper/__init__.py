@@ -1,5 +1,6 @@
 from .qiskit_wrapper import optimize_qasm, transpile_to_basis_gate, QiskitCircuit, \
-get_initial_mapping_sabre, get_noisy_simulator
+get_initial_mapping_sabre, get_noisy_simulator, invalidate_noisy_simulator_cache, parse_circuit, clear_circuit_cache
+from .pauli_frame import PauliFrameSimulator, PauliFrameResult, ErrorRates, is_clifford_circuit
 
 
 __all__ = [
@@ -8,4 +9,11 @@ __all__ = [
     "QiskitCircuit",
     "get_initial_mapping_sabre",
     "get_noisy_simulator",
+    "invalidate_noisy_simulator_cache",
+    "parse_circuit",
+    "clear_circuit_cache",
+    "PauliFrameSimulator",
+    "PauliFrameResult",
+    "ErrorRates",
+    "is_clifford_circuit",
 ]
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+file name: pauli_frame.py
+author: Handy
+date: 18 October 2026
+
+Pauli-frame sampler for Clifford circuits (only Clifford gates, measure and reset).
+A single noiseless reference sample is taken with the stabilizer simulator; every shot
+is then that reference plus a Pauli frame (the errors that happened in that shot),
+propagated through the gates with the Clifford tableaus. The frames of 64 shots are
+packed into one uint64 word, so the cost of a gate is a few XOR over shots / 64 words.
+"""
+import os
+import numpy as np
+from qiskit import QuantumCircuit
+from qiskit.quantum_info import Clifford
+from commons import Counts
+
+wrapper_path = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(wrapper_path)
+grandparent_dir = os.path.dirname(parent_dir)
+
+# instructions without any effect on the frames
+ignored_instructions = ("barrier", "delay", "id")
+
+# gates implemented virtually (frame change), without any error
+virtual_gates = ("rz", "z", "s", "sdg", "id")
+
+# number of shots simulated together (multiple of 64)
+default_batch_size = 2**16
+
+_tableau_cache = {}
+
+def get_symplectic_matrix(instruction):
+    """
+    Binary symplectic matrix (2k x 2k, over the x bits then the z bits) of a Clifford
+    gate on k qubits, the phases are dropped since they do not change the frames
+    """
+    key = (instruction.name, tuple(round(float(param), 10) for param in instruction.params))
+    if key not in _tableau_cache:
+        tableau = Clifford(instruction).tableau
+        _tableau_cache[key] = tableau[:, :-1].astype(bool)
+
+    return _tableau_cache[key]
+
+def is_clifford_circuit(circuit: QuantumCircuit):
+    for instruction in circuit.data:
+        operation = instruction.operation
+        if operation.name in ignored_instructions or operation.name in ("measure", "reset"):
+            continue
+        if getattr(operation, "condition", None) is not None:
+            return False
+        try:
+            get_symplectic_matrix(operation)
+        except Exception:
+            return False
+
+    return True
+
+# two-qubit gates with an error in the noise model of build_noisy_simulator
+noisy_two_qubit_gates = ("ecr", )
+
+class ErrorRates:
+    """
+    Error rates of a backend: gate error of the single-qubit gates per qubit, of the
+    two-qubit gates per pair of qubits, and readout error per qubit.
+
+    By default only the two-qubit (ecr) gate errors are read, like the noise model of
+    build_noisy_simulator, which sets the single-qubit gate and readout errors to 0.
+    With full=True, the single-qubit gate and readout errors are read too. The thermal
+    relaxation (T1, T2) of the noise model is not part of the Pauli frames.
+    """
+    def __init__(self, one_qubit=None, two_qubit=None, readout=None):
+        self.one_qubit = one_qubit if one_qubit is not None else {}
+        self.two_qubit = two_qubit if two_qubit is not None else {}
+        self.readout = readout if readout is not None else {}
+
+    @classmethod
+    def from_backend_properties(cls, properties, full=False):
+        rates = cls()
+        for gate in properties.gates:
+            gate_error = [par.value for par in gate.parameters if par.name == "gate_error"]
+            if len(gate_error) == 0 or gate.gate in virtual_gates:
+                continue
+            if len(gate.qubits) == 1 and full:
+                # keep the worst single-qubit gate of the qubit (sx and x)
+                qubit = gate.qubits[0]
+                rates.one_qubit[qubit] = max(rates.one_qubit.get(qubit, 0), gate_error[0])
+            elif len(gate.qubits) == 2 and (full or gate.gate in noisy_two_qubit_gates):
+                rates.two_qubit[tuple(gate.qubits)] = gate_error[0]
+
+        if full:
+            for qubit in range(len(properties.qubits)):
+                try:
+                    rates.readout[qubit] = properties.readout_error(qubit)
+                except Exception:
+                    pass
+
+        return rates
+
+    @classmethod
+    def from_rlb(cls, hw_name, full=False):
+        """
+        Reads the calibration files of TriQ (config/<hw_name>_real_{S,T,M}.rlb), which
+        contain the fidelities of the last calibration (only the two-qubit file T
+        unless full=True)
+        """
+        def read_rlb(suffix):
+            rlb_path = os.path.join(grandparent_dir, "config", "{}_real_{}.rlb".format(hw_name, suffix))
+            with open(rlb_path, "r") as file:
+                lines = file.read().split("\n")
+            count = int(lines[0])
+            return [line.split() for line in lines[1:count+1]]
+
+        rates = cls()
+        for control, target, fidelity in read_rlb("T"):
+            rates.two_qubit[(int(control), int(target))] = 1 - float(fidelity)
+        if full:
+            for qubit, fidelity in read_rlb("S"):
+                rates.one_qubit[int(qubit)] = 1 - float(fidelity)
+            for qubit, fidelity in read_rlb("M"):
+                rates.readout[int(qubit)] = 1 - float(fidelity)
+
+        return rates
+
+    def get_gate_error(self, qubits):
+        if len(qubits) == 1:
+            return self.one_qubit.get(qubits[0], 0)
+        return self.two_qubit.get(tuple(qubits), self.two_qubit.get(tuple(qubits[::-1]), 0))
+
+    def get_readout_error(self, qubit):
+        return self.readout.get(qubit, 0)
+
+class PauliFrameResult:
+    def __init__(self, counts: Counts, shots):
+        self.counts = counts
+        self.shots = shots
+
+    def get_counts(self):
+        return self.counts.to_dict()
+
+class PauliFrameJob:
+    def __init__(self, result: PauliFrameResult):
+        self._result = result
+
+    def result(self):
+        return self._result
+
+class PauliFrameSimulator:
+    """
+    Samples Clifford circuits with depolarizing errors after the gates and bit flips
+    on the measurements. The error rates are scaled by noise_level (0 - noiseless).
+    """
+    def __init__(self, error_rates: ErrorRates = None, noise_level = 1, seed = None, batch_size = default_batch_size):
+        self.error_rates = error_rates if error_rates is not None else ErrorRates()
+        self.noise_level = noise_level
+        self.seed = seed
+        self.batch_size = batch_size
+        self.backend_name = "pauli_frame_simulator"
+
+    @classmethod
+    def from_backend(cls, backend, noise_level = 1, full = False, **kwargs):
+        return cls(ErrorRates.from_backend_properties(backend.properties(), full), noise_level, **kwargs)
+
+    @classmethod
+    def from_rlb(cls, hw_name, noise_level = 1, full = False, **kwargs):
+        return cls(ErrorRates.from_rlb(hw_name, full), noise_level, **kwargs)
+
+    def get_pauli_probability(self, error_rate, num_qubits):
+        # average gate error r of a depolarizing channel: p = r * (d + 1) / d, d = 2^k
+        d = 2**num_qubits
+        return min(1.0, error_rate * self.noise_level * (d + 1) / d)
+
+    def get_plan(self, circuit: QuantumCircuit):
+        """
+        Converts the circuit into a list of operations on the frames, and the circuit of
+        the reference sample (one classical bit per measurement)
+        """
+        if circuit.num_clbits == 0:
+            raise ValueError("The circuit has no classical bits")
+
+        num_measurements = sum(1 for instruction in circuit.data if instruction.operation.name == "measure")
+        ref_circuit = QuantumCircuit(circuit.num_qubits, num_measurements)
+
+        plan = []
+        events = []  # classical bit of each measurement
+        for instruction in circuit.data:
+            operation = instruction.operation
+            qubits = [circuit.find_bit(qubit).index for qubit in instruction.qubits]
+
+            if getattr(operation, "condition", None) is not None:
+                raise ValueError("Conditional operations are not supported by the Pauli-frame simulator")
+
+            if operation.name in ignored_instructions:
+                continue
+            elif operation.name == "measure":
+                event = len(events)
+                events.append(circuit.find_bit(instruction.clbits[0]).index)
+                ref_circuit.measure(qubits[0], event)
+                plan.append(("measure", qubits[0], event,
+                             min(1.0, self.error_rates.get_readout_error(qubits[0]) * self.noise_level)))
+            elif operation.name == "reset":
+                ref_circuit.reset(qubits[0])
+                plan.append(("reset", qubits[0]))
+            else:
+                try:
+                    matrix = get_symplectic_matrix(operation)
+                except Exception:
+                    raise ValueError("Non-Clifford gate {} is not supported by the Pauli-frame simulator".format(operation.name))
+
+                ref_circuit.append(operation, qubits)
+                plan.append(("gate", qubits, matrix))
+
+                if operation.name not in virtual_gates:
+                    prob = self.get_pauli_probability(self.error_rates.get_gate_error(qubits), len(qubits))
+                    if prob > 0:
+                        plan.append(("error", qubits, prob))
+
+        return plan, ref_circuit, events
+
+    def get_reference_sample(self, ref_circuit, seed):
+        if ref_circuit.num_clbits == 0:
+            return np.zeros((0,), dtype=np.uint8)
+
+        from qiskit_aer import AerSimulator
+
+        sim = AerSimulator(method="stabilizer")
+        result = sim.run(ref_circuit, shots=1, memory=True, seed_simulator=seed).result()
+        memory = result.get_memory()[0].replace(" ", "")
+
+        # bitstrings are little-endian: the last character is the classical bit 0
+        return np.frombuffer(memory[::-1].encode("ascii"), dtype=np.uint8) - ord('0')
+
+    def sample_counts(self, circuit: QuantumCircuit, shots):
+        plan, ref_circuit, events = self.get_plan(circuit)
+
+        rng = np.random.default_rng(self.seed)
+        ref_seed = int(rng.integers(0, 2**31))
+        reference = self.get_reference_sample(ref_circuit, ref_seed)
+
+        # last measurement written into each classical bit
+        last_event = {}
+        for event, clbit in enumerate(events):
+            last_event[clbit] = event
+
+        counts = []
+        for start in range(0, shots, self.batch_size):
+            batch_shots = min(self.batch_size, shots - start)
+            records = self.run_batch(plan, circuit.num_qubits, len(events), batch_shots, reference, rng)
+
+            # bits of the classical register (most significant first) of each shot
+            bits = np.zeros((batch_shots, circuit.num_clbits), dtype=np.uint8)
+            for clbit, event in last_event.items():
+                bits[:, circuit.num_clbits - 1 - clbit] = unpack_frame(records[event], batch_shots)
+
+            batch_counts = Counts.from_bit_matrix(bits, np.ones(batch_shots, dtype=np.int64))
+            counts.append(batch_counts.merged())
+
+        data = np.concatenate([count.data for count in counts])
+        values = np.concatenate([count.counts for count in counts])
+        return Counts(data, values, circuit.num_clbits).merged()
+
+    def run_batch(self, plan, num_qubits, num_events, shots, reference, rng):
+        words = (shots + 63) // 64
+        frame_x = np.zeros((num_qubits, words), dtype=np.uint64)
+        frame_z = random_words(rng, (num_qubits, words))
+        records = np.zeros((num_events, words), dtype=np.uint64)
+        ones = np.full(words, np.iinfo(np.uint64).max, dtype=np.uint64)
+
+        for op in plan:
+            if op[0] == "gate":
+                qubits, matrix = op[1], op[2]
+                k = len(qubits)
+                old = [frame_x[q].copy() for q in qubits] + [frame_z[q].copy() for q in qubits]
+                for j in range(2*k):
+                    new = np.zeros(words, dtype=np.uint64)
+                    for i in range(2*k):
+                        if matrix[i, j]:
+                            new ^= old[i]
+                    if j < k:
+                        frame_x[qubits[j]] = new
+                    else:
+                        frame_z[qubits[j-k]] = new
+
+            elif op[0] == "error":
+                qubits, prob = op[1], op[2]
+                shot_idx = sample_shots(rng, shots, prob)
+                if len(shot_idx) > 0:
+                    # uniformly random non-identity Pauli on the qubits
+                    paulis = rng.integers(1, 4**len(qubits), size=len(shot_idx))
+                    for i, q in enumerate(qubits):
+                        flip_bits(frame_x[q], shot_idx[(paulis >> (2*i)) & 1 == 1])
+                        flip_bits(frame_z[q], shot_idx[(paulis >> (2*i+1)) & 1 == 1])
+
+            elif op[0] == "measure":
+                q, event, prob = op[1], op[2], op[3]
+                records[event] = frame_x[q]
+                if reference[event]:
+                    records[event] ^= ones
+                if prob > 0:
+                    flip_bits(records[event], sample_shots(rng, shots, prob))
+                # the state after the measurement is known up to a Z
+                frame_z[q] = random_words(rng, words)
+
+            elif op[0] == "reset":
+                q = op[1]
+                frame_x[q] = 0
+                frame_z[q] = random_words(rng, words)
+
+        return records
+
+    def run(self, circuit: QuantumCircuit, shots = 1024, **kwargs):
+        counts = self.sample_counts(circuit, shots)
+        return PauliFrameJob(PauliFrameResult(counts, shots))
+
+def random_words(rng, size):
+    return rng.integers(0, np.iinfo(np.uint64).max, size=size, dtype=np.uint64, endpoint=True)
+
+def sample_shots(rng, shots, prob):
+    # indices of the shots hit by an error of probability prob
+    count = rng.binomial(shots, prob)
+    if count == 0:
+        return np.zeros((0,), dtype=np.int64)
+    return rng.choice(shots, size=count, replace=False)
+
+def flip_bits(words, shot_idx):
+    if len(shot_idx) == 0:
+        return
+    masks = np.left_shift(np.uint64(1), (shot_idx % 64).astype(np.uint64))
+    np.bitwise_xor.at(words, shot_idx // 64, masks)
+
+def unpack_frame(words, shots):
+    # bit i of the word w is the shot 64 * w + i
+    bits = np.unpackbits(words.astype("<u8").view(np.uint8), bitorder="little")
+    return bits[:shots]
@@ -4,46 +4,94 @@ author: Handy
 date: 13 June 2024
 """
 from qiskit import QuantumCircuit, transpile
-from qiskit_aer.noise import NoiseModel
-from qiskit_aer import AerSimulator
 from qiskit.transpiler.preset_passmanagers import generate_preset_pass_manager
-from commons import normalize_counts, Config
+from qiskit.transpiler import StagedPassManager
+from commons import normalize_counts, conf, get_count_1q, get_count_2q
 from qiskit.providers.models import BackendProperties
 import json
 import copy
+import os
 from qiskit.qasm2 import dumps
 import time
+import hashlib
+from collections import OrderedDict
 
+# parsed circuits and their statistics, keyed by the hash of the qasm, least recently used first
+_circuit_cache = OrderedDict()
+circuit_cache_size = 256
 
-conf = Config()
+def read_qasm_source(qasm):
+    # the qasm string, or the content of the qasm file
+    if "OPENQASM" not in qasm and os.path.isfile(qasm):
+        with open(qasm, "r") as file:
+            return file.read()
+
+    return qasm
+
+def parse_circuit(qasm):
+    """
+    Parses the qasm (string or file path) and transpiles it to the basis gates, with the 
+    statistics of the transpiled circuit. Every unique qasm is parsed once, the circuits 
+    are shared: copy them before modifying them.
+    """
+    key = hashlib.sha256(read_qasm_source(qasm).encode()).hexdigest()
+
+    if key in _circuit_cache:
+        _circuit_cache.move_to_end(key)
+        return _circuit_cache[key]
+
+    try:
+        qc = QuantumCircuit.from_qasm_file(qasm)
+    except Exception as e:
+        try: 
+            qc = QuantumCircuit.from_qasm_str(qasm)
+        except Exception as ex:
+            raise ValueError("Input circuit must be a string path to QASM file, QASM string or a QuantumCircuit object")
+
+    basis_qc = transpile_to_basis_gate(qc)
+    gates = dict(basis_qc.count_ops())
+
+    parsed = {
+        "circuit_original": qc,
+        "qasm_original": dumps(qc),
+        "circuit": basis_qc,
+        "qasm": dumps(basis_qc),
+        "gates": gates,
+        "total_gate": sum(gates.values()),
+        "total_one_qubit_gate": get_count_1q(basis_qc),
+        "total_two_qubit_gate": get_count_2q(basis_qc),
+        "depth": basis_qc.depth(),
+    }
+
+    _circuit_cache[key] = parsed
+    while len(_circuit_cache) > circuit_cache_size:
+        _circuit_cache.popitem(last=False)
+
+    return parsed
+
+def clear_circuit_cache():
+    _circuit_cache.clear()
 
 class QiskitCircuit:
     def __init__(self, qasm, name = "circuit", metadata = {}):
-        qc = None
-        if isinstance(qasm, str):
-            try:
-                qc = QuantumCircuit.from_qasm_file(qasm)
-            except Exception as e:
-                try: 
-                    qc = QuantumCircuit.from_qasm_str(qasm)
-                except Exception as ex:
-                    raise ValueError("Input circuit must be a string path to QASM file, QASM string or a QuantumCircuit object")
-                
-        if not (isinstance(qasm, str) or isinstance(qc, QuantumCircuit)):
+        if not isinstance(qasm, str):
             raise ValueError("Input must be a string or a QuantumCircuit object")
 
-        self.qasm_original = dumps(qc)
-        self.circuit_original = qc
+        parsed = parse_circuit(qasm)
 
-        qc = transpile_to_basis_gate(qc)
-        self.circuit: QuantumCircuit = qc
-        self.qasm = dumps(qc)
+        self.qasm_original = parsed["qasm_original"]
+        self.circuit_original = parsed["circuit_original"].copy()
+
+        self.circuit: QuantumCircuit = parsed["circuit"].copy()
+        self.qasm = parsed["qasm"]
         self.name = name
         self.circuit.name = name
         self.circuit.metadata = metadata
-        self.gates = dict(qc.count_ops())
-        self.total_gate = sum(qc.count_ops().values()) # - self.gates["measure"]
-        self.depth = qc.depth()
+        self.gates = dict(parsed["gates"])
+        self.total_gate = parsed["total_gate"] # - self.gates["measure"]
+        self.total_one_qubit_gate = parsed["total_one_qubit_gate"]
+        self.total_two_qubit_gate = parsed["total_two_qubit_gate"]
+        self.depth = parsed["depth"]
 
     def get_native_gates_circuit(self, backend, simulator = False):
         if simulator:
@@ -98,16 +146,48 @@ def get_initial_layout_from_circuit(qc):
     
     return initial_layout
 
-def get_initial_mapping_sabre(input_qasm, backend):
-    
-    circuit = QuantumCircuit.from_qasm_str(input_qasm)
+# initial layouts already computed, least recently used first
+_layout_cache = OrderedDict()
+layout_cache_size = 256
 
+def get_layout_pass_manager(backend, post_layout = False):
+    """
+    Layout part of the optimization level 3 pass manager: the init and layout stages 
+    (VF2Layout, then SabreLayout), without translation and optimization loops. With
+    post_layout, the routing stage (SabreSwap and VF2PostLayout) is run as well.
+    """
     pm = generate_preset_pass_manager(optimization_level=3,
                                         backend=backend
                                     )
+    if post_layout:
+        return StagedPassManager(stages=["init", "layout", "routing"], init=pm.init, layout=pm.layout, routing=pm.routing)
+
+    return StagedPassManager(stages=["init", "layout"], init=pm.init, layout=pm.layout)
+
+def get_initial_mapping_sabre(input_qasm, backend, calibration_id = None, post_layout = False):
+    """
+    Initial layout of the circuit found by SABRE. The layouts are cached per circuit, 
+    hardware and calibration (calibration_id, or the timestamp of the backend properties)
+    """
+    if calibration_id is None:
+        calibration_id = get_calibration_timestamp(backend)
+
+    key = (hashlib.sha256(input_qasm.encode()).hexdigest(), get_backend_name(backend), str(calibration_id), post_layout)
+
+    if key in _layout_cache:
+        _layout_cache.move_to_end(key)
+        return list(_layout_cache[key])
+
+    circuit = QuantumCircuit.from_qasm_str(input_qasm)
+
+    pm = get_layout_pass_manager(backend, post_layout)
     sabre_qc = pm.run(circuit)
     initial_layout = get_initial_layout_from_circuit(sabre_qc)
 
+    _layout_cache[key] = list(initial_layout)
+    while len(_layout_cache) > layout_cache_size:
+        _layout_cache.popitem(last=False)
+
     return initial_layout
 
 def transpile_to_basis_gate(circuit, backend = None ):
@@ -117,11 +197,61 @@ def transpile_to_basis_gate(circuit, backend = None ):
 
     return transpiled_circuit
 
+def get_backend_name(backend):
+    return backend.name if isinstance(backend.name, str) else backend.name()
+
+def get_calibration_timestamp(backend):
+    # the calibration timestamp changes whenever the properties of the backend are updated
+    properties = backend.properties()
+    return properties.last_update_date if properties is not None else None
+
 #region Noisy Simulator
 
+# noise models and simulators already built, least recently used first
+_noisy_simulator_cache = OrderedDict()
+
+def get_noisy_simulator_key(backend, error_percentage, noiseless, method):
+    return (get_backend_name(backend), str(get_calibration_timestamp(backend)), float(error_percentage), noiseless, method)
+
 def get_noisy_simulator(backend, error_percentage = 1, noiseless = False, method="automatic"):
-    _backend = copy.deepcopy(backend)
-    _properties = _backend.properties()
+    """
+    Returns the noise model, the simulator and the coupling map of the backend with the
+    errors scaled by error_percentage. They are built once per (hardware, calibration, 
+    noise level) and kept in a LRU cache of conf.noisy_simulator_cache_size entries.
+    """
+    key = get_noisy_simulator_key(backend, error_percentage, noiseless, method)
+
+    if key in _noisy_simulator_cache:
+        _noisy_simulator_cache.move_to_end(key)
+        return _noisy_simulator_cache[key]
+
+    noisy_simulator = build_noisy_simulator(backend, error_percentage, noiseless, method)
+
+    if conf.noisy_simulator_cache_size > 0:
+        _noisy_simulator_cache[key] = noisy_simulator
+        while len(_noisy_simulator_cache) > conf.noisy_simulator_cache_size:
+            _noisy_simulator_cache.popitem(last=False)
+
+    return noisy_simulator
+
+def invalidate_noisy_simulator_cache(hw_name = None):
+    """
+    Drops the cached simulators of hw_name (all of them if hw_name is None), e.g. 
+    after new calibration data has been retrieved
+    """
+    for key in list(_noisy_simulator_cache.keys()):
+        if hw_name is None or key[0] == hw_name:
+            del _noisy_simulator_cache[key]
+
+def build_noisy_simulator(backend, error_percentage = 1, noiseless = False, method="automatic"):
+    # qiskit_aer is only imported by the simulations
+    from qiskit_aer import AerSimulator
+    from qiskit_aer.noise import NoiseModel
+
+    # the properties are changed on a copy (to_dict), the backend itself (e.g. a snapshot 
+    # shared by the simulators) is not copied, only its configuration
+    _configuration = copy.deepcopy(backend.configuration())
+    _properties = backend.properties()
     _prop_dict = _properties.to_dict()
     
     # update readout error
@@ -169,14 +299,14 @@ def get_noisy_simulator(backend, error_percentage = 1, noiseless = False, method
     new_prop_json = json.dumps(new_prop_dict, indent = 0, default=str) 
     new_prop_json = new_prop_json.replace("\n", "")
 
-    coupling_map = _backend.configuration().coupling_map
+    coupling_map = _configuration.coupling_map
     
     noise_model = NoiseModel.from_backend_properties(new_properties, dt = 0.1)
     
     if noiseless or error_percentage == 0.0:
         sim_noisy = AerSimulator()
     else:
-        sim_noisy = AerSimulator(configuration=_backend.configuration(), properties=new_properties,
+        sim_noisy = AerSimulator(configuration=_configuration, properties=new_properties,
                                 noise_model=noise_model, method = method
                                 )
         sim_noisy.set_options(
@@ -0,0 +1,23 @@
+from .job_poller import JobPoller, get_backoff_delays, retry_with_backoff, get_job_state, JOB_DONE, JOB_FAILED
+from .fake_runtime import FakeRuntimeService, FakeRuntimeJob
+from .service_registry import get_service, register_service, get_backend, get_service_backend, \
+get_backend_snapshot, invalidate_backend, update_backend_calibration, clear_service_registry
+
+__all__ = [
+    "JobPoller",
+    "get_backoff_delays",
+    "retry_with_backoff",
+    "get_job_state",
+    "JOB_DONE",
+    "JOB_FAILED",
+    "FakeRuntimeService",
+    "FakeRuntimeJob",
+    "get_service",
+    "register_service",
+    "get_backend",
+    "get_service_backend",
+    "get_backend_snapshot",
+    "invalidate_backend",
+    "update_backend_calibration",
+    "clear_service_registry",
+]
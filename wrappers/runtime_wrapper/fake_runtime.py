@@ -0,0 +1,135 @@
+"""
+file name: fake_runtime.py
+author: Handy
+date: 18 October 2026
+
+Local stand-in of QiskitRuntimeService to try the job poller without an IBM account.
+A job waits queue_delay seconds in the queue, runs for run_delay seconds and is then
+done (or failed), its status follows the clock. The result and the metrics are the
+ones given when the job is submitted. The backends of the service are qiskit fake
+backends (Fake27QPulseV1 by default), so the simulator headers can run on it too.
+"""
+import time
+import uuid
+from datetime import datetime, timezone
+
+def get_timestamp(seconds):
+    # ISO timestamp of the runtime service, e.g. 2026-10-18T10:00:00.123Z
+    return datetime.fromtimestamp(seconds, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+class FakeRuntimeJob:
+    def __init__(self, job_id, result=None, queue_delay=0.0, run_delay=0.0, error=None, inputs=None):
+        self._job_id = job_id
+        self._result = result
+        self.queue_delay = queue_delay
+        self.run_delay = run_delay
+        self.error = error
+        self.inputs = {} if inputs is None else inputs
+
+        self.created = time.time()
+        self.cancelled_at = None
+
+        # calls to the "service", to check the number of requests of a poller
+        self.status_calls = 0
+        self.result_calls = 0
+
+    def job_id(self):
+        return self._job_id
+
+    def get_status(self):
+        if self.cancelled_at is not None:
+            return "CANCELLED"
+
+        elapsed = time.time() - self.created
+        if elapsed < self.queue_delay:
+            return "QUEUED"
+        if elapsed < self.queue_delay + self.run_delay:
+            return "RUNNING"
+
+        return "ERROR" if self.error is not None else "DONE"
+
+    def status(self):
+        self.status_calls += 1
+        return self.get_status()
+
+    def done(self):
+        return self.get_status() == "DONE"
+
+    def errored(self):
+        return self.get_status() == "ERROR"
+
+    def cancelled(self):
+        return self.get_status() == "CANCELLED"
+
+    def in_final_state(self):
+        return self.get_status() in ("DONE", "ERROR", "CANCELLED")
+
+    def cancel(self):
+        if not self.in_final_state():
+            self.cancelled_at = time.time()
+
+    def result(self):
+        self.result_calls += 1
+
+        status = self.get_status()
+        if status == "ERROR":
+            raise RuntimeError(str(self.error))
+        if status != "DONE":
+            raise RuntimeError("Job {} is {}".format(self._job_id, status))
+
+        return self._result
+
+    def metrics(self):
+        running = self.created + self.queue_delay
+        finished = running + self.run_delay
+
+        return {
+            "usage": {"quantum_seconds": self.run_delay, "seconds": self.run_delay},
+            "timestamps": {
+                "created": get_timestamp(self.created),
+                "running": get_timestamp(running),
+                "finished": get_timestamp(finished),
+            },
+        }
+
+class FakeRuntimeService:
+    def __init__(self, channel="ibm_quantum", token=None, latency=0.0, backends=None):
+        '''
+        latency: seconds taken by each call to the service
+        backends: {hardware_name: backend}, the other names get a Fake27QPulseV1
+        '''
+        self.channel = channel
+        self.token = token
+        self.latency = latency
+        self.backends = {} if backends is None else backends
+
+        self.jobs = {}
+
+    def backend(self, name):
+        if name not in self.backends:
+            # imported on the first use, the poller does not need it
+            from qiskit.providers.fake_provider import Fake27QPulseV1
+            self.backends[name] = Fake27QPulseV1()
+
+        return self.backends[name]
+
+    def get_backend(self, name):
+        return self.backend(name)
+
+    def submit(self, result=None, queue_delay=0.0, run_delay=0.0, error=None, inputs=None, job_id=None):
+        if job_id is None:
+            job_id = uuid.uuid4().hex[:20]
+
+        self.jobs[job_id] = FakeRuntimeJob(job_id, result=result, queue_delay=queue_delay, run_delay=run_delay,
+                                           error=error, inputs=inputs)
+
+        return self.jobs[job_id]
+
+    def job(self, job_id):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        if job_id not in self.jobs:
+            raise KeyError("Job not found: {}".format(job_id))
+
+        return self.jobs[job_id]
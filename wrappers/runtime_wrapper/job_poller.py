@@ -0,0 +1,161 @@
+"""
+file name: job_poller.py
+author: Handy
+date: 18 October 2026
+
+Asynchronous poller of the jobs sent to the real backends. The status of all the
+pending jobs is checked concurrently (at most max_concurrency calls to the runtime
+service at a time), a job still queued or running is checked again after an
+exponential backoff. The result of a job is fetched as soon as it is done and put
+in a queue, the ingestion (database) consumes the queue one job at a time.
+
+The calls to the runtime service are blocking, they run in the threads of asyncio.
+"""
+import time
+import asyncio
+
+# kind of the items of the ingestion queue
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+def get_backoff_delays(initial_delay=1.0, backoff_factor=2.0, max_delay=60.0):
+    '''
+    Delays of the exponential backoff: initial_delay, initial_delay * backoff_factor, ...
+    up to max_delay
+    '''
+    delay = initial_delay
+    while True:
+        yield delay
+        delay = min(delay * backoff_factor, max_delay)
+
+def retry_with_backoff(function, *args, max_attempts=None, initial_delay=1.0, backoff_factor=2.0,
+                       max_delay=60.0, **kwargs):
+    '''
+    Calls function until it succeeds, waiting with an exponential backoff between the
+    attempts. With max_attempts, the last error is raised.
+    '''
+    attempt = 0
+    for delay in get_backoff_delays(initial_delay, backoff_factor, max_delay):
+        attempt += 1
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            if max_attempts is not None and attempt >= max_attempts:
+                raise
+            print(f"An error occurred: {str(e)}. Will try again in {delay:g} seconds...")
+            time.sleep(delay)
+
+# final statuses of a job, as strings or names of the JobStatus enum
+failed_statuses = ("ERROR", "CANCELLED")
+done_statuses = ("DONE", )
+
+def get_job_state(job):
+    # status of the job and JOB_DONE, JOB_FAILED or None (queued, running), one call to the service
+    status = job.status()
+    status_name = str(getattr(status, "name", status)).upper()
+
+    if status_name in failed_statuses:
+        return status, JOB_FAILED
+
+    if status_name in done_statuses:
+        return status, JOB_DONE
+
+    return status, None
+
+class JobPoller:
+    def __init__(self, max_concurrency=8, initial_delay=1.0, backoff_factor=2.0, max_delay=60.0, timeout=None):
+        '''
+        timeout: seconds after which the jobs not done yet are left for the next run
+        (None - wait for all the jobs)
+        '''
+        self.max_concurrency = max_concurrency
+        self.initial_delay = initial_delay
+        self.backoff_factor = backoff_factor
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    async def poll_job(self, semaphore, queue, header_id, job_id, service, deadline):
+        '''
+        Checks the job until it is done, failed or the deadline is reached. Returns the
+        final state: JOB_DONE, JOB_FAILED or None (still pending)
+        '''
+        loop = asyncio.get_running_loop()
+
+        async with semaphore:
+            job = await asyncio.to_thread(service.job, job_id)
+
+        for delay in get_backoff_delays(self.initial_delay, self.backoff_factor, self.max_delay):
+            async with semaphore:
+                status, state = await asyncio.to_thread(get_job_state, job)
+
+                if state == JOB_FAILED:
+                    print("Job status :", status, job_id)
+                    await queue.put((JOB_FAILED, header_id, job, None))
+                    return JOB_FAILED
+
+                if state == JOB_DONE:
+                    print("Job status :", status, job_id)
+                    # the result is fetched right away, the ingestion does not wait for the other jobs
+                    result = await asyncio.to_thread(job.result)
+                    await queue.put((JOB_DONE, header_id, job, result))
+                    return JOB_DONE
+
+            # the next check would be after the deadline
+            if deadline is not None and loop.time() + delay > deadline:
+                print("Job status :", status, job_id)
+                return None
+
+            await asyncio.sleep(delay)
+
+    async def ingest(self, queue, on_result, on_error):
+        # one job at a time, in the order they finish
+        while True:
+            item = await queue.get()
+            try:
+                if item is None:
+                    return
+
+                kind, header_id, job, result = item
+                try:
+                    if kind == JOB_DONE:
+                        await asyncio.to_thread(on_result, job, result)
+                    else:
+                        await asyncio.to_thread(on_error, header_id, job)
+                except Exception as e:
+                    print("Error for ingesting job {} :".format(job.job_id()), str(e))
+            finally:
+                queue.task_done()
+
+    async def run(self, pending_jobs, on_result, on_error):
+        '''
+        pending_jobs: list of (header_id, job_id, service)
+        on_result(job, result): stores the result of a finished job
+        on_error(header_id, job): marks a failed or cancelled job
+        Returns a dict {job_id: JOB_DONE, JOB_FAILED or None}
+        '''
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        queue = asyncio.Queue()
+
+        deadline = None
+        if self.timeout is not None:
+            deadline = asyncio.get_running_loop().time() + self.timeout
+
+        consumer = asyncio.create_task(self.ingest(queue, on_result, on_error))
+
+        states = await asyncio.gather(*[self.poll_job(semaphore, queue, header_id, job_id, service, deadline)
+                                        for header_id, job_id, service in pending_jobs], return_exceptions=True)
+
+        await queue.put(None)
+        await consumer
+
+        job_states = {}
+        for (header_id, job_id, service), state in zip(pending_jobs, states):
+            if isinstance(state, Exception):
+                print("Error for checking job {} :".format(job_id), str(state))
+                state = None
+            job_states[job_id] = state
+
+        return job_states
+
+    def poll(self, pending_jobs, on_result, on_error):
+        return asyncio.run(self.run(pending_jobs, on_result, on_error))
@@ -0,0 +1,123 @@
+"""
+file name: service_registry.py
+author: Handy
+date: 18 October 2026
+
+Registry of the runtime services and backends of the process. A service is created
+(and its account saved) once per (channel, token), a backend is retrieved once per
+(channel, token, hardware name). The snapshot of a backend (configuration, properties
+and target in an AerSimulator, without the connection to the service) is built once
+per calibration and shared by the simulator, transpiler and noise-model paths. When a
+new calibration of a hardware is exported, its backends and snapshots are retrieved
+again (see update_backend_calibration).
+"""
+from ..qiskit_wrapper.qiskit_wrapper import get_backend_name, get_calibration_timestamp
+
+# (channel, token): service
+_services = {}
+# (channel, token) of the accounts already saved on disk by this process
+_saved_accounts = set()
+# id of a service: (channel, token), to find the backends of a service
+_service_keys = {}
+# (channel, token, hardware_name): backend
+_backends = {}
+# (hardware_name, calibration timestamp): snapshot of the backend
+_snapshots = {}
+# hardware_name: calibration id the backends of the hardware were retrieved for
+_calibrations = {}
+
+def get_service(token, channel="ibm_quantum", save_account=True):
+    '''
+    Returns the service of the token, created once. The account is saved on disk the
+    first time only.
+    '''
+    key = (channel, token)
+    if key not in _services:
+        # imported on the first use, the workflows on the database only do not need it
+        from qiskit_ibm_runtime import QiskitRuntimeService
+
+        if save_account and key not in _saved_accounts:
+            print("Saving IBM Account...")
+            QiskitRuntimeService.save_account(channel=channel, token=token, overwrite=True)
+            _saved_accounts.add(key)
+
+        register_service(QiskitRuntimeService(channel=channel, token=token), token, channel)
+
+    return _services[key]
+
+def register_service(service, token, channel="ibm_quantum"):
+    # e.g. a FakeRuntimeService, returned by get_service for this token from now on
+    key = (channel, token)
+    _services[key] = service
+    _service_keys[id(service)] = key
+
+    return service
+
+def get_backend(token, hardware_name, channel="ibm_quantum", refresh=False):
+    '''
+    Returns the backend of the service of the token, retrieved once (refresh=True to
+    retrieve it again, e.g. for new properties)
+    '''
+    key = (channel, token, hardware_name)
+    if refresh or key not in _backends:
+        print(f"Retrieving the real backend information of {hardware_name}...")
+        _backends[key] = get_service(token, channel).get_backend(hardware_name)
+
+    return _backends[key]
+
+def invalidate_backend(hardware_name):
+    # the backends and snapshots of the hardware are retrieved again on their next use
+    for key in [key for key in _backends if key[2] == hardware_name]:
+        del _backends[key]
+    for key in [key for key in _snapshots if key[0] == hardware_name]:
+        del _snapshots[key]
+
+def update_backend_calibration(hardware_name, calibration_id):
+    '''
+    Drops the backends and snapshots of the hardware if they were retrieved for another
+    calibration, so their properties are the ones of the new calibration. Returns True
+    if they were dropped.
+    '''
+    if hardware_name in _calibrations and _calibrations[hardware_name] == calibration_id:
+        return False
+
+    _calibrations[hardware_name] = calibration_id
+    invalidate_backend(hardware_name)
+
+    return True
+
+def get_service_backend(service, hardware_name):
+    # backend of a service of the registry, retrieved once; other services are asked every time
+    key = _service_keys.get(id(service))
+    if key is None or _services.get(key) is not service:
+        return service.backend(hardware_name)
+
+    channel, token = key
+    return get_backend(token, hardware_name, channel)
+
+def get_backend_snapshot(backend):
+    '''
+    Returns an AerSimulator with the configuration, properties and target of the backend,
+    without a noise model (built by the simulators for each noise level). It can be
+    copied and sent to the worker processes, unlike the runtime backend.
+    '''
+    key = (get_backend_name(backend), str(get_calibration_timestamp(backend)))
+    if key not in _snapshots:
+        from qiskit_aer import AerSimulator
+        from qiskit_aer.noise import NoiseModel
+
+        # only the latest calibration of a hardware is kept
+        for old_key in [old_key for old_key in _snapshots if old_key[0] == key[0]]:
+            del _snapshots[old_key]
+
+        _snapshots[key] = AerSimulator.from_backend(backend, noise_model=NoiseModel())
+
+    return _snapshots[key]
+
+def clear_service_registry():
+    _services.clear()
+    _saved_accounts.clear()
+    _service_keys.clear()
+    _backends.clear()
+    _snapshots.clear()
+    _calibrations.clear()
@@ -1,8 +1,10 @@
-from .triq_wrapper import run, get_mapping, generate_realtime_calibration_data,  generate_initial_mapping_file
+from .triq_wrapper import run, generate_realtime_calibration_data,  generate_initial_mapping_file, \
+restore_calibration_data, get_exported_calibration_id
 
 __all__ = [
     "run",
-    "get_mapping",
     "generate_realtime_calibration_data",
     "generate_initial_mapping_file",
+    "restore_calibration_data",
+    "get_exported_calibration_id",
 ]
\ No newline at end of file
@@ -1,235 +1,260 @@
-import requests
+"""
+file name: retrieve_calibration_data.py
+author: Handy
+date: 18 October 2026
+
+Retrieves the calibration data (backend properties) of the IBM backends and stores it
+in the ibm, ibm_gate_spec and ibm_qubit_spec tables. The properties of the backends are
+fetched concurrently; each one is parsed once into columns and written with one
+executemany per table, in one transaction per calibration.
+
+The properties can be read from a folder of json files (<hw_name>.json) instead of
+the HTTP endpoint, e.g. to benchmark the ingestion offline:
+
+    python -m wrappers.triq_wrapper.retrieve_calibration_data --fixtures ./fixtures
+    python -m wrappers.triq_wrapper.retrieve_calibration_data --save-fixtures ./fixtures
+
+Without access to the endpoint, the fixtures can be generated from the properties of a
+qiskit fake backend (the same properties for every hw_name):
+
+    python -m wrappers.triq_wrapper.retrieve_calibration_data --generate-fixtures ./fixtures ibm_torino
+"""
+import os
+import json
+import time
+import argparse
 import datetime
-import mysql.connector
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def insert_calibration_data():
-    now = datetime.datetime.now()
+from ..database_wrapper import get_connection, transaction
 
-    try:
-        # MySQL connection parameters
-        mysql_config = {
-            'user': 'user_1',
-            'password': '1234',
-            'host': 'localhost',
-            'database': 'framework'
-        }
+properties_url = "https://api-qcon.quantum-computing.ibm.com/api/Backends/{}/properties"
+
+# properties of a qubit stored in ibm_qubit_spec, each with its calibration date
+qubit_properties = ("T1", "T2", "frequency", "anharmonicity", "readout_error", "prob_meas0_prep1",
+                    "prob_meas1_prep0", "readout_length")
 
-        # Connect to the MySQL database
-        conn = mysql.connector.connect(**mysql_config)
-        cursor = conn.cursor()
+sql_insert_gate_spec = '''INSERT INTO ibm_gate_spec (calibration_id, qubit_control, qubit_target, gate_name,
+date, gate_error, gate_length) VALUES (%s, %s, %s, %s, %s, %s, %s)'''
 
-        hw_provider = "IBM"
+sql_insert_qubit_spec = '''INSERT INTO ibm_qubit_spec (calibration_id, qubit, ''' + \
+    ", ".join(qubit_properties) + ", " + ", ".join(name + "_date" for name in qubit_properties) + \
+    ''') VALUES (''' + ", ".join(["%s"] * (2 + 2 * len(qubit_properties))) + ")"
 
-        # get all the backends
-        cursor.execute('SELECT hw_name, 2q_native_gates FROM calibration_data.hardware WHERE hw_provider = %s AND status IS NULL ', (hw_provider, ))
+#region Fetch
 
-        # Fetch all the rows from the result set
+def get_backends(hw_provider = "IBM"):
+    # hw_name of the backends still in use
+    with transaction() as (conn, cursor):
+        cursor.execute('''SELECT hw_name, `2q_native_gates` FROM hardware
+                       WHERE hw_provider = %s AND (status IS NULL OR status = '')''', (hw_provider, ))
         results = cursor.fetchall()
 
-        cursor.close()
+    return [hw_name for hw_name, native_gates in results]
+
+def get_fixture_path(fixture_dir, hw_name):
+    return os.path.join(fixture_dir, hw_name + ".json")
+
+def fetch_properties(hw_name, fixture_dir = None):
+    """
+    Returns the properties json of the backend, from the HTTP endpoint or from
+    <fixture_dir>/<hw_name>.json
+    """
+    if fixture_dir is not None:
+        with open(get_fixture_path(fixture_dir, hw_name), "r") as file:
+            return json.load(file)
+
+    import requests
+
+    response = requests.get(properties_url.format(hw_name))
+    if response.status_code != 200:
+        raise RuntimeError("Failed to retrieve JSON. Status code: {}".format(response.status_code))
+
+    return response.json()
+
+def save_fixture(json_data, hw_name, fixture_dir):
+    os.makedirs(fixture_dir, exist_ok=True)
+    with open(get_fixture_path(fixture_dir, hw_name), "w") as file:
+        json.dump(json_data, file)
+
+def get_properties_json(properties):
+    """
+    Converts BackendProperties (e.g. of a fake backend) to the json of the HTTP endpoint,
+    to write a fixture with save_fixture
+    """
+    def convert(value):
+        if isinstance(value, datetime.datetime):
+            if value.tzinfo is not None:
+                value = value.astimezone(datetime.timezone.utc)
+            return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+        if isinstance(value, dict):
+            return {key: convert(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [convert(item) for item in value]
+        return value
+
+    return convert(properties.to_dict())
+
+def generate_fixtures(hw_names, fixture_dir, fake_backend = None):
+    """
+    Writes a fixture for each backend with the properties of a qiskit fake backend
+    (Fake27QPulseV1 by default), returns the paths of the files
+    """
+    if fake_backend is None:
+        from qiskit.providers.fake_provider import Fake27QPulseV1
+        fake_backend = Fake27QPulseV1()
+
+    json_data = get_properties_json(fake_backend.properties())
+    for hw_name in hw_names:
+        save_fixture(json_data, hw_name, fixture_dir)
+
+    return [get_fixture_path(fixture_dir, hw_name) for hw_name in hw_names]
+
+#endregion
+
+#region Parse
+
+def get_date(date):
+    return None if date is None else date.replace("Z", "")
+
+def get_values(values):
+    # list of floats, NaN as None (NULL)
+    values = np.array(values, dtype=float)
+    return [None if is_nan else value for value, is_nan in zip(values.tolist(), np.isnan(values).tolist())]
+
+def parse_properties(json_data):
+    """
+    Parses the properties json into columns: the calibration datetime, the columns of
+    ibm_gate_spec and the columns of ibm_qubit_spec (without the calibration id)
+    """
+    calibration_datetime = datetime.datetime.strptime(json_data['last_update_date'], "%Y-%m-%dT%H:%M:%SZ")
+
+    gates = json_data['gates']
+    gate_columns = {
+        "qubit_control": [g["qubits"][0] for g in gates],
+        # the target of a 1 qubit gate is the qubit itself
+        "qubit_target": [g["qubits"][1] if len(g["qubits"]) > 1 else g["qubits"][0] for g in gates],
+        "gate_name": [g["gate"] for g in gates],
+        "date": [get_date(g["parameters"][0]["date"]) for g in gates],
+        # reset: no error, its first parameter is the length
+        "gate_error": get_values([0 if g["gate"] == "reset" else g["parameters"][0]["value"] for g in gates]),
+        "gate_length": [g["parameters"][0]["value"] if g["gate"] == "reset" else g["parameters"][1]["value"] for g in gates],
+    }
+
+    qubits = json_data['qubits']
+    qubit_columns = {"qubit": list(range(len(qubits)))}
+    values = {name: [np.nan] * len(qubits) for name in qubit_properties}
+    dates = {name: [None] * len(qubits) for name in qubit_properties}
+    for qubit, q in enumerate(qubits):
+        for p in q:
+            if p["name"] in values:
+                values[p["name"]][qubit] = p["value"]
+                dates[p["name"]][qubit] = get_date(p["date"])
+
+    for name in qubit_properties:
+        qubit_columns[name] = get_values(values[name])
+    for name in qubit_properties:
+        qubit_columns[name + "_date"] = dates[name]
+
+    return calibration_datetime, gate_columns, qubit_columns
+
+#endregion
+
+#region Store
+
+def insert_calibration(cursor, hw_name, calibration_datetime, gate_columns, qubit_columns):
+    """
+    Inserts a calibration and its gates and qubits, returns its calibration id or None
+    if it is already in the database
+    """
+    # Check if the calibration_datetime already exists in the table
+    cursor.execute('SELECT calibration_id FROM ibm WHERE calibration_datetime = %s AND hw_name = %s',
+                   (calibration_datetime, hw_name, ))
+    if cursor.fetchone():
+        return None
+
+    cursor.execute('INSERT INTO ibm (calibration_datetime, hw_name, data_source) VALUES (%s, %s, %s)',
+                   (calibration_datetime, hw_name, "json"))
+    calibration_id = cursor.lastrowid
+
+    gate_rows = list(zip([calibration_id] * len(gate_columns["gate_name"]), *gate_columns.values()))
+    cursor.executemany(sql_insert_gate_spec, gate_rows)
+
+    qubit_rows = list(zip([calibration_id] * len(qubit_columns["qubit"]), *qubit_columns.values()))
+    cursor.executemany(sql_insert_qubit_spec, qubit_rows)
+
+    return calibration_id
+
+def store_properties(conn, hw_name, json_data):
+    calibration_datetime, gate_columns, qubit_columns = parse_properties(json_data)
+
+    # the calibration and all its gates and qubits are committed once
+    with transaction(conn) as (conn, cursor):
+        calibration_id = insert_calibration(cursor, hw_name, calibration_datetime, gate_columns, qubit_columns)
+
+    now = datetime.datetime.now()
+    if calibration_id is None:
+        print(hw_name, "Calibration datetime ("+ str(calibration_datetime) +") already exists. Skipping insertion.",
+              now.strftime("%Y-%m-%d %H:%M:%S"))
+    else:
+        print(hw_name, "Data ("+ str(calibration_datetime) +") inserted with ID:", calibration_id,
+              now.strftime("%Y-%m-%d %H:%M:%S"))
+
+    return calibration_id
+
+#endregion
+
+def insert_calibration_data(hw_names = None, fixture_dir = None, save_fixture_dir = None, workers = 8):
+    """
+    Fetches the properties of the backends (all the IBM backends in use if hw_names is
+    None) with workers threads, and stores each of them as soon as it is fetched.
+    Returns {hw_name: calibration_id}, None for a calibration already stored or a failure.
+    """
+    if hw_names is None:
+        hw_names = get_backends()
+
+    calibration_ids = {}
+    conn = get_connection()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(hw_names)))) as executor:
+            futures = {executor.submit(fetch_properties, hw_name, fixture_dir): hw_name for hw_name in hw_names}
+
+            for future in as_completed(futures):
+                hw_name = futures[future]
+                calibration_ids[hw_name] = None
+                try:
+                    json_data = future.result()
+                    if save_fixture_dir is not None:
+                        save_fixture(json_data, hw_name, save_fixture_dir)
+
+                    calibration_ids[hw_name] = store_properties(conn, hw_name, json_data)
+
+                except Exception as e:
+                    print("=====>", hw_name, "Error :", str(e))
+    finally:
         conn.close()
 
-        #results = [["ibm_prague", ""]]
-
-        # Loop through the results
-        for result in results:
-            hw_name, native_gates = result
-
-            try:
-
-                # Define the URL of the JSON file you want to download
-                json_url = "https://api-qcon.quantum-computing.ibm.com/api/Backends/"+ hw_name +"/properties"
-
-                # Send an HTTP GET request to the URL
-                response = requests.get(json_url)
-
-                # Check if the request was successful (status code 200)
-                if response.status_code == 200:
-                    # Parse the JSON content from the response
-                    json_data = response.json()
-                        
-                    calibration_datetime = datetime.datetime.strptime(json_data['last_update_date'], "%Y-%m-%dT%H:%M:%SZ")
-                    #print(calibration_datetime)
-
-                    # Connect to the MySQL database
-                    conn = mysql.connector.connect(**mysql_config)
-                    cursor = conn.cursor()
-                    
-                    # Check if the calibration_datetime already exists in the table
-                    cursor.execute('SELECT calibration_id FROM ibm WHERE calibration_datetime = %s AND hw_name = %s', (calibration_datetime, hw_name, ))
-                    existing_row = cursor.fetchone()
-
-                    if existing_row:
-                        print(hw_name, "Calibration datetime ("+ str(calibration_datetime) +") already exists (calibration_id: " + str(existing_row[0]) + "). Skipping insertion.", now.strftime("%Y-%m-%d %H:%M:%S"))
-                        conn.close()
-                        continue
-                    
-                    # Insert the data into the "rigetti" table
-                    cursor.execute('INSERT INTO ibm (calibration_datetime, hw_name, data_source) VALUES (%s, %s, "json")',
-                                (calibration_datetime, hw_name))
-                    calibration_id = cursor.lastrowid
-                    
-                    print(hw_name, "Data ("+ str(calibration_datetime) +") inserted with ID:", calibration_id, now.strftime("%Y-%m-%d %H:%M:%S"))
-                
-                    #print(qubit_spec)
-                    for g in json_data['gates']:
-                        #print(g["gate"], g["qubits"], len(g["qubits"]))
-                        
-                        qubit_control = None
-                        qubit_target = None
-                        if (len(g["qubits"]) == 1):
-                            qubit_control = g["qubits"][0]
-                            qubit_target = g["qubits"][0]
-                        else:
-                            qubit_control = g["qubits"][0]
-                            qubit_target = g["qubits"][1]
-                        
-                        p = g["parameters"]
-                        
-                        if (g["gate"] == "reset"):
-                            pGateError = 0
-                            pGateLength = p[0]["value"]
-                        else: 
-                            pGateError = p[0]["value"] if not np.isnan(p[0]["value"]) else None
-                            pGateLength = p[1]["value"] 
-                        
-                        #pDate = datetime.datetime.strptime(p[0]["date"], "%Y-%m-%dT%H:%M:%SZ")
-                        pDate = str.replace(p[0]["date"], "Z", "")
-                        # Insert data into "rigetti_qubit_spec" table
-
-                        cursor.execute('''
-                            INSERT INTO ibm_gate_spec (
-                                calibration_id,
-                                qubit_control,
-                                qubit_target,
-                                gate_name,
-                                date,
-                                gate_error,
-                                gate_length
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-                        ''', (
-                            calibration_id,
-                            qubit_control,
-                            qubit_target,
-                            g["gate"],
-                            pDate,   # calibration date for gate error
-                            pGateError,  # value of gate error
-                            pGateLength,   # value of gate length
-                        ))
-                
-
-                    for qubit, q in enumerate(json_data['qubits']):
-                        pT1 = None
-                        pT2 = None
-                        pfrequency = None
-                        panharmonicity = None
-                        preadout_error = None
-                        pprob_meas0_prep1 = None
-                        pprob_meas1_prep0 = None
-                        preadout_length = None
-                        pT1_date = None
-                        pT2_date = None
-                        pfrequency_date = None
-                        panharmonicity_date = None
-                        preadout_error_date = None
-                        pprob_meas0_prep1_date = None
-                        pprob_meas1_prep0_date = None
-                        preadout_length_date = None
-
-                        for p in q:
-                            if (p["name"] == "T1"):
-                                pT1 = p["value"] if not np.isnan(p["value"]) else None
-                                pT1_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "T2"):
-                                pT2 = p["value"] if not np.isnan(p["value"]) else None
-                                pT2_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "frequency"):
-                                pfrequency = p["value"] if not np.isnan(p["value"]) else None
-                                pfrequency_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "anharmonicity"):
-                                panharmonicity = p["value"] if not np.isnan(p["value"]) else None
-                                panharmonicity_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "readout_error"):
-                                preadout_error = p["value"] if not np.isnan(p["value"]) else None
-                                preadout_error_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "prob_meas0_prep1"):
-                                pprob_meas0_prep1 = p["value"] if not np.isnan(p["value"]) else None
-                                pprob_meas0_prep1_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "Tprob_meas1_prep01"):
-                                pprob_meas1_prep0 = p["value"] if not np.isnan(p["value"]) else None
-                                pprob_meas1_prep0_date = str.replace(p["date"], "Z", "")
-
-                            if (p["name"] == "readout_length"):
-                                preadout_length = p["value"] if not np.isnan(p["value"]) else None
-                                preadout_length_date = str.replace(p["date"], "Z", "")
-
-
-                        cursor.execute('''
-                            INSERT INTO ibm_qubit_spec (
-                                calibration_id,
-                                qubit,
-                                T1,
-                                T2,
-                                frequency,
-                                anharmonicity,
-                                readout_error,
-                                prob_meas0_prep1,
-                                prob_meas1_prep0,
-                                readout_length,
-                                T1_date,
-                                T2_date,
-                                frequency_date,
-                                anharmonicity_date,
-                                readout_error_date,
-                                prob_meas0_prep1_date,
-                                prob_meas1_prep0_date,
-                                readout_length_date
-                            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                            ''', (
-                                calibration_id,
-                                qubit,
-                                pT1,
-                                pT2,
-                                pfrequency,
-                                panharmonicity,
-                                preadout_error,
-                                pprob_meas0_prep1,
-                                pprob_meas1_prep0,
-                                preadout_length,
-                                pT1_date,
-                                pT2_date,
-                                pfrequency_date,
-                                panharmonicity_date,
-                                preadout_error_date,
-                                pprob_meas0_prep1_date,
-                                pprob_meas1_prep0_date,
-                                preadout_length_date
-                            ))
-
-                    # Commit the changes and close the connection
-                    conn.commit()
-                
-                else:
-                    print("Failed to retrieve JSON. Status code:", response.status_code)
-                    cursor.close()
-                    conn.close()
-
-            except Exception as e:
-                print("=====>", hw_name, "Error :", str(e))
-
-        
-
-    except Exception as e:
-        print("An error occurred:", str(e))
-
-    
+    return calibration_ids
 
 if __name__ == "__main__":
-    insert_calibration_data()
+    parser = argparse.ArgumentParser(description="Stores the calibration data of the IBM backends")
+    parser.add_argument("--fixtures", default=None, help="folder of <hw_name>.json files to read instead of the HTTP endpoint")
+    parser.add_argument("--save-fixtures", default=None, help="folder to save the fetched json files to")
+    parser.add_argument("--generate-fixtures", default=None,
+                        help="folder to write json files generated from a qiskit fake backend to (nothing is stored)")
+    parser.add_argument("--workers", type=int, default=8, help="number of backends fetched at the same time")
+    parser.add_argument("hw_names", nargs="*", help="backends (default: all the IBM backends in use)")
+    args = parser.parse_args()
+
+    if args.generate_fixtures is not None:
+        for path in generate_fixtures(args.hw_names or get_backends(), args.generate_fixtures):
+            print("Fixture written:", path)
+        raise SystemExit(0)
+
+    tmp_start_time = time.perf_counter()
+    calibration_ids = insert_calibration_data(args.hw_names or None, fixture_dir=args.fixtures,
+                                              save_fixture_dir=args.save_fixtures, workers=args.workers)
+    tmp_end_time = time.perf_counter()
+
+    print("Time for {} backends: {} seconds".format(len(calibration_ids), tmp_end_time - tmp_start_time))
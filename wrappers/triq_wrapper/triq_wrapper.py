@@ -7,10 +7,11 @@ import subprocess as sp
 import os
 from .ir2dag import parse_ir
 import time, json
-import mysql.connector
-from commons import Config
-
-conf = Config()
+import tempfile
+import threading
+import shutil
+from commons import conf
+from ..database_wrapper import get_connection
 
 triq_path = os.path.dirname(os.path.abspath(__file__))
 parent_dir = os.path.dirname(triq_path)
@@ -20,18 +21,17 @@ grandparent_dir = os.path.dirname(parent_dir)
 #dag_path = os.path.expanduser("./")
 #map_path = os.path.expanduser("./")
 
-out_path = grandparent_dir
-dag_path = grandparent_dir
 map_path = grandparent_dir
 
 base_name = "output"
 map_name = "init_mapo.map"
 dag_name = base_name + ".in"
 out_name = base_name + ".qasm"
-dag_file_path = os.path.join(dag_path, dag_name)
-out_file_path = os.path.join(out_path, out_name)
+log_name = base_name + ".log"
 map_file_path = os.path.join(map_path, map_name)
 
+_parse_lock = threading.Lock()
+
 
 def read_file(file_path):
     success = False
@@ -55,128 +55,169 @@ def create_dir(path):
         # Create a new directory because it does not exist
         os.makedirs(path)
 
-def generate_qasm(qasm_str, hardware_name, measurement_type):
+def generate_qasm(qasm_str, hardware_name, measurement_type, scratch_dir, map_file = None):
+    """
+    Runs TriQ on the circuit, with all its files (input, output, log) in scratch_dir.
+    Returns the compiled qasm and the mapping printed by TriQ.
+    """
     tmp_hw_name = hardware_name
 
-    # parse qasm into .in
-    parse_ir(qasm_str, os.path.join(dag_path, dag_name))
+    dag_file = os.path.join(scratch_dir, dag_name)
+    out_file = os.path.join(scratch_dir, out_name)
+    log_file = os.path.join(scratch_dir, log_name)
 
-    # call triq
+    if map_file is None:
+        map_file = map_file_path
+
+    # parse qasm into .in, the parser keeps its state in module globals
+    with _parse_lock:
+        parse_ir(qasm_str, dag_file)
+
+    # call triq, from the root folder so that it finds the config/*.rlb files
     call_triq = [os.path.join(triq_path, "triq"), 
-                dag_file_path, 
-                out_file_path, tmp_hw_name, str(0), map_file_path, measurement_type]
-    
-    #out_file=open("log/output.log",'w+')
-    
-    if not os.path.exists(os.path.join(triq_path, "log/")):
-        os.makedirs(os.path.join(triq_path, "log/"))
+                dag_file, 
+                out_file, tmp_hw_name, str(0), map_file, measurement_type]
+
+    with open(log_file, "w+") as log:
+        p = sp.run(call_triq, stdout=log, text=True, shell=False, cwd=grandparent_dir)
 
-    out_file=open(os.path.join(triq_path, "log/output.log"),'w+')
+    if p.returncode != 0:
+        raise RuntimeError("TriQ failed with exit code {}, see {}".format(p.returncode, log_file))
 
-    p = sp.Popen(call_triq, stdout=out_file, text=True, shell=False)    
-    p.communicate()
-    p.terminate()
-    p.wait()
-    p.kill()
+    result_qasm = read_file(out_file)
 
-    result_qasm = read_file(out_file_path)
+    with open(log_file, "r") as file:
+        mapping_dict = json.load(file)
 
-    return result_qasm
+    return result_qasm, mapping_dict
 
-def run(qasm_str, hardware_name, measurement_type = "normal"):
+def run(qasm_str, hardware_name, measurement_type = "normal", initial_mapping = None):
     """
     Parameters:
-        qasm_path:
-        hardware_name:
+        qasm_str: circuit to compile
+        hardware_name: name of the TriQ config (config/<hardware_name>_{S,T,M}.rlb)
+        measurement_type: normal, polar, polar_meas or polar_mix
+        initial_mapping: list of physical qubits, if None the map file of 
+            generate_initial_mapping_file() is used
+
+    Returns the compiled qasm and the mapping. Every call runs in a temporary directory 
+    of its own, so that several circuits can be compiled at the same time.
     """
-    
-    result_qasm = generate_qasm(qasm_str, hardware_name, measurement_type)
+    with tempfile.TemporaryDirectory(prefix="triq_") as scratch_dir:
+        map_file = None
+        if initial_mapping is not None:
+            map_file = generate_initial_mapping_file(initial_mapping, os.path.join(scratch_dir, map_name))
 
-    if (os.path.isfile(dag_file_path)):
-        os.remove(dag_file_path)
+        result_qasm, mapping_dict = generate_qasm(qasm_str, hardware_name, measurement_type, scratch_dir, map_file)
 
-    if (os.path.isfile(out_file_path)):
-        os.remove(out_file_path)
+    return result_qasm, mapping_dict
 
+def generate_initial_mapping_file(init_maps, file_path = map_file_path):
+    string_maps = ', '.join(map(str, init_maps))
+    # print("Initial mapping path :", string_maps)
+    f = open(file_path, "w+")
+    f.write(string_maps)
+    f.close()
 
-    return result_qasm
+    return file_path
 
-def get_mapping():
-    """
+#region Calibration data
 
-    """
+config_dir = os.path.join(grandparent_dir, "config")
 
-    #log_path = os.path.expanduser("./log/output.log")
-    log_path = os.path.join(triq_path, "log/output.log")
-    
+# reliability matrices of TriQ: 1 qubit gates, 2 qubit gates and measurements
+calibration_file_types = ("S", "T", "M")
 
-    mapping_dict = None
-    with open(log_path, "r") as file:
-        mapping_dict = json.load(file)
+# exported calibration sets, one folder per hardware and calibration id
+calibration_history_dir = os.path.join(grandparent_dir, "cache", "calibration")
 
+def get_calibration_file_path(hw_name, file_type, directory = None):
+    if directory is None:
+        directory = config_dir
 
-    return mapping_dict
+    return os.path.join(directory, "{}_real_{}.rlb".format(hw_name, file_type))
 
-def generate_initial_mapping_file(init_maps):
-    string_maps = ', '.join(map(str, init_maps))
-    # print("Initial mapping path :", string_maps)
-    f = open(map_file_path, "w+")
-    f.write(string_maps)
-    f.close()
+def get_calibration_state_path(hw_name):
+    # calibration id of the current config/<hw_name>_real_*.rlb files
+    return os.path.join(config_dir, "{}_real.calibration".format(hw_name))
 
-def generate_realtime_calibration_data(hw_name = conf.hardware_name):
-    # Connect to the MySQL database
-    conn = mysql.connector.connect(**conf.mysql_config)
-    cursor = conn.cursor()
+def get_calibration_history_path(hw_name, calibration_id):
+    return os.path.join(calibration_history_dir, hw_name, str(calibration_id))
 
-    # get last calibration id
-    cursor.execute('''SELECT calibration_id, 2q_native_gates FROM ibm i
+def write_file_atomic(file_path, content):
+    """
+    Writes to a temporary file of the same folder first, then renames it: TriQ never
+    reads a half-written file
+    """
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            file.write(content)
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def get_exported_calibration_id(hw_name):
+    # calibration id of the current files, None if they were not exported (or are missing)
+    try:
+        with open(get_calibration_state_path(hw_name), "r") as file:
+            calibration_id = file.read().strip()
+    except OSError:
+        return None
+
+    for file_type in calibration_file_types:
+        if not os.path.isfile(get_calibration_file_path(hw_name, file_type)):
+            return None
+
+    return calibration_id
+
+def get_latest_calibration(cursor, hw_name):
+    # calibration id and 2 qubit native gate of the latest calibration of the hardware
+    cursor.execute('''SELECT calibration_id, `2q_native_gates` FROM ibm i
 INNER JOIN hardware h ON i.hw_name = h.hw_name
 WHERE i.hw_name = %s ORDER BY calibration_datetime DESC LIMIT 0, 1;
                     ''', (hw_name, ))
     results = cursor.fetchall()
-    calibration_id, native_gates_2q = results[0]
+
+    return results[0]
+
+def get_calibration_files(cursor, calibration_id, native_gates_2q):
+    """
+    Returns the content of the reliability matrices of a calibration, {file type: content}.
+    A matrix without any data is left out.
+    """
+    files = {}
 
     # get 1 qubit gate error
     cursor.execute('''SELECT calibration_id, qubit, 1 - x_error as fidelity_1q 
                    FROM ibm_one_qubit_gate_spec 
                    WHERE calibration_id = %s;
                     ''', (calibration_id, ))
-    # print(calibration_id)
     results = cursor.fetchall()
-    count = len(results)
-    if count > 0:
-        #f = open("./config/" + hw_name + "_real_S.rlb", "w+")
-        f = open(os.path.join(grandparent_dir, "./config/" + hw_name + "_real_S.rlb"), "w+")
-        
-        f.write("{}\n".format(count))
-        for res in results:
-            calibration_id, qubit, fidelity_1q = res
-            f.write("{} {} \n".format(qubit, fidelity_1q))
-
-        f.close()
+    if len(results) > 0:
+        lines = ["{}\n".format(len(results))]
+        for _, qubit, fidelity_1q in results:
+            lines.append("{} {} \n".format(qubit, fidelity_1q))
+        files["S"] = "".join(lines)
 
     # get 2 qubit gate error
     cursor.execute('''SELECT calibration_id, qubit_control, qubit_target, ROUND(1 - ''' + native_gates_2q + '''_error, 6) as fidelity_2q
                    FROM ibm_two_qubit_gate_spec 
                    WHERE calibration_id = %s ;
                     ''', (calibration_id, ))
-    # AND ''' + native_gates_2q + '''_error != 1
     results = cursor.fetchall()
-    count = len(results)
-    if count > 0:
-        #f = open("./config/" + hw_name + "_real_T.rlb", "w+")
-        f = open(os.path.join(grandparent_dir, "./config/" + hw_name + "_real_T.rlb"), "w+")
-        f.write("{}\n".format(count))
-        for res in results:
-            calibration_id, qubit_control, qubit_target, fidelity_2q = res
-
+    if len(results) > 0:
+        lines = ["{}\n".format(len(results))]
+        for _, qubit_control, qubit_target, fidelity_2q in results:
             if fidelity_2q <= 0:
                 fidelity_2q = 0.001
-
-            f.write("{} {} {} \n".format(qubit_control, qubit_target, fidelity_2q))
-
-        f.close()
+            lines.append("{} {} {} \n".format(qubit_control, qubit_target, fidelity_2q))
+        files["T"] = "".join(lines)
 
     # get readout error
     cursor.execute('''SELECT calibration_id, qubit, 1 - readout_error as readout_fidelity
@@ -184,15 +225,91 @@ WHERE i.hw_name = %s ORDER BY calibration_datetime DESC LIMIT 0, 1;
                    WHERE calibration_id = %s;
                     ''', (calibration_id, ))
     results = cursor.fetchall()
-    count = len(results)
-    if count > 0:
-        #f = open("./config/" + hw_name + "_real_M.rlb", "w+")
-        f = open(os.path.join(grandparent_dir, "./config/" + hw_name + "_real_M.rlb"), "w+")
-        f.write("{}\n".format(count))
-        for res in results:
-            calibration_id, qubit, readout_fidelity = res
-            f.write("{} {}\n".format(qubit, readout_fidelity))
-
-        f.close()
-
-    conn.close()
+    if len(results) > 0:
+        lines = ["{}\n".format(len(results))]
+        for _, qubit, readout_fidelity in results:
+            lines.append("{} {}\n".format(qubit, readout_fidelity))
+        files["M"] = "".join(lines)
+
+    return files
+
+def read_calibration_history(hw_name, calibration_id):
+    # {file type: content} of an exported calibration, None if it is not in the history
+    history_path = get_calibration_history_path(hw_name, calibration_id)
+    if not os.path.isdir(history_path):
+        return None
+
+    files = {}
+    for file_type in calibration_file_types:
+        file_path = get_calibration_file_path(hw_name, file_type, history_path)
+        if os.path.isfile(file_path):
+            with open(file_path, "r") as file:
+                files[file_type] = file.read()
+
+    return files
+
+def save_calibration_history(hw_name, calibration_id, files):
+    if conf.calibration_history_size <= 0:
+        return
+
+    history_path = get_calibration_history_path(hw_name, calibration_id)
+    for file_type, content in files.items():
+        write_file_atomic(get_calibration_file_path(hw_name, file_type, history_path), content)
+
+    # only the latest calibration sets of the hardware are kept
+    hw_path = os.path.dirname(history_path)
+    entries = sorted((os.path.getmtime(os.path.join(hw_path, name)), name) for name in os.listdir(hw_path))
+    for _, name in entries[:max(len(entries) - conf.calibration_history_size, 0)]:
+        shutil.rmtree(os.path.join(hw_path, name), ignore_errors=True)
+
+def write_calibration_files(hw_name, calibration_id, files):
+    for file_type, content in files.items():
+        write_file_atomic(get_calibration_file_path(hw_name, file_type), content)
+
+    # written last, the files are complete when it says calibration_id
+    write_file_atomic(get_calibration_state_path(hw_name), "{}\n".format(calibration_id))
+
+def restore_calibration_data(hw_name, calibration_id):
+    """
+    Puts back the reliability matrices of an earlier calibration from the history, e.g.
+    to compile again with the calibration of a previous experiment. Returns False if 
+    the calibration is not in the history.
+    """
+    files = read_calibration_history(hw_name, calibration_id)
+    if files is None:
+        return False
+
+    write_calibration_files(hw_name, calibration_id, files)
+
+    return True
+
+def generate_realtime_calibration_data(hw_name = conf.hardware_name, force = False):
+    """
+    Exports the latest calibration of hw_name to config/<hw_name>_real_{S,T,M}.rlb, the
+    reliability matrices of TriQ. Nothing is written if the files already hold this 
+    calibration (force=True to write them anyway). Returns the calibration id.
+    """
+    # Connect to the MySQL database
+    conn = get_connection()
+    cursor = conn.cursor()
+
+    try:
+        calibration_id, native_gates_2q = get_latest_calibration(cursor, hw_name)
+
+        if not force and get_exported_calibration_id(hw_name) == str(calibration_id):
+            return calibration_id
+
+        files = None if force else read_calibration_history(hw_name, calibration_id)
+        if files is None:
+            files = get_calibration_files(cursor, calibration_id, native_gates_2q)
+            save_calibration_history(hw_name, calibration_id, files)
+
+        write_calibration_files(hw_name, calibration_id, files)
+
+    finally:
+        cursor.close()
+        conn.close()
+
+    return calibration_id
+
+#endregion